@@ -0,0 +1,38 @@
+import statistics
+
+from typing import Dict, Iterable, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(samples: List[float], elapsed: float) -> Dict[str, float]:
+    """Latency summary in milliseconds plus throughput in operations/second"""
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "ops_per_sec": len(samples) / elapsed if elapsed else 0.0,
+    }
+
+
+def print_table(rows: Iterable[tuple[str, Dict[str, float]]]) -> None:
+    columns = ["count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "ops_per_sec"]
+    print(f"{'scenario':<28}" + "".join(f"{column:>13}" for column in columns))
+    for name, summary in rows:
+        values = "".join(
+            (
+                f"{summary.get(column, 0):>13.2f}"
+                if isinstance(summary.get(column), float)
+                else f"{summary.get(column, 0):>13}"
+            )
+            for column in columns
+        )
+        print(f"{name:<28}" + values)
@@ -0,0 +1,98 @@
+"""CPU cost and size of response compression per body and setting.
+
+Compresses representative response bodies (a Token, a User, a page of users
+and the OpenAPI schema) with every available encoding at each profile, plus
+the precompressed-cache path, and prints CPU microseconds per response next
+to the compressed size.
+
+    python -m benchmarks.compression --iterations 200
+"""
+
+import argparse
+import secrets
+import time
+import uuid
+
+import msgspec
+
+from src.domain.users.schemas import PaginatedUsersResponse, Token, User, UserRead
+from src.lib.cache import TTLCache
+from src.lib.compression import AVAILABLE_CODECS, CompressionPolicy, compression_policy
+
+
+def sample_bodies() -> dict:
+    from app import create_app
+
+    users = [
+        UserRead(
+            uuid=uuid.uuid4(),
+            name=f"User {index}",
+            email=f"user{index}@example.com",
+            status=True,
+        )
+        for index in range(100)
+    ]
+    return {
+        "token": msgspec.json.encode(
+            Token(access_token=secrets.token_urlsafe(160), refresh_token="x" * 64)
+        ),
+        "user": msgspec.json.encode(
+            User(uuid=uuid.uuid4(), name="User", email="user@example.com")
+        ),
+        "users page (100)": msgspec.json.encode(
+            PaginatedUsersResponse(data=users, total=1000, limit=100, offset=0)
+        ),
+        "openapi schema": msgspec.json.encode(create_app().openapi_schema.to_schema()),
+    }
+
+
+def cpu_per_call(function, iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        function()
+    return (time.process_time() - started) / iterations * 1_000_000
+
+
+def main(iterations: int) -> None:
+    policy = CompressionPolicy(
+        minimum_size=compression_policy.minimum_size,
+        levels=compression_policy.levels,
+        cache=TTLCache(max_size=64, ttl=3600),
+    )
+
+    print(
+        f"{'body':<18}{'encoding':>9}{'profile':>9}{'level':>7}"
+        f"{'bytes':>9}{'ratio':>8}{'cpu_us':>10}"
+    )
+    for name, body in sample_bodies().items():
+        skipped = len(body) < policy.minimum_size
+        print(
+            f"{name:<18}{'identity':>9}{'-':>9}{'-':>7}{len(body):>9}{1.0:>8.2f}"
+            f"{0.0:>10.1f}" + ("   (below minimum size)" if skipped else "")
+        )
+        for codec in AVAILABLE_CODECS:
+            for profile in ("fast", "default", "best"):
+                level = policy.level(codec, profile)
+                size = len(codec.compress(body, level))
+                cpu = cpu_per_call(lambda: codec.compress(body, level), iterations)
+                print(
+                    f"{name:<18}{codec.encoding:>9}{profile:>9}{level:>7}"
+                    f"{size:>9}{len(body) / size:>8.2f}{cpu:>10.1f}"
+                )
+
+            level = policy.level(codec, "best")
+            policy.compress(codec, level, body, cacheable=True)
+            cpu = cpu_per_call(
+                lambda: policy.compress(codec, level, body, cacheable=True), iterations
+            )
+            print(
+                f"{name:<18}{codec.encoding:>9}{'cached':>9}{level:>7}"
+                f"{size:>9}{len(body) / size:>8.2f}{cpu:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    main(args.iterations)
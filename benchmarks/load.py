@@ -0,0 +1,240 @@
+"""End-to-end load test of the auth endpoints with a latency regression check.
+
+Boots ``create_app()`` in-process against DATABASE_DSN and runs concurrent
+scenarios for /users/register, /users/auth, /users/data and /users/refresh,
+each virtual user working on its own account. Prints p50/p95/p99 latency and
+throughput per endpoint.
+
+    python -m benchmarks.load --users 32 --requests 500 --save baseline.json
+    python -m benchmarks.load --users 32 --requests 500 --baseline baseline.json
+
+With --baseline, the run fails (exit code 1) when an endpoint's p95 grows or
+its throughput drops by more than --threshold compared to the baseline.
+Rate limiting and the email deliverability check are turned off unless set
+in the environment, since they would measure the limiter and the network.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import secrets
+import sys
+import time
+
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("EMAIL_CHECK_DELIVERABILITY", "false")
+
+import asyncpg  # noqa: E402
+from litestar.testing import AsyncTestClient  # noqa: E402
+
+from benchmarks.common import print_table, summarize  # noqa: E402
+from src.config.base import get_settings  # noqa: E402
+
+PASSWORD = "load-test-password"
+
+
+class VirtualUser:
+    def __init__(self, email: str) -> None:
+        self.email = email
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+
+
+async def register(client: AsyncTestClient, user: VirtualUser) -> int:
+    response = await client.post(
+        "/users/register",
+        json={"name": "Load test", "email": user.email, "password": PASSWORD},
+    )
+    return response.status_code
+
+
+async def authenticate(client: AsyncTestClient, user: VirtualUser) -> int:
+    response = await client.post(
+        "/users/auth", json={"email": user.email, "password": PASSWORD}
+    )
+    if response.status_code == 201:
+        tokens = response.json()
+        user.access_token = tokens["access_token"]
+        user.refresh_token = tokens["refresh_token"]
+    return response.status_code
+
+
+async def data(client: AsyncTestClient, user: VirtualUser) -> int:
+    response = await client.get(
+        "/users/data", headers={"x-access-token": user.access_token}
+    )
+    return response.status_code
+
+
+async def refresh(client: AsyncTestClient, user: VirtualUser) -> int:
+    response = await client.post(
+        "/users/refresh",
+        headers={
+            "x-access-token": user.access_token,
+            "x-refresh-token": user.refresh_token,
+        },
+    )
+    if response.status_code == 201:
+        user.access_token = response.json()["access_token"]
+    return response.status_code
+
+
+async def run_scenario(
+    client: AsyncTestClient,
+    request: Callable[[AsyncTestClient, VirtualUser], Awaitable[int]],
+    workers: List[List[VirtualUser]],
+) -> Dict[str, float]:
+    """Each worker sends one request per entry of its list, back to back"""
+    samples: List[float] = []
+    errors = 0
+
+    async def worker(users: List[VirtualUser]) -> None:
+        nonlocal errors
+        for user in users:
+            begin = time.perf_counter()
+            status = await request(client, user)
+            samples.append(time.perf_counter() - begin)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(users) for users in workers))
+    summary = summarize(samples, time.perf_counter() - started)
+    summary["errors"] = errors
+    return summary
+
+
+def repeat(users: List[VirtualUser], total: int) -> List[List[VirtualUser]]:
+    """One worker per user, sharing ``total`` requests between them"""
+    return [
+        [user] * (total // len(users) + (index < total % len(users)))
+        for index, user in enumerate(users)
+    ]
+
+
+async def run(
+    user_count: int, total: int, register_total: int
+) -> Dict[str, Dict[str, float]]:
+    from app import create_app
+
+    prefix = secrets.token_hex(4)
+    users = [
+        VirtualUser(f"load-{prefix}-{index}@example.com") for index in range(user_count)
+    ]
+    # Registrations need fresh accounts: the ones the other scenarios use plus
+    # extra ones up to --register-requests
+    accounts = users + [
+        VirtualUser(f"load-{prefix}-r{index}@example.com")
+        for index in range(max(register_total - user_count, 0))
+    ]
+    results: Dict[str, Dict[str, float]] = {}
+
+    async with AsyncTestClient(create_app()) as client:
+        try:
+            results["register"] = await run_scenario(
+                client,
+                register,
+                [accounts[index::user_count] for index in range(user_count)],
+            )
+            results["auth"] = await run_scenario(
+                client, authenticate, repeat(users, total)
+            )
+            results["data"] = await run_scenario(client, data, repeat(users, total))
+            results["refresh"] = await run_scenario(
+                client, refresh, repeat(users, total)
+            )
+        finally:
+            # The app's pool belongs to the test client's event loop
+            conn = await asyncpg.connect(get_settings().db.DSN)
+            try:
+                await conn.execute(
+                    "DELETE FROM users WHERE email LIKE $1", f"load-{prefix}-%"
+                )
+            finally:
+                await conn.close()
+
+    return results
+
+
+def environment() -> Dict[str, str]:
+    settings = get_settings()
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "bcrypt_rounds": str(settings.app.BCRYPT_GENSALT),
+        "password_hasher": settings.app.PASSWORD_HASHER_EXECUTOR,
+        "session_writer": str(settings.app.SESSION_WRITER_ENABLED),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: dict, threshold: float
+) -> List[str]:
+    regressions = []
+    for name, summary in results.items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        if summary["p95_ms"] > reference["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {summary['p95_ms']:.2f} ms vs {reference['p95_ms']:.2f} ms"
+            )
+        if summary["ops_per_sec"] < reference["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {summary['ops_per_sec']:.0f} req/s "
+                f"vs {reference['ops_per_sec']:.0f} req/s"
+            )
+    return regressions
+
+
+def main(args: argparse.Namespace) -> int:
+    results = asyncio.run(run(args.users, args.requests, args.register_requests))
+    print_table(results.items())
+
+    failed = [name for name, summary in results.items() if summary["errors"]]
+    if failed:
+        print(f"\nrequests failed in: {', '.join(failed)}")
+
+    current = {
+        "environment": environment(),
+        "parameters": {
+            "users": args.users,
+            "requests": args.requests,
+            "register_requests": args.register_requests,
+        },
+        "results": results,
+    }
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(current, indent=2) + "\n")
+        print(f"\nbaseline saved to {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline["environment"] != current["environment"]:
+            print("\nwarning: baseline was recorded with different settings")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nregressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nno regression beyond {args.threshold:.0%} against {args.baseline}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=32, help="concurrent users")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--register-requests", type=int, default=0)
+    parser.add_argument("--save", help="write the results as a baseline")
+    parser.add_argument("--baseline", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""Login session rotation: separate revoke + insert vs a single statement.
+
+Runs the database side of ``UsersService.authenticate`` against DATABASE_DSN
+with a throwaway user and prints per-login latency for both paths.
+
+    python -m benchmarks.session_rotation --iterations 2000
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+
+import asyncpg
+
+from benchmarks.common import print_table, summarize
+from src.config.base import get_settings
+from src.domain.users.repositories.session import SessionRepository
+from src.domain.users.repositories.user import UserRepository
+from src.domain.users.schemas import User
+
+
+async def legacy_login(users: UserRepository, sessions: SessionRepository, email):
+    user = await users.get_by_email(email)
+    await sessions.revoke_user_sessions(user["uuid"])
+    await sessions.create(
+        access_token=secrets.token_hex(),
+        refresh_token=secrets.token_hex(),
+        user_agent="bench",
+        ip="127.0.0.1",
+        user_uuid=user["uuid"],
+    )
+
+
+async def rotate_login(users: UserRepository, sessions: SessionRepository, email):
+    user = await users.get_by_email(email)
+    await sessions.rotate(
+        access_token=secrets.token_hex(),
+        refresh_token=secrets.token_hex(),
+        user_agent="bench",
+        ip="127.0.0.1",
+        user_uuid=user["uuid"],
+    )
+
+
+async def run(scenario, users, sessions, email, iterations: int) -> dict:
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        await scenario(users, sessions, email)
+        samples.append(time.perf_counter() - begin)
+    return summarize(samples, time.perf_counter() - started)
+
+
+async def main(iterations: int, warmup: int) -> None:
+    settings = get_settings()
+    connection = await asyncpg.connect(settings.db.DSN)
+    users = UserRepository(connection)
+    sessions = SessionRepository(connection)
+
+    email = f"bench-{secrets.token_hex(6)}@example.com"
+    user = await users.create(
+        User(
+            name="bench",
+            email=email,
+            password="!",
+            fingerprint=-secrets.randbelow(2**31 - 1) - 1,
+        )
+    )
+
+    try:
+        results = []
+        for name, scenario in (
+            ("legacy (3 statements)", legacy_login),
+            ("rotate (2 statements)", rotate_login),
+        ):
+            await run(scenario, users, sessions, email, warmup)
+            results.append(
+                (name, await run(scenario, users, sessions, email, iterations))
+            )
+        print_table(results)
+    finally:
+        await connection.execute("DELETE FROM users WHERE uuid = $1", user["uuid"])
+        await connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.warmup))
@@ -0,0 +1,146 @@
+"""Session writes under a login/refresh storm: one commit per write vs group commit.
+
+Runs concurrent session rotations and access-token refreshes against
+DATABASE_DSN, first each on its own connection and transaction, then through
+SessionWriter, and prints latency, writes/second and commits/second.
+
+    python -m benchmarks.session_writes --users 200 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+
+import asyncpg
+
+from benchmarks.common import summarize
+from src.config.base import get_settings
+from src.domain.users.repositories.session import SessionRepository
+from src.domain.users.writer import SessionWriter
+
+
+async def create_users(pool: asyncpg.Pool, count: int) -> list:
+    prefix = secrets.token_hex(4)
+    rows = await pool.fetch(
+        """
+        INSERT INTO users (name, email, password, fingerprint)
+        SELECT 'bench', 'bench-' || $1 || '-' || i || '@example.com', '!', -i - $2
+        FROM generate_series(1, $3) AS i
+        RETURNING uuid
+        """,
+        prefix,
+        secrets.randbelow(2**30),
+        count,
+    )
+    return [row["uuid"] for row in rows]
+
+
+async def direct_write(pool: asyncpg.Pool, user_uuid, session) -> str:
+    async with pool.acquire() as conn:
+        sessions = SessionRepository(conn)
+        if session is None:
+            await sessions.rotate(
+                secrets.token_hex(), secrets.token_hex(), "bench", None, user_uuid
+            )
+            return "rotate"
+        await sessions.update_access_token(*session, secrets.token_hex(), "bench", None)
+        return "update"
+
+
+async def batched_write(writer: SessionWriter, user_uuid, session) -> str:
+    if session is None:
+        await writer.rotate(
+            secrets.token_hex(), secrets.token_hex(), "bench", None, user_uuid
+        )
+        return "rotate"
+    await writer.update_access_token(*session, secrets.token_hex(), "bench", None)
+    return "update"
+
+
+async def storm(write, users: list, sessions: dict, concurrency: int, total: int):
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        position = index % len(users)
+        user_uuid = users[position]
+        # Half of the users log in again, the other half refresh their session
+        session = sessions[user_uuid] if position % 2 else None
+        async with semaphore:
+            begin = time.perf_counter()
+            await write(user_uuid, session)
+            samples.append(time.perf_counter() - begin)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(total)))
+    return samples, time.perf_counter() - started
+
+
+async def main(user_count: int, concurrency: int, total: int, window_ms: float):
+    settings = get_settings()
+    pool = await asyncpg.create_pool(
+        settings.db.DSN, min_size=settings.db.MIN_SIZE, max_size=settings.db.MAX_SIZE
+    )
+    users = await create_users(pool, user_count)
+    try:
+        rows = await pool.fetch(
+            """
+            INSERT INTO sessions (access_token, user_uuid)
+            SELECT md5(random()::text), uuid FROM unnest($1::uuid[]) AS uuid
+            RETURNING uuid, user_uuid, created_at
+            """,
+            users,
+        )
+        sessions = {
+            row["user_uuid"]: (str(row["uuid"]), row["created_at"]) for row in rows
+        }
+
+        samples, elapsed = await storm(
+            lambda user, session: direct_write(pool, user, session),
+            users,
+            sessions,
+            concurrency,
+            total,
+        )
+        direct = summarize(samples, elapsed)
+        direct["commits_per_sec"] = total / elapsed
+
+        writer = SessionWriter(window=window_ms / 1000, max_batch=concurrency)
+        writer.start(pool)
+        samples, elapsed = await storm(
+            lambda user, session: batched_write(writer, user, session),
+            users,
+            sessions,
+            concurrency,
+            total,
+        )
+        await writer.stop()
+        batched = summarize(samples, elapsed)
+        batched["commits_per_sec"] = writer.stats.batches / elapsed
+
+        print(
+            f"{'mode':<14}{'p50_ms':>10}{'p99_ms':>10}{'writes/s':>12}{'commits/s':>12}"
+        )
+        for name, result in (("direct", direct), ("group commit", batched)):
+            print(
+                f"{name:<14}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{result['ops_per_sec']:>12.0f}{result['commits_per_sec']:>12.0f}"
+            )
+        print(
+            f"group commit: {writer.stats.batches} batches, "
+            f"largest {writer.stats.max_batch_size}"
+        )
+    finally:
+        await pool.execute("DELETE FROM users WHERE uuid = ANY($1::uuid[])", users)
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.concurrency, args.writes, args.window_ms))
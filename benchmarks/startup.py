@@ -0,0 +1,108 @@
+"""Cold start: import time, startup and time to first response.
+
+Each run starts a fresh interpreter that imports ``app``, runs the startup
+hooks against DATABASE_DSN and sends one request, timing every phase. Prints
+the median and worst run, plus the slowest first-party imports of one run
+(from ``python -X importtime``).
+
+    python -m benchmarks.startup --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import asyncio, json, time
+from litestar.testing import AsyncTestClient
+
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+
+async def main():
+    async with AsyncTestClient(app.app) as client:
+        ready = time.perf_counter()
+        response = await client.get({path!r})
+        response.raise_for_status()
+        return ready, time.perf_counter()
+
+ready, responded = asyncio.run(main())
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_response_ms": (responded - ready) * 1000,
+    "time_to_first_response_ms": (responded - started) * 1000,
+}}))
+"""
+
+
+def run_once(path: str) -> dict:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    begin = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(path=path)],
+        capture_output=True,
+        check=True,
+        env=env,
+        text=True,
+    ).stdout
+    total = (time.perf_counter() - begin) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = total
+    return result
+
+
+def slowest_imports(limit: int) -> list:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        # Packages as a whole plus our own modules; submodules are noise
+        if cumulative.strip().isdigit() and (
+            "." not in name or name.startswith("src.")
+        ):
+            imports.append((int(cumulative) / 1000, name))
+    return sorted(imports, reverse=True)[:limit]
+
+
+def main(runs: int, path: str, imports: int) -> None:
+    # The first run also warms the OS file cache
+    run_once(path)
+    results = [run_once(path) for _ in range(runs)]
+
+    print(f"{'phase':<28}{'median_ms':>12}{'max_ms':>12}")
+    for phase in (
+        "import_ms",
+        "startup_ms",
+        "first_response_ms",
+        "time_to_first_response_ms",
+        "process_ms",
+    ):
+        values = [result[phase] for result in results]
+        print(f"{phase:<28}{statistics.median(values):>12.1f}{max(values):>12.1f}")
+
+    print("\nslowest imports (cumulative ms, one run):")
+    for cumulative, name in slowest_imports(imports):
+        print(f"{cumulative:>10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/users/?limit=1")
+    parser.add_argument("--imports", type=int, default=15)
+    args = parser.parse_args()
+    main(args.runs, args.path, args.imports)
@@ -1,12 +1,12 @@
-from typing import Literal, Tuple
-
 from litestar.config.compression import CompressionConfig
 from litestar.config.cors import CORSConfig
 from litestar.config.csrf import CSRFConfig
-from litestar.middleware.rate_limit import RateLimitConfig
-from litestar_asyncpg import AsyncpgConfig, PoolConfig
+from litestar_asyncpg import PoolConfig
 
 from src.config.base import get_settings
+from src.db.pool import InstrumentedAsyncpgConfig
+from src.db.queries import queries
+from src.lib.compression import CompressionPolicyMiddleware, compression_policy
 
 settings = get_settings()
 
@@ -37,17 +37,20 @@ cors = CORSConfig(
     allow_credentials=True,
 )
 
-compression = CompressionConfig(backend="gzip", gzip_compress_level=9)
-
-rate_limit: Tuple[Literal["second"], int] = ("second", 10)
-rate_limit_config = RateLimitConfig(rate_limit=rate_limit, exclude=["/schema"])
+compression = CompressionConfig(
+    backend="policy",
+    minimum_size=compression_policy.minimum_size,
+    middleware_class=CompressionPolicyMiddleware,
+    backend_config=compression_policy,
+)
 
-asyncpg = AsyncpgConfig(
+asyncpg = InstrumentedAsyncpgConfig(
     pool_config=PoolConfig(
         dsn=settings.db.DSN,
         min_size=settings.db.MIN_SIZE,
         max_size=settings.db.MAX_SIZE,
         max_queries=settings.db.MAX_QUERIES,
         max_inactive_connection_lifetime=settings.db.MAX_INACTIVE_CONNECTION_LIFETIME,
+        init=queries.prepare,
     )
 )
@@ -12,6 +12,11 @@ class DatabaseSettings:
     MAX_SIZE: int = 16
     MAX_QUERIES: int = 50000
     MAX_INACTIVE_CONNECTION_LIFETIME: float = 300.0
+    REPLICA_DSN: Optional[str] = None  # unset sends every read to the primary
+    REPLICA_MIN_SIZE: int = 4
+    REPLICA_MAX_SIZE: int = 16
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_HEALTH_CHECK_INTERVAL_SECONDS: int = 5
 
     def __post_init__(self):
         self.DSN = self.DSN or os.getenv("DATABASE_DSN")
@@ -24,6 +29,22 @@ class DatabaseSettings:
                 self.MAX_INACTIVE_CONNECTION_LIFETIME,
             )
         )
+        self.REPLICA_DSN = self.REPLICA_DSN or os.getenv("DATABASE_REPLICA_DSN") or None
+        self.REPLICA_MIN_SIZE = int(
+            os.getenv("DATABASE_REPLICA_MIN_SIZE", self.REPLICA_MIN_SIZE)
+        )
+        self.REPLICA_MAX_SIZE = int(
+            os.getenv("DATABASE_REPLICA_MAX_SIZE", self.REPLICA_MAX_SIZE)
+        )
+        self.REPLICA_MAX_LAG_SECONDS = float(
+            os.getenv("DATABASE_REPLICA_MAX_LAG_SECONDS", self.REPLICA_MAX_LAG_SECONDS)
+        )
+        self.REPLICA_HEALTH_CHECK_INTERVAL_SECONDS = int(
+            os.getenv(
+                "DATABASE_REPLICA_HEALTH_CHECK_INTERVAL_SECONDS",
+                self.REPLICA_HEALTH_CHECK_INTERVAL_SECONDS,
+            )
+        )
 
 
 @dataclass
@@ -35,11 +56,75 @@ class AppSettings:
     CSRF_COOKIE_SAMESITE: Literal["lax", "strict", "none"] = "strict"
     CSRF_COOKIE_HTTPONLY: bool = True
     JWT_ALGORITHM: str = "HS256"
+    JWT_KEYS_DIR: Optional[str] = None  # PEM key ring for ES256/EdDSA
+    JWT_SIGNING_KID: Optional[str] = None  # unset: the last private key by kid
+    JWKS_MAX_AGE_SECONDS: int = 300
     SESSION_SALT: Optional[str] = None
     MAX_FINGERPRINT_VALUE: int = 100_000_000
     BCRYPT_GENSALT: int = 12
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # 15 minutes
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7  # 7 days
+    AUTH_CACHE_MAX_SIZE: int = 10_000  # 0 disables the cache
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_VERIFICATION: Literal["database", "stateless"] = "database"
+    AUTH_REVOCATION_POLL_SECONDS: float = 1.0
+    AUTH_REVOCATION_MAX_STALENESS_SECONDS: float = 5.0
+    PASSWORD_HASHER_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASHER_WORKERS: int = 0  # 0 uses one worker per CPU
+    PASSWORD_HASHER_MAX_QUEUE: int = 32
+    USERS_COUNT_STRATEGY: Literal["exact", "estimated", "counter"] = "exact"
+    # Rows changed since the last analyze, as a fraction of the rows it
+    # counted, beyond which "estimated" falls back to an exact count
+    USERS_COUNT_MAX_DRIFT: float = 0.2
+    USERS_LIST_ENCODER: Literal["python", "postgres"] = "python"
+    USERS_EXPORT_CHUNK_SIZE: int = 1000
+    USERS_BULK_CHUNK_SIZE: int = 1000
+    SESSIONS_RETENTION_INTERVAL_SECONDS: int = 3600
+    SESSIONS_PARTITIONS_AHEAD_DAYS: int = 7
+    SESSION_WRITER_ENABLED: bool = False
+    SESSION_WRITER_WINDOW_MS: float = 2.0
+    SESSION_WRITER_MAX_BATCH: int = 64
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "postgres"] = "postgres"
+    RATE_LIMIT_PER_SECOND: int = 10
+    RATE_LIMIT_PURGE_INTERVAL_SECONDS: int = 60
+    LOGIN_RATE_LIMIT_PER_MINUTE: int = 5  # per email and IP
+    # Proxies (IPs or CIDRs) whose X-Forwarded-For is believed; none by default
+    TRUSTED_PROXIES: List[str] = field(default_factory=list)
+    LOGIN_LOCKOUT_ENABLED: bool = True
+    LOGIN_LOCKOUT_ACCOUNT_THRESHOLD: int = 5  # failures before the first lock
+    LOGIN_LOCKOUT_IP_THRESHOLD: int = 20
+    LOGIN_LOCKOUT_BASE_SECONDS: int = 1  # doubled on every further failure
+    LOGIN_LOCKOUT_MAX_SECONDS: int = 900
+    LOGIN_LOCKOUT_RESET_SECONDS: int = 3600  # failures forgotten after this long
+    LOGIN_LOCKOUT_MAX_ENTRIES: int = 100_000
+    LOGIN_LOCKOUT_PERSIST: bool = False
+    LOGIN_LOCKOUT_SYNC_SECONDS: int = 5
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_CACHE_MAX_SIZE: int = 64  # 0 disables the precompressed cache
+    COMPRESSION_CACHE_TTL_SECONDS: int = 3600
+    RESPONSE_CACHE_BACKEND: Literal["memory", "postgres"] = "postgres"
+    RESPONSE_CACHE_TTL_SECONDS: int = 30  # 0 disables the cache
+    RESPONSE_CACHE_PURGE_INTERVAL_SECONDS: int = 300
+    EMAIL_CHECK_DELIVERABILITY: bool = True
+    EMAIL_DNS_TIMEOUT_SECONDS: float = 3.0
+    EMAIL_DNS_CACHE_MAX_SIZE: int = 10_000
+    EMAIL_DNS_CACHE_TTL_SECONDS: int = 3600
+    EMAIL_DNS_NEGATIVE_TTL_SECONDS: int = 300
+    EMAIL_DNS_NAMESERVERS: List[str] = field(default_factory=list)
+    MIGRATIONS_ON_STARTUP: bool = True
+    METRICS_ENABLED: bool = False
+    CHANNELS_BACKEND: Literal["memory", "postgres"] = "postgres"
+    CHANNELS_BATCH_INTERVAL_SECONDS: float = 0.005
+    CHANNELS_MAX_BATCH: int = 100
+    CHANNELS_MAX_PENDING: int = 1000
+    CHANNELS_SUBSCRIBER_MAX_BACKLOG: int = 100
+    CHANNELS_RECONNECT_INTERVAL_SECONDS: float = 1.0
+    CHANNELS_KEEPALIVE_SECONDS: float = 30.0
+    METRICS_PATH: str = "/metrics"
 
     def __post_init__(self):
         self.SECRET_KEY = self.SECRET_KEY or os.getenv("SECRET_KEY")
@@ -54,6 +139,211 @@ class AppSettings:
         self.REFRESH_TOKEN_EXPIRE_DAYS = int(
             os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", self.REFRESH_TOKEN_EXPIRE_DAYS)
         )
+        self.AUTH_CACHE_MAX_SIZE = int(
+            os.getenv("AUTH_CACHE_MAX_SIZE", self.AUTH_CACHE_MAX_SIZE)
+        )
+        # Never keep an authenticated session longer than an access token lives
+        self.AUTH_CACHE_TTL_SECONDS = min(
+            int(os.getenv("AUTH_CACHE_TTL_SECONDS", self.AUTH_CACHE_TTL_SECONDS)),
+            self.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        )
+        self.AUTH_VERIFICATION = os.getenv("AUTH_VERIFICATION", self.AUTH_VERIFICATION)
+        self.AUTH_REVOCATION_POLL_SECONDS = float(
+            os.getenv("AUTH_REVOCATION_POLL_SECONDS", self.AUTH_REVOCATION_POLL_SECONDS)
+        )
+        self.AUTH_REVOCATION_MAX_STALENESS_SECONDS = float(
+            os.getenv(
+                "AUTH_REVOCATION_MAX_STALENESS_SECONDS",
+                self.AUTH_REVOCATION_MAX_STALENESS_SECONDS,
+            )
+        )
+        self.PASSWORD_HASHER_EXECUTOR = os.getenv(
+            "PASSWORD_HASHER_EXECUTOR", self.PASSWORD_HASHER_EXECUTOR
+        )
+        self.PASSWORD_HASHER_WORKERS = int(
+            os.getenv("PASSWORD_HASHER_WORKERS", self.PASSWORD_HASHER_WORKERS)
+        )
+        self.PASSWORD_HASHER_MAX_QUEUE = int(
+            os.getenv("PASSWORD_HASHER_MAX_QUEUE", self.PASSWORD_HASHER_MAX_QUEUE)
+        )
+        self.USERS_COUNT_STRATEGY = os.getenv(
+            "USERS_COUNT_STRATEGY", self.USERS_COUNT_STRATEGY
+        )
+        self.USERS_COUNT_MAX_DRIFT = float(
+            os.getenv("USERS_COUNT_MAX_DRIFT", self.USERS_COUNT_MAX_DRIFT)
+        )
+        self.USERS_LIST_ENCODER = os.getenv(
+            "USERS_LIST_ENCODER", self.USERS_LIST_ENCODER
+        )
+        self.USERS_EXPORT_CHUNK_SIZE = int(
+            os.getenv("USERS_EXPORT_CHUNK_SIZE", self.USERS_EXPORT_CHUNK_SIZE)
+        )
+        self.USERS_BULK_CHUNK_SIZE = int(
+            os.getenv("USERS_BULK_CHUNK_SIZE", self.USERS_BULK_CHUNK_SIZE)
+        )
+        self.SESSIONS_RETENTION_INTERVAL_SECONDS = int(
+            os.getenv(
+                "SESSIONS_RETENTION_INTERVAL_SECONDS",
+                self.SESSIONS_RETENTION_INTERVAL_SECONDS,
+            )
+        )
+        self.SESSIONS_PARTITIONS_AHEAD_DAYS = int(
+            os.getenv(
+                "SESSIONS_PARTITIONS_AHEAD_DAYS", self.SESSIONS_PARTITIONS_AHEAD_DAYS
+            )
+        )
+        self.SESSION_WRITER_ENABLED = os.getenv(
+            "SESSION_WRITER_ENABLED", ""
+        ).lower() in ("true", "1", "yes")
+        self.SESSION_WRITER_WINDOW_MS = float(
+            os.getenv("SESSION_WRITER_WINDOW_MS", self.SESSION_WRITER_WINDOW_MS)
+        )
+        self.SESSION_WRITER_MAX_BATCH = int(
+            os.getenv("SESSION_WRITER_MAX_BATCH", self.SESSION_WRITER_MAX_BATCH)
+        )
+        self.RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        self.RATE_LIMIT_BACKEND = os.getenv(
+            "RATE_LIMIT_BACKEND", self.RATE_LIMIT_BACKEND
+        )
+        self.RATE_LIMIT_PER_SECOND = int(
+            os.getenv("RATE_LIMIT_PER_SECOND", self.RATE_LIMIT_PER_SECOND)
+        )
+        self.RATE_LIMIT_PURGE_INTERVAL_SECONDS = int(
+            os.getenv(
+                "RATE_LIMIT_PURGE_INTERVAL_SECONDS",
+                self.RATE_LIMIT_PURGE_INTERVAL_SECONDS,
+            )
+        )
+        self.LOGIN_RATE_LIMIT_PER_MINUTE = int(
+            os.getenv("LOGIN_RATE_LIMIT_PER_MINUTE", self.LOGIN_RATE_LIMIT_PER_MINUTE)
+        )
+        if not self.TRUSTED_PROXIES:
+            proxies = os.getenv("TRUSTED_PROXIES")
+            if proxies:
+                self.TRUSTED_PROXIES = [proxy.strip() for proxy in proxies.split(",")]
+        self.LOGIN_LOCKOUT_ENABLED = os.getenv(
+            "LOGIN_LOCKOUT_ENABLED", "true"
+        ).lower() in ("true", "1", "yes")
+        self.LOGIN_LOCKOUT_ACCOUNT_THRESHOLD = int(
+            os.getenv(
+                "LOGIN_LOCKOUT_ACCOUNT_THRESHOLD", self.LOGIN_LOCKOUT_ACCOUNT_THRESHOLD
+            )
+        )
+        self.LOGIN_LOCKOUT_IP_THRESHOLD = int(
+            os.getenv("LOGIN_LOCKOUT_IP_THRESHOLD", self.LOGIN_LOCKOUT_IP_THRESHOLD)
+        )
+        self.LOGIN_LOCKOUT_BASE_SECONDS = int(
+            os.getenv("LOGIN_LOCKOUT_BASE_SECONDS", self.LOGIN_LOCKOUT_BASE_SECONDS)
+        )
+        self.LOGIN_LOCKOUT_MAX_SECONDS = int(
+            os.getenv("LOGIN_LOCKOUT_MAX_SECONDS", self.LOGIN_LOCKOUT_MAX_SECONDS)
+        )
+        self.LOGIN_LOCKOUT_RESET_SECONDS = int(
+            os.getenv("LOGIN_LOCKOUT_RESET_SECONDS", self.LOGIN_LOCKOUT_RESET_SECONDS)
+        )
+        self.LOGIN_LOCKOUT_MAX_ENTRIES = int(
+            os.getenv("LOGIN_LOCKOUT_MAX_ENTRIES", self.LOGIN_LOCKOUT_MAX_ENTRIES)
+        )
+        self.LOGIN_LOCKOUT_PERSIST = os.getenv(
+            "LOGIN_LOCKOUT_PERSIST", "false"
+        ).lower() in ("true", "1", "yes")
+        self.LOGIN_LOCKOUT_SYNC_SECONDS = int(
+            os.getenv("LOGIN_LOCKOUT_SYNC_SECONDS", self.LOGIN_LOCKOUT_SYNC_SECONDS)
+        )
+        self.COMPRESSION_MINIMUM_SIZE = int(
+            os.getenv("COMPRESSION_MINIMUM_SIZE", self.COMPRESSION_MINIMUM_SIZE)
+        )
+        self.COMPRESSION_GZIP_LEVEL = int(
+            os.getenv("COMPRESSION_GZIP_LEVEL", self.COMPRESSION_GZIP_LEVEL)
+        )
+        self.COMPRESSION_BROTLI_QUALITY = int(
+            os.getenv("COMPRESSION_BROTLI_QUALITY", self.COMPRESSION_BROTLI_QUALITY)
+        )
+        self.COMPRESSION_ZSTD_LEVEL = int(
+            os.getenv("COMPRESSION_ZSTD_LEVEL", self.COMPRESSION_ZSTD_LEVEL)
+        )
+        self.COMPRESSION_CACHE_MAX_SIZE = int(
+            os.getenv("COMPRESSION_CACHE_MAX_SIZE", self.COMPRESSION_CACHE_MAX_SIZE)
+        )
+        self.COMPRESSION_CACHE_TTL_SECONDS = int(
+            os.getenv(
+                "COMPRESSION_CACHE_TTL_SECONDS", self.COMPRESSION_CACHE_TTL_SECONDS
+            )
+        )
+        self.RESPONSE_CACHE_BACKEND = os.getenv(
+            "RESPONSE_CACHE_BACKEND", self.RESPONSE_CACHE_BACKEND
+        )
+        self.RESPONSE_CACHE_TTL_SECONDS = int(
+            os.getenv("RESPONSE_CACHE_TTL_SECONDS", self.RESPONSE_CACHE_TTL_SECONDS)
+        )
+        self.RESPONSE_CACHE_PURGE_INTERVAL_SECONDS = int(
+            os.getenv(
+                "RESPONSE_CACHE_PURGE_INTERVAL_SECONDS",
+                self.RESPONSE_CACHE_PURGE_INTERVAL_SECONDS,
+            )
+        )
+        self.EMAIL_CHECK_DELIVERABILITY = os.getenv(
+            "EMAIL_CHECK_DELIVERABILITY", "true"
+        ).lower() in ("true", "1", "yes")
+        self.EMAIL_DNS_TIMEOUT_SECONDS = float(
+            os.getenv("EMAIL_DNS_TIMEOUT_SECONDS", self.EMAIL_DNS_TIMEOUT_SECONDS)
+        )
+        self.EMAIL_DNS_CACHE_MAX_SIZE = int(
+            os.getenv("EMAIL_DNS_CACHE_MAX_SIZE", self.EMAIL_DNS_CACHE_MAX_SIZE)
+        )
+        self.EMAIL_DNS_CACHE_TTL_SECONDS = int(
+            os.getenv("EMAIL_DNS_CACHE_TTL_SECONDS", self.EMAIL_DNS_CACHE_TTL_SECONDS)
+        )
+        self.EMAIL_DNS_NEGATIVE_TTL_SECONDS = int(
+            os.getenv(
+                "EMAIL_DNS_NEGATIVE_TTL_SECONDS", self.EMAIL_DNS_NEGATIVE_TTL_SECONDS
+            )
+        )
+        if not self.EMAIL_DNS_NAMESERVERS:
+            nameservers = os.getenv("EMAIL_DNS_NAMESERVERS")
+            if nameservers:
+                self.EMAIL_DNS_NAMESERVERS = [
+                    nameserver.strip() for nameserver in nameservers.split(",")
+                ]
+        self.MIGRATIONS_ON_STARTUP = os.getenv(
+            "MIGRATIONS_ON_STARTUP", "true"
+        ).lower() in ("true", "1", "yes")
+        self.METRICS_ENABLED = os.getenv("METRICS_ENABLED", "").lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        self.METRICS_PATH = os.getenv("METRICS_PATH", self.METRICS_PATH)
+        self.CHANNELS_BACKEND = os.getenv("CHANNELS_BACKEND", self.CHANNELS_BACKEND)
+        self.CHANNELS_BATCH_INTERVAL_SECONDS = float(
+            os.getenv(
+                "CHANNELS_BATCH_INTERVAL_SECONDS", self.CHANNELS_BATCH_INTERVAL_SECONDS
+            )
+        )
+        self.CHANNELS_MAX_BATCH = int(
+            os.getenv("CHANNELS_MAX_BATCH", self.CHANNELS_MAX_BATCH)
+        )
+        self.CHANNELS_MAX_PENDING = int(
+            os.getenv("CHANNELS_MAX_PENDING", self.CHANNELS_MAX_PENDING)
+        )
+        self.CHANNELS_SUBSCRIBER_MAX_BACKLOG = int(
+            os.getenv(
+                "CHANNELS_SUBSCRIBER_MAX_BACKLOG", self.CHANNELS_SUBSCRIBER_MAX_BACKLOG
+            )
+        )
+        self.CHANNELS_RECONNECT_INTERVAL_SECONDS = float(
+            os.getenv(
+                "CHANNELS_RECONNECT_INTERVAL_SECONDS",
+                self.CHANNELS_RECONNECT_INTERVAL_SECONDS,
+            )
+        )
+        self.CHANNELS_KEEPALIVE_SECONDS = float(
+            os.getenv("CHANNELS_KEEPALIVE_SECONDS", self.CHANNELS_KEEPALIVE_SECONDS)
+        )
 
         if not self.ALLOWED_CORS_ORIGINS:
             cors_origins = os.getenv("ALLOWED_CORS_ORIGINS")
@@ -77,6 +367,13 @@ class AppSettings:
             "CSRF_COOKIE_HTTPONLY", self.CSRF_COOKIE_HTTPONLY
         )
         self.JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", self.JWT_ALGORITHM)
+        self.JWT_KEYS_DIR = self.JWT_KEYS_DIR or os.getenv("JWT_KEYS_DIR") or None
+        self.JWT_SIGNING_KID = (
+            self.JWT_SIGNING_KID or os.getenv("JWT_SIGNING_KID") or None
+        )
+        self.JWKS_MAX_AGE_SECONDS = int(
+            os.getenv("JWKS_MAX_AGE_SECONDS", self.JWKS_MAX_AGE_SECONDS)
+        )
 
 
 @dataclass
@@ -0,0 +1,145 @@
+import hashlib
+import logging
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+from asyncpg import Connection
+from asyncpg.exceptions import UndefinedColumnError, UndefinedTableError
+
+from src.config.constants import MIGRATIONS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Same key in every process, so only one of them applies migrations at a time
+MIGRATIONS_LOCK = "SELECT pg_advisory_lock(hashtext('_migrations'))"
+MIGRATIONS_UNLOCK = "SELECT pg_advisory_unlock(hashtext('_migrations'))"
+
+
+class MigrationError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    filename: str
+    sql: str
+    checksum: str
+
+
+@dataclass
+class MigrationResult:
+    applied: List[str] = field(default_factory=list)
+    pending: List[str] = field(default_factory=list)
+    drifted: List[str] = field(default_factory=list)
+
+    @property
+    def at_head(self) -> bool:
+        return not self.pending
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for sql_path in sorted(directory.glob("*.sql")):
+        sql = sql_path.read_text(encoding="utf-8")
+        checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        migrations.append(Migration(sql_path.name, sql, checksum))
+    return migrations
+
+
+async def _applied_checksums(conn: Connection) -> Dict[str, str]:
+    try:
+        rows = await conn.fetch("SELECT filename, checksum FROM _migrations")
+    except UndefinedColumnError:
+        # Table created before checksums were recorded
+        rows = await conn.fetch("SELECT filename, NULL AS checksum FROM _migrations")
+    return {row["filename"]: row["checksum"] for row in rows}
+
+
+def _compare(migrations: List[Migration], applied: Dict[str, str]) -> MigrationResult:
+    result = MigrationResult()
+    for migration in migrations:
+        if migration.filename not in applied:
+            result.pending.append(migration.filename)
+        elif applied[migration.filename] not in (None, migration.checksum):
+            result.drifted.append(migration.filename)
+    return result
+
+
+async def status(conn: Connection, migrations: List[Migration]) -> MigrationResult:
+    """One query, no lock: what is pending and what changed since it was applied"""
+    try:
+        applied = await _applied_checksums(conn)
+    except UndefinedTableError:
+        return MigrationResult(pending=[migration.filename for migration in migrations])
+    return _compare(migrations, applied)
+
+
+async def migrate(conn: Connection, migrations: List[Migration]) -> MigrationResult:
+    """Applies pending migrations, each in its own transaction.
+
+    Workers that find the database already at head return without locking;
+    otherwise they queue on an advisory lock and the first one applies what
+    is pending while the others find nothing left to do once they get it.
+    Stops at the first failing migration and raises ``MigrationError``.
+    """
+    result = await status(conn, migrations)
+    if result.at_head:
+        _warn_drift(result)
+        return result
+
+    await conn.execute(MIGRATIONS_LOCK)
+    try:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS _migrations (
+                id SERIAL PRIMARY KEY,
+                filename TEXT UNIQUE NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            ALTER TABLE _migrations ADD COLUMN IF NOT EXISTS checksum TEXT;
+            """
+        )
+
+        applied = await _applied_checksums(conn)
+        # Rows recorded before checksums existed take the current contents
+        for migration in migrations:
+            if migration.filename in applied and applied[migration.filename] is None:
+                await conn.execute(
+                    "UPDATE _migrations SET checksum = $2 WHERE filename = $1",
+                    migration.filename,
+                    migration.checksum,
+                )
+
+        result = _compare(migrations, applied)
+        for migration in migrations:
+            if migration.filename not in result.pending:
+                continue
+            try:
+                async with conn.transaction():
+                    await conn.execute(migration.sql)
+                    await conn.execute(
+                        "INSERT INTO _migrations (filename, checksum) VALUES ($1, $2)",
+                        migration.filename,
+                        migration.checksum,
+                    )
+            except Exception as e:
+                raise MigrationError(
+                    f"Error applying migration {migration.filename}: {e}"
+                ) from e
+            result.applied.append(migration.filename)
+            result.pending.remove(migration.filename)
+            logger.info(f"Applied migration {migration.filename}")
+    finally:
+        await conn.execute(MIGRATIONS_UNLOCK)
+
+    _warn_drift(result)
+    return result
+
+
+def _warn_drift(result: MigrationResult) -> None:
+    if result.drifted:
+        logger.warning(
+            "Migrations changed after being applied: " + ", ".join(result.drifted)
+        )
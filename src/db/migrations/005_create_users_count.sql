@@ -0,0 +1,38 @@
+-- Trigger-maintained row count for users (USERS_COUNT_STRATEGY=counter)
+CREATE TABLE IF NOT EXISTS users_count (
+    id bool PRIMARY KEY DEFAULT true CHECK (id),
+    total bigint NOT NULL
+);
+
+-- Block writers so the initial count and the triggers agree
+LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE OR REPLACE FUNCTION users_count_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users_count SET total = total + (SELECT COUNT(*) FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE users_count SET total = total - (SELECT COUNT(*) FROM old_rows);
+    ELSE
+        UPDATE users_count SET total = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_count_insert ON users;
+CREATE TRIGGER users_count_insert AFTER INSERT ON users
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION users_count_update();
+
+DROP TRIGGER IF EXISTS users_count_delete ON users;
+CREATE TRIGGER users_count_delete AFTER DELETE ON users
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION users_count_update();
+
+DROP TRIGGER IF EXISTS users_count_truncate ON users;
+CREATE TRIGGER users_count_truncate AFTER TRUNCATE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION users_count_update();
+
+INSERT INTO users_count (id, total) SELECT true, COUNT(*) FROM users
+ON CONFLICT (id) DO UPDATE SET total = EXCLUDED.total;
@@ -0,0 +1,114 @@
+-- Partition sessions by day (UTC) of creation so that expired sessions can be
+-- dropped a whole partition at a time instead of accumulating forever.
+--
+-- Unique constraints on a partitioned table must include the partition key,
+-- so access_token/refresh_token are unique per (token, created_at). Tokens
+-- carry the created_at of their session and every lookup filters on it, which
+-- makes (token, created_at) the lookup key and prunes it to one partition.
+
+LOCK TABLE sessions IN ACCESS EXCLUSIVE MODE;
+
+CREATE TABLE sessions_partitioned (
+    uuid uuid NOT NULL DEFAULT uuid_generate_v4(),
+    access_token text NOT NULL,
+    refresh_token text,
+    user_agent text,
+    ip varchar(255),
+    revoked bool DEFAULT false,
+    user_uuid uuid NOT NULL REFERENCES users (uuid) ON DELETE CASCADE,
+    type varchar NOT NULL DEFAULT 'manual',
+    created_at timestamp with time zone NOT NULL DEFAULT current_timestamp,
+    updated_at timestamp with time zone DEFAULT current_timestamp,
+    PRIMARY KEY (uuid, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows outside of the daily partitions (e.g. legacy rows)
+CREATE TABLE sessions_default PARTITION OF sessions_partitioned DEFAULT;
+
+INSERT INTO sessions_partitioned (
+    uuid, access_token, refresh_token, user_agent, ip, revoked, user_uuid, type,
+    created_at, updated_at
+)
+SELECT
+    uuid, access_token, refresh_token, user_agent, ip, revoked, user_uuid, type,
+    COALESCE(created_at, current_timestamp), updated_at
+FROM sessions;
+
+DROP TABLE sessions;
+ALTER TABLE sessions_partitioned RENAME TO sessions;
+ALTER TABLE sessions RENAME CONSTRAINT sessions_partitioned_pkey TO sessions_pkey;
+ALTER TABLE sessions RENAME CONSTRAINT sessions_partitioned_user_uuid_fkey TO sessions_user_uuid_fkey;
+
+ALTER TABLE sessions ADD CONSTRAINT uq_sessions_access_token UNIQUE (access_token, created_at);
+ALTER TABLE sessions ADD CONSTRAINT uq_sessions_refresh_token UNIQUE (refresh_token, created_at);
+
+CREATE INDEX idx_sessions_user_token ON sessions (user_uuid, access_token)
+WHERE revoked = false;
+CREATE INDEX idx_sessions_refresh_token ON sessions (refresh_token)
+WHERE refresh_token IS NOT NULL;
+
+-- Creates the partition for one day, moving any rows that already landed in
+-- the default partition for that day
+CREATE OR REPLACE FUNCTION sessions_create_partition(day date) RETURNS void AS $$
+DECLARE
+    part_name text := 'sessions_p' || to_char(day, 'YYYYMMDD');
+    lower_bound timestamptz := day::timestamp AT TIME ZONE 'UTC';
+    upper_bound timestamptz := (day + 1)::timestamp AT TIME ZONE 'UTC';
+BEGIN
+    IF to_regclass(part_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE sessions INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        part_name
+    );
+    EXECUTE format(
+        'WITH moved AS (
+            DELETE FROM sessions_default
+            WHERE created_at >= $1 AND created_at < $2
+            RETURNING *
+        )
+        INSERT INTO %I SELECT * FROM moved',
+        part_name
+    ) USING lower_bound, upper_bound;
+    EXECUTE format(
+        'ALTER TABLE sessions ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part_name, lower_bound, upper_bound
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detaches and drops every daily partition whose rows were all created before
+-- cutoff, returning what each one held
+CREATE OR REPLACE FUNCTION sessions_drop_partitions(cutoff timestamptz)
+RETURNS TABLE (partition_name text, row_count bigint, total_bytes bigint) AS $$
+DECLARE
+    part record;
+BEGIN
+    FOR part IN
+        SELECT c.oid, c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'sessions'::regclass
+          AND c.relname ~ '^sessions_p[0-9]{8}$'
+          AND (to_date(substring(c.relname FROM 11), 'YYYYMMDD') + 1)::timestamp
+              AT TIME ZONE 'UTC' <= cutoff
+        ORDER BY c.relname
+    LOOP
+        partition_name := part.relname;
+        EXECUTE format('SELECT count(*) FROM %I', part.relname) INTO row_count;
+        total_bytes := pg_total_relation_size(part.oid);
+        EXECUTE format('ALTER TABLE sessions DETACH PARTITION %I', part.relname);
+        EXECUTE format('DROP TABLE %I', part.relname);
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT sessions_create_partition(day::date)
+FROM generate_series(
+    (now() AT TIME ZONE 'UTC')::date - 7,
+    (now() AT TIME ZONE 'UTC')::date + 7,
+    interval '1 day'
+) AS day;
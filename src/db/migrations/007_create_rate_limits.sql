@@ -0,0 +1,11 @@
+-- Fixed-window rate limit counters shared by every worker. UNLOGGED: losing
+-- the counters on a crash only resets the current windows.
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limits (
+    key text NOT NULL,
+    window_start bigint NOT NULL,
+    expires_at bigint NOT NULL,
+    hits integer NOT NULL DEFAULT 1,
+    PRIMARY KEY (key, window_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limits_expires_at ON rate_limits (expires_at);
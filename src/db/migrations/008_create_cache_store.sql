@@ -0,0 +1,9 @@
+-- Key/value store shared by every worker (see src/db/store.py). UNLOGGED:
+-- it only holds data that can be rebuilt.
+CREATE UNLOGGED TABLE IF NOT EXISTS cache_store (
+    key text PRIMARY KEY,
+    value bytea NOT NULL,
+    expires_at timestamp with time zone
+);
+
+CREATE INDEX IF NOT EXISTS idx_cache_store_expires_at ON cache_store (expires_at);
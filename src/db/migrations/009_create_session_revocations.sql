@@ -0,0 +1,59 @@
+-- Log of access tokens that stopped being valid (AUTH_VERIFICATION=stateless):
+-- sessions revoked, deleted or whose access token was replaced on refresh, and
+-- users deactivated (access_token NULL). Workers load the recent rows into
+-- memory and poll for new ones; rows older than the access token lifetime
+-- are purged.
+CREATE TABLE IF NOT EXISTS session_revocations (
+    id bigserial PRIMARY KEY,
+    access_token text,
+    user_uuid uuid NOT NULL,
+    revoked_at timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_session_revocations_revoked_at
+ON session_revocations (revoked_at);
+
+CREATE OR REPLACE FUNCTION sessions_log_revocation() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO session_revocations (access_token, user_uuid)
+        VALUES (NEW.access_token, NEW.user_uuid);
+    ELSE
+        INSERT INTO session_revocations (access_token, user_uuid)
+        VALUES (OLD.access_token, OLD.user_uuid);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The session writer inserts superseded logins of a batch already revoked
+DROP TRIGGER IF EXISTS sessions_revoked_insert ON sessions;
+CREATE TRIGGER sessions_revoked_insert AFTER INSERT ON sessions
+FOR EACH ROW WHEN (NEW.revoked IS TRUE)
+EXECUTE FUNCTION sessions_log_revocation();
+
+DROP TRIGGER IF EXISTS sessions_revoked_update ON sessions;
+CREATE TRIGGER sessions_revoked_update AFTER UPDATE OF revoked, access_token ON sessions
+FOR EACH ROW WHEN (
+    OLD.revoked IS NOT TRUE
+    AND (NEW.revoked IS TRUE OR NEW.access_token <> OLD.access_token)
+)
+EXECUTE FUNCTION sessions_log_revocation();
+
+DROP TRIGGER IF EXISTS sessions_revoked_delete ON sessions;
+CREATE TRIGGER sessions_revoked_delete AFTER DELETE ON sessions
+FOR EACH ROW WHEN (OLD.revoked IS NOT TRUE)
+EXECUTE FUNCTION sessions_log_revocation();
+
+CREATE OR REPLACE FUNCTION users_log_deactivation() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO session_revocations (access_token, user_uuid)
+    VALUES (NULL, NEW.uuid);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_deactivated ON users;
+CREATE TRIGGER users_deactivated AFTER UPDATE OF status ON users
+FOR EACH ROW WHEN (OLD.status IS TRUE AND NEW.status IS NOT TRUE)
+EXECUTE FUNCTION users_log_deactivation();
@@ -0,0 +1,12 @@
+-- Failed login counters (LOGIN_LOCKOUT_PERSIST=true), keyed by a digest of the
+-- account email or client IP, so that lockouts survive restarts and are shared
+-- by workers. UNLOGGED: a crash only forgets recent failures.
+CREATE UNLOGGED TABLE IF NOT EXISTS login_failures (
+    key bytea PRIMARY KEY,
+    failures integer NOT NULL,
+    locked_until double precision NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_login_failures_updated_at
+ON login_failures (updated_at);
@@ -0,0 +1,28 @@
+-- Spread the users counter (USERS_COUNT_STRATEGY=counter) over 16 rows. With
+-- a single row every transaction inserting users queued on its lock until the
+-- one before it committed; each backend now updates the row of its pid, and
+-- reads sum them.
+LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE;
+
+ALTER TABLE users_count DROP CONSTRAINT IF EXISTS users_count_id_check;
+ALTER TABLE users_count ALTER COLUMN id DROP DEFAULT;
+ALTER TABLE users_count ALTER COLUMN id TYPE smallint USING 0;
+ALTER TABLE users_count ADD CONSTRAINT users_count_id_check CHECK (id BETWEEN 0 AND 15);
+
+INSERT INTO users_count (id, total) SELECT g, 0 FROM generate_series(0, 15) g
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION users_count_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users_count SET total = total + (SELECT COUNT(*) FROM new_rows)
+        WHERE id = pg_backend_pid() % 16;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE users_count SET total = total - (SELECT COUNT(*) FROM old_rows)
+        WHERE id = pg_backend_pid() % 16;
+    ELSE
+        UPDATE users_count SET total = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,43 @@
+import time
+
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator
+
+from asyncpg import Pool
+from litestar.datastructures.state import State
+from litestar.types import Scope
+from litestar_asyncpg import AsyncpgConfig
+from litestar_asyncpg.config import AsyncpgConnection
+
+from src.lib.metrics import metrics, pool_acquire_seconds
+
+
+@asynccontextmanager
+async def acquire(pool: Pool, site: str) -> AsyncIterator[AsyncpgConnection]:
+    """``pool.acquire()`` that records how long it waited for a connection"""
+    started = time.perf_counter()
+    async with pool.acquire() as connection:
+        pool_acquire_seconds.observe(time.perf_counter() - started, site)
+        yield connection
+
+
+class InstrumentedAsyncpgConfig(AsyncpgConfig):
+    """Same per-request connection as the plugin's, timing the acquire.
+
+    The dependency is resolved once per request, and the connection goes back
+    to the pool when its generator is closed, so nothing is kept in the scope.
+    """
+
+    async def provide_connection(
+        self, state: State, scope: Scope
+    ) -> AsyncGenerator[AsyncpgConnection, None]:
+        async with acquire(self.provide_pool(state), "request") as connection:
+            yield connection
+
+
+def register_pool_gauges(pool: Pool) -> None:
+    metrics.gauge("db_pool_size", "Open connections in the pool", pool.get_size)
+    metrics.gauge("db_pool_idle", "Idle connections in the pool", pool.get_idle_size)
+    metrics.gauge(
+        "db_pool_max_size", "Maximum connections in the pool", pool.get_max_size
+    )
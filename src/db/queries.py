@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from asyncpg import Connection, Pool, PostgresError
+
+from src.lib.metrics import query_seconds
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+@dataclass
+class QueryRegistry:
+    queries: Dict[str, str] = field(default_factory=dict)
+    stats: Dict[str, QueryStats] = field(default_factory=dict)
+    # Off until warm_up runs: the pool opens its initial connections one after
+    # the other, and warm_up prepares them in parallel instead
+    prepare_on_connect: bool = False
+
+    def register(self, name: str, sql: str) -> str:
+        if name in self.queries and self.queries[name] != sql:
+            raise ValueError(f"Query {name} is already registered")
+        self.queries[name] = sql
+        self.stats.setdefault(name, QueryStats())
+        return name
+
+    async def prepare(self, connection: Connection) -> None:
+        """Pool ``init`` hook: prepares every registered statement"""
+        if self.prepare_on_connect:
+            await self._prepare_all(connection)
+
+    async def _prepare_all(self, connection: Connection) -> None:
+        """Parses every statement into the connection's statement cache.
+
+        Statements from ``Connection.prepare`` are invalidated each time a
+        pooled connection is released, so they cannot be kept across
+        requests. ``executemany`` with no arguments goes through the same
+        cache as ``fetch``/``execute`` and prepares the statement without
+        running it.
+        """
+        for name, sql in self.queries.items():
+            try:
+                await connection.executemany(sql, [])
+            except PostgresError as e:
+                # Tables may not exist yet when the pool starts before migrations
+                logger.debug(f"Could not prepare query {name}: {e}")
+
+    async def warm_up(self, pool: Pool, size: int) -> None:
+        """Opens up to ``size`` connections and prepares the statements on
+        each; connections opened from then on prepare them when they connect"""
+        self.prepare_on_connect = True
+        connections = []
+        try:
+            for _ in range(min(size, pool.get_max_size())):
+                connections.append(await pool.acquire())
+            await asyncio.gather(*(self._prepare_all(conn) for conn in connections))
+        finally:
+            for conn in connections:
+                await pool.release(conn)
+
+    async def fetch(self, connection: Connection, name: str, *args: Any) -> List:
+        started = time.perf_counter()
+        try:
+            return await connection.fetch(self.queries[name], *args)
+        finally:
+            self._observe(name, started)
+
+    async def fetchrow(
+        self, connection: Connection, name: str, *args: Any
+    ) -> Optional[Any]:
+        started = time.perf_counter()
+        try:
+            return await connection.fetchrow(self.queries[name], *args)
+        finally:
+            self._observe(name, started)
+
+    async def fetchval(self, connection: Connection, name: str, *args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await connection.fetchval(self.queries[name], *args)
+        finally:
+            self._observe(name, started)
+
+    async def fetch_chunks(
+        self, connection: Connection, name: str, *args: Any, chunk_size: int
+    ) -> AsyncIterator[List]:
+        """Server-side cursor over the query, ``chunk_size`` rows per round
+        trip; must run inside a transaction"""
+        cursor = await connection.cursor(self.queries[name], *args)
+        while True:
+            started = time.perf_counter()
+            try:
+                rows = await cursor.fetch(chunk_size)
+            finally:
+                self._observe(name, started)
+            if not rows:
+                return
+            yield rows
+
+    async def execute(self, connection: Connection, name: str, *args: Any) -> str:
+        started = time.perf_counter()
+        try:
+            return await connection.execute(self.queries[name], *args)
+        finally:
+            self._observe(name, started)
+
+    def _observe(self, name: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        stats = self.stats[name]
+        stats.calls += 1
+        stats.total_seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        query_seconds.observe(elapsed, name)
+
+
+queries = QueryRegistry()
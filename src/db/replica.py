@@ -0,0 +1,173 @@
+import asyncio
+import logging
+
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+import asyncpg
+
+from asyncpg import Connection, Pool
+from litestar.serialization import decode_json
+from litestar_asyncpg.config import serializer
+
+from src.config.base import get_settings
+from src.db.queries import queries
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the query is retried on the primary: the replica is
+# unreachable, or cancelled the query because of a conflict with recovery
+REPLICA_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.exceptions.InterfaceError,
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.SerializationError,
+)
+
+# Zero on a primary, or when the replica has replayed everything it received;
+# the replay timestamp alone keeps growing while the primary is idle
+REPLICA_LAG = queries.register(
+    "replica.lag",
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END::float8
+    """,
+)
+
+
+async def _init_connection(connection: Connection) -> None:
+    # Same JSON codecs as the primary pool created by the asyncpg plugin
+    for pg_type in ("json", "jsonb"):
+        await connection.set_type_codec(
+            pg_type,
+            encoder=serializer,
+            decoder=decode_json,
+            schema="pg_catalog",
+            format="text",
+        )
+    await queries.prepare(connection)
+
+
+@dataclass
+class ReplicaStats:
+    replica_reads: int = 0
+    primary_reads: int = 0
+    failovers: int = 0
+    lag_seconds: float = 0.0
+
+
+@dataclass
+class ReplicaRouter:
+    """Sends read-only queries to a replica pool while it is healthy.
+
+    ``check`` (run periodically) opens the pool on first use and marks the
+    replica unhealthy when it cannot be reached or lags more than
+    ``max_lag`` seconds; a query failing on the replica also marks it
+    unhealthy until the next successful check.
+    """
+
+    dsn: Optional[str]
+    min_size: int
+    max_size: int
+    max_lag: float
+    stats: ReplicaStats = field(default_factory=ReplicaStats)
+    pool: Optional[Pool] = field(default=None, init=False, repr=False)
+    healthy: bool = field(default=False, init=False)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.dsn)
+
+    def reader(self, primary: Union[Pool, Connection]) -> "ReplicaReader":
+        return ReplicaReader(self, primary)
+
+    async def check(self) -> bool:
+        if not self.enabled:
+            return False
+
+        try:
+            if self.pool is None or self.pool.is_closing():
+                self.pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    init=_init_connection,
+                )
+            lag = await queries.fetchval(self.pool, REPLICA_LAG)
+        except REPLICA_ERRORS as e:
+            self._set_healthy(False, f"unreachable: {e}")
+            return False
+
+        self.stats.lag_seconds = lag
+        if lag > self.max_lag:
+            self._set_healthy(False, f"{lag:.1f}s behind the primary")
+        else:
+            self._set_healthy(True)
+        return self.healthy
+
+    def mark_unhealthy(self, error: Exception) -> None:
+        self.stats.failovers += 1
+        self._set_healthy(False, f"query failed: {error}")
+
+    def _set_healthy(self, healthy: bool, reason: str = "") -> None:
+        if healthy and not self.healthy:
+            logger.info("Read replica is healthy, routing reads to it")
+        elif not healthy and self.healthy:
+            logger.warning(f"Read replica {reason}, routing reads to the primary")
+        self.healthy = healthy
+
+    async def close(self) -> None:
+        self.healthy = False
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+class ReplicaReader:
+    """Read-only stand-in for a connection, accepted by ``queries.fetch*``:
+    runs on the replica when healthy, otherwise (or when the replica fails
+    mid-query) on ``primary``"""
+
+    # A plain class rather than a dataclass: Litestar validates injected
+    # services field by field, and Pool | Connection is not a supported type
+    __slots__ = ("router", "primary")
+
+    def __init__(self, router: ReplicaRouter, primary: Union[Pool, Connection]):
+        self.router = router
+        self.primary = primary
+
+    async def fetch(self, query: str, *args: Any) -> list:
+        return await self._run("fetch", query, *args)
+
+    async def fetchrow(self, query: str, *args: Any) -> Any:
+        return await self._run("fetchrow", query, *args)
+
+    async def fetchval(self, query: str, *args: Any) -> Any:
+        return await self._run("fetchval", query, *args)
+
+    async def _run(self, method: str, query: str, *args: Any) -> Any:
+        if self.router.healthy and self.router.pool is not None:
+            try:
+                result = await getattr(self.router.pool, method)(query, *args)
+            except REPLICA_ERRORS as e:
+                self.router.mark_unhealthy(e)
+            else:
+                self.router.stats.replica_reads += 1
+                return result
+
+        self.router.stats.primary_reads += 1
+        return await getattr(self.primary, method)(query, *args)
+
+
+settings = get_settings()
+
+replica_router = ReplicaRouter(
+    dsn=settings.db.REPLICA_DSN,
+    min_size=settings.db.REPLICA_MIN_SIZE,
+    max_size=settings.db.REPLICA_MAX_SIZE,
+    max_lag=settings.db.REPLICA_MAX_LAG_SECONDS,
+)
@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+from asyncpg import Pool
+from litestar.stores.base import NamespacedStore
+
+from src.db.queries import queries
+
+SET_VALUE = queries.register(
+    "cache_store.set",
+    """
+    INSERT INTO cache_store (key, value, expires_at) VALUES ($1, $2, $3)
+    ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+    """,
+)
+# The guard row is share-locked, so a concurrent write of the guard either
+# waits for this insert to commit or makes it see the new value and skip
+SET_VALUE_IF = queries.register(
+    "cache_store.set_if",
+    """
+    WITH guard AS (
+        SELECT 1 FROM cache_store WHERE key = $4 AND value = $5 FOR SHARE
+    )
+    INSERT INTO cache_store (key, value, expires_at)
+    SELECT $1, $2, $3 WHERE EXISTS (SELECT 1 FROM guard)
+    ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+    RETURNING true
+    """,
+)
+GET_VALUE = queries.register(
+    "cache_store.get",
+    """
+    SELECT value FROM cache_store
+    WHERE key = $1 AND (expires_at IS NULL OR expires_at > NOW())
+    """,
+)
+RENEW_VALUE = queries.register(
+    "cache_store.renew",
+    """
+    UPDATE cache_store SET expires_at = $2
+    WHERE key = $1 AND expires_at > NOW()
+    RETURNING value
+    """,
+)
+DELETE_VALUE = queries.register(
+    "cache_store.delete", "DELETE FROM cache_store WHERE key = $1"
+)
+DELETE_NAMESPACE = queries.register(
+    "cache_store.delete_namespace",
+    "DELETE FROM cache_store WHERE starts_with(key, $1)",
+)
+DELETE_EXPIRED = queries.register(
+    "cache_store.delete_expired",
+    "DELETE FROM cache_store WHERE expires_at <= NOW()",
+)
+GET_EXPIRES_AT = queries.register(
+    "cache_store.expires_at",
+    """
+    SELECT expires_at FROM cache_store
+    WHERE key = $1 AND (expires_at IS NULL OR expires_at > NOW())
+    """,
+)
+
+
+def _expires_at(expires_in: Union[int, timedelta, None]) -> Optional[datetime]:
+    if expires_in is None:
+        return None
+    if isinstance(expires_in, int):
+        expires_in = timedelta(seconds=expires_in)
+    return datetime.now(timezone.utc) + expires_in
+
+
+class PostgresStore(NamespacedStore):
+    """Litestar store kept in the UNLOGGED ``cache_store`` table, so every
+    worker sees the same values. The pool is bound at startup."""
+
+    def __init__(
+        self,
+        namespace: str = "",
+        parent: Optional["PostgresStore"] = None,
+    ) -> None:
+        self.namespace = namespace
+        self._root = parent._root if parent is not None else self
+        self._pool: Optional[Pool] = None
+
+    def bind(self, pool: Pool) -> None:
+        self._root._pool = pool
+
+    @property
+    def pool(self) -> Pool:
+        if self._root._pool is None:
+            raise RuntimeError("PostgresStore is not bound to a pool")
+        return self._root._pool
+
+    def with_namespace(self, namespace: str) -> "PostgresStore":
+        return PostgresStore(f"{self.namespace}{namespace}:", parent=self)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}{key}"
+
+    async def set(
+        self,
+        key: str,
+        value: Union[str, bytes],
+        expires_in: Union[int, timedelta, None] = None,
+    ) -> None:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        await queries.execute(
+            self.pool, SET_VALUE, self._key(key), value, _expires_at(expires_in)
+        )
+
+    async def set_if(
+        self,
+        key: str,
+        value: bytes,
+        expires_in: Union[int, timedelta, None],
+        guard_key: str,
+        guard_value: bytes,
+    ) -> bool:
+        """Sets ``key`` only while ``guard_key`` holds ``guard_value``;
+        returns whether it did"""
+        stored = await queries.fetchval(
+            self.pool,
+            SET_VALUE_IF,
+            self._key(key),
+            value,
+            _expires_at(expires_in),
+            self._key(guard_key),
+            guard_value,
+        )
+        return bool(stored)
+
+    async def get(
+        self, key: str, renew_for: Union[int, timedelta, None] = None
+    ) -> Optional[bytes]:
+        if renew_for:
+            value = await queries.fetchval(
+                self.pool, RENEW_VALUE, self._key(key), _expires_at(renew_for)
+            )
+            if value is not None:
+                return value
+        return await queries.fetchval(self.pool, GET_VALUE, self._key(key))
+
+    async def delete(self, key: str) -> None:
+        await queries.execute(self.pool, DELETE_VALUE, self._key(key))
+
+    async def delete_all(self) -> None:
+        """Deletes every value of this namespace and of its children"""
+        await queries.execute(self.pool, DELETE_NAMESPACE, self.namespace)
+
+    async def delete_expired(self) -> None:
+        await queries.execute(self.pool, DELETE_EXPIRED)
+
+    async def exists(self, key: str) -> bool:
+        return await self.get(key) is not None
+
+    async def expires_in(self, key: str) -> Optional[int]:
+        expires_at = await queries.fetchval(self.pool, GET_EXPIRES_AT, self._key(key))
+        if expires_at is None:
+            return None
+        return int((expires_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,20 @@
+from litestar.stores.memory import MemoryStore
+
+from src.config.base import get_settings
+from src.db.store import PostgresStore
+from src.lib.response_cache import ResponseCache
+
+settings = get_settings()
+
+# The postgres store is shared by every worker and bound to the pool at startup,
+# and invalidations reach every worker; the memory store is per worker, so
+# invalidations only reach the local worker
+store = (
+    PostgresStore().with_namespace("users_page")
+    if settings.app.RESPONSE_CACHE_BACKEND == "postgres"
+    else MemoryStore()
+)
+
+users_page_cache = ResponseCache(
+    store=store, ttl=settings.app.RESPONSE_CACHE_TTL_SECONDS
+)
@@ -1,14 +1,28 @@
-from typing import Dict
+from typing import Dict, Optional
 
-from litestar import Controller, Request, Response, post, get
+import msgspec
+
+from asyncpg import Pool
+from litestar import Controller, MediaType, Request, Response, post, get
 from litestar.di import Provide
+from litestar.background_tasks import BackgroundTask
 from litestar.channels import ChannelsPlugin
-from litestar.exceptions import HTTPException
+from litestar.exceptions import HTTPException, TooManyRequestsException
 from litestar.params import Parameter
+from litestar.response import Stream
 
-from src.server.auth import AuthenticationMiddleware
+from src.config.base import get_settings
+from src.db.pool import acquire
+from src.db.replica import replica_router
+from src.lib.email import deliverability_checker
+from src.lib.tokens import session_created_at
+from src.server.auth import AuthenticationMiddleware, admin_guard
+from src.server.lockout import login_lockout
+from src.server.rate_limit import get_client_ip, login_policy, rate_limiter
 
 from src.domain.users.schemas import (
+    BulkUsersRequest,
+    BulkUsersResult,
     Token,
     User,
     UserCreate,
@@ -16,9 +30,18 @@ from src.domain.users.schemas import (
     UserRead,
     PaginatedUsersResponse,
 )
+from src.domain.users.cache import users_page_cache
 from src.domain.users.deps import provide_users_service
+from src.domain.users.export import (
+    MEDIA_TYPES,
+    ExportFormat,
+    close_export,
+    export_users,
+)
 from src.domain.users.services import UsersService
 
+settings = get_settings()
+
 
 class UserController(Controller):
     path = "/users"
@@ -27,10 +50,13 @@ class UserController(Controller):
         "users_service": Provide(provide_users_service, sync_to_thread=False)
     }
 
-    @post(path="/register")
+    @post(path="/register", opt={"rate_limit": ("minute", 10)})
     async def create_user(
         self, data: UserCreate, channels: ChannelsPlugin, users_service: UsersService
     ) -> UserRead:
+        if not await deliverability_checker.is_deliverable(data.email.strip()):
+            raise HTTPException(detail="Invalid email", status_code=400)
+
         if await users_service.email_exists(data.email):
             raise HTTPException(
                 detail="A user with this email already exists", status_code=400
@@ -38,6 +64,7 @@ class UserController(Controller):
 
         user_record = await users_service.create(data)
         if user_record:
+            await users_page_cache.invalidate()
             channels.publish("User created successfully!", channels=["notifications"])
 
         return UserRead(
@@ -47,37 +74,154 @@ class UserController(Controller):
             status=user_record["status"],
         )
 
-    @post(path="/auth")
+    @post(path="/auth", opt={"rate_limit": ("minute", 30)})
     async def authenticate_user(
         self, data: UserLogin, request: Request, users_service: UsersService
     ) -> Token:
+        # Credential stuffing against one account is cut off before bcrypt
+        # runs: locked accounts and IPs first, from memory, then the rate limit
+        client_ip = get_client_ip(request.scope)
+        retry_after = login_lockout.check(data.email, client_ip)
+        if retry_after is not None:
+            raise TooManyRequestsException(
+                detail="Too many failed logins, try again later",
+                headers={"Retry-After": str(retry_after)},
+            )
+        await rate_limiter.check(
+            users_service.connection,
+            "login",
+            f"{data.email.lower()}:{client_ip}",
+            login_policy,
+        )
+
         try:
             user_agent = request.headers.get("user-agent")
             ip = request.headers.get("x-real-ip") or request.headers.get(
                 "x-forwarded-for"
             )
-            return await users_service.authenticate(data, user_agent=user_agent, ip=ip)
+            token = await users_service.authenticate(data, user_agent=user_agent, ip=ip)
         except ValueError as e:
+            login_lockout.failure(data.email, client_ip)
             raise HTTPException(status_code=400, detail=str(e))
 
-    @get(path="/", cache=2)
+        login_lockout.success(data.email)
+        return token
+
+    @get(path="/")
     async def get_users(
         self,
-        users_service: UsersService,
+        db_pool: Pool,
         limit: int = Parameter(
             default=50, ge=1, le=100, description="Number of users per page"
         ),
         offset: int = Parameter(default=0, ge=0, description="Number of users to skip"),
-    ) -> PaginatedUsersResponse:
-        users = await users_service.get_users(limit=limit, offset=offset)
-        total = await users_service.count_users()
-
-        return PaginatedUsersResponse(
-            data=[UserRead(**user) for user in users],
-            total=total,
-            limit=limit,
-            offset=offset,
+        cursor: Optional[str] = Parameter(
+            default=None,
+            description="Opaque cursor from a previous page (next_cursor)",
+        ),
+    ) -> Response[PaginatedUsersResponse]:
+        if cursor is not None and offset:
+            raise HTTPException(
+                detail="Use either offset or cursor, not both", status_code=400
+            )
+
+        async def build_page() -> bytes:
+            # Only a rebuild takes a connection, not a cached page
+            async with acquire(db_pool, "users_page") as connection:
+                # A replica may not have the change behind a recent
+                # invalidation yet, and the page would be cached for the whole
+                # TTL; past max_lag a healthy replica has it
+                if users_page_cache.since_invalidation <= replica_router.max_lag:
+                    return await encode_page(UsersService(connection))
+                return await encode_page(provide_users_service(connection))
+
+        async def encode_page(users_service: UsersService) -> bytes:
+            try:
+                if users_service.settings.app.USERS_LIST_ENCODER == "postgres":
+                    # Spliced into the envelope as is: no object per row
+                    users_json, next_cursor = await users_service.get_users_page_json(
+                        limit=limit, offset=offset, cursor=cursor
+                    )
+                    data = msgspec.Raw(users_json)
+                else:
+                    users, next_cursor = await users_service.get_users_page(
+                        limit=limit, offset=offset, cursor=cursor
+                    )
+                    data = [
+                        UserRead(
+                            uuid=user["uuid"],
+                            name=user["name"],
+                            email=user["email"],
+                            status=user["status"],
+                        )
+                        for user in users
+                    ]
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            total, total_exact = await users_service.count_users()
+
+            return msgspec.json.encode(
+                PaginatedUsersResponse(
+                    data=data,
+                    total=total,
+                    limit=limit,
+                    offset=offset,
+                    next_cursor=next_cursor,
+                    total_exact=total_exact,
+                )
+            )
+
+        body = await users_page_cache.get_or_build(
+            f"{limit}:{offset}:{cursor or ''}", build_page
         )
+        return Response(content=body, media_type=MediaType.JSON)
+
+    @get(
+        path="/export",
+        middleware=[AuthenticationMiddleware],
+        guards=[admin_guard],
+        opt={"compression": "fast"},
+    )
+    async def export_users(
+        self,
+        db_pool: Pool,
+        format: ExportFormat = Parameter(
+            default="ndjson", description="ndjson (one user per line) or csv"
+        ),
+    ) -> Stream:
+        chunks = export_users(db_pool, format, settings.app.USERS_EXPORT_CHUNK_SIZE)
+        return Stream(
+            chunks,
+            media_type=MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+            # Also runs when the client disconnects mid-stream
+            background=BackgroundTask(close_export, chunks),
+        )
+
+    @post(
+        path="/sessions/revoke",
+        middleware=[AuthenticationMiddleware],
+        guards=[admin_guard],
+    )
+    async def revoke_users_sessions(
+        self, data: BulkUsersRequest, users_service: UsersService
+    ) -> BulkUsersResult:
+        users, sessions = await users_service.revoke_users_sessions(data)
+        return BulkUsersResult(users=users, sessions=sessions)
+
+    @post(
+        path="/deactivate",
+        middleware=[AuthenticationMiddleware],
+        guards=[admin_guard],
+    )
+    async def deactivate_users(
+        self, data: BulkUsersRequest, users_service: UsersService
+    ) -> BulkUsersResult:
+        users, sessions = await users_service.deactivate_users(data)
+        if users:
+            await users_page_cache.invalidate()
+        return BulkUsersResult(users=users, sessions=sessions)
 
     @post(path="/refresh", middleware=[AuthenticationMiddleware])
     async def refresh_token(
@@ -118,7 +262,9 @@ class UserController(Controller):
 
         if access_token and current_user.get("uuid"):
             await users_service.revoke_current_session(
-                user_uuid=str(current_user["uuid"]), access_token=access_token
+                user_uuid=str(current_user["uuid"]),
+                access_token=access_token,
+                created_at=session_created_at(auth),
             )
 
         response = Response(content=True)
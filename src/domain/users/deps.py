@@ -1,8 +1,11 @@
 from asyncpg import Connection
+from src.db.replica import replica_router
 from src.domain.users.services import UsersService
 
 
 def provide_users_service(
     db_connection: Connection,
 ) -> UsersService:
+    if replica_router.enabled:
+        return UsersService(db_connection, replica_router.reader(db_connection))
     return UsersService(db_connection)
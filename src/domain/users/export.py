@@ -0,0 +1,83 @@
+import csv
+import io
+
+from contextlib import aclosing
+
+from typing import AsyncGenerator, Callable, Dict, List, Literal
+
+import msgspec
+
+from asyncpg import Pool
+
+from src.db.pool import acquire
+from src.db.replica import replica_router
+from src.domain.users.repositories.user import UserRepository
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_COLUMNS = ["uuid", "name", "email", "role", "status", "created_at"]
+
+_encoder = msgspec.json.Encoder()
+
+
+def _ndjson(rows: List) -> bytes:
+    return _encoder.encode_lines([dict(row) for row in rows])
+
+
+def _csv(rows: List) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            [
+                row["uuid"],
+                row["name"],
+                row["email"],
+                row["role"],
+                "true" if row["status"] else "false",
+                row["created_at"].isoformat() if row["created_at"] else "",
+            ]
+        )
+    return buffer.getvalue().encode()
+
+
+ENCODERS: Dict[ExportFormat, Callable[[List], bytes]] = {
+    "ndjson": _ndjson,
+    "csv": _csv,
+}
+
+MEDIA_TYPES: Dict[ExportFormat, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def export_users(
+    pool: Pool, format: ExportFormat, chunk_size: int
+) -> AsyncGenerator[bytes, None]:
+    """The users table encoded one chunk of rows at a time.
+
+    Runs on its own connection (the replica's while it is healthy), since
+    request-scoped connections are released before a streamed body is sent.
+    The next chunk is only fetched once the server has sent the previous one,
+    so a slow client slows the cursor down instead of growing a buffer.
+    Litestar drops the iterator when the client goes away, so the caller must
+    close it (``close_export``) to give the connection back.
+    """
+    encode = ENCODERS[format]
+    if format == "csv":
+        yield (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+
+    if replica_router.healthy and replica_router.pool is not None:
+        pool = replica_router.pool
+    async with acquire(pool, "export") as connection:
+        repository = UserRepository(connection)
+        async with aclosing(repository.export_users(chunk_size)) as chunks:
+            async for rows in chunks:
+                yield encode(rows)
+
+
+async def close_export(chunks: AsyncGenerator[bytes, None]) -> None:
+    # A coroutine function, so that BackgroundTask awaits it instead of
+    # calling it in a thread as it does with ``chunks.aclose``
+    await chunks.aclose()
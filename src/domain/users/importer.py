@@ -0,0 +1,196 @@
+import csv
+import itertools
+import re
+import secrets
+import time
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Literal, Tuple
+
+import msgspec
+
+from asyncpg import Connection
+from litestar.exceptions import HTTPException
+
+from src.domain.users.repositories.user import UserRepository
+from src.domain.users.schemas import UserCreate
+from src.lib.hashing import PasswordHasher
+
+ImportFormat = Literal["csv", "ndjson"]
+
+# Passwords already hashed elsewhere are stored as they are
+BCRYPT_HASH = re.compile(r"^\$2[aby]\$\d\d\$[./A-Za-z0-9]{53}$")
+
+# A fingerprint collision only costs the row a retry with a new fingerprint
+FINGERPRINT_ATTEMPTS = 5
+
+
+@dataclass
+class RowError:
+    line: int
+    email: Any
+    reason: str
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    hashed: int = 0
+    prehashed: int = 0
+    hash_seconds: float = 0.0
+    load_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+
+def read_rows(path: Path, format: ImportFormat) -> Iterator[Tuple[int, Any]]:
+    """(line number, record) for each row, without loading the whole file"""
+    with path.open(newline="", encoding="utf-8") as file:
+        if format == "csv":
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+            return
+
+        decoder = msgspec.json.Decoder()
+        for line, text in enumerate(file, start=1):
+            if not text.strip():
+                continue
+            try:
+                yield line, decoder.decode(text)
+            except msgspec.DecodeError as e:
+                yield line, e
+
+
+@dataclass
+class UserImporter:
+    """Loads users in batches: validates each row, drops emails taken in the
+    file or the table, hashes the plain passwords on every worker of
+    ``hasher`` at once and COPYs the batch in.
+
+    Rows that fail are reported to ``on_error`` and never stop the import.
+    Unlike registration, emails are only checked for syntax, not for
+    deliverability.
+    """
+
+    connection: Connection
+    hasher: PasswordHasher
+    fingerprint_range: int
+    on_error: Callable[[RowError], None]
+    stats: ImportStats = field(default_factory=ImportStats)
+
+    async def run(
+        self, rows: Iterable[Tuple[int, Any]], batch_size: int
+    ) -> ImportStats:
+        started = time.perf_counter()
+        repository = UserRepository(self.connection)
+        rows = iter(rows)
+        try:
+            while batch := list(itertools.islice(rows, batch_size)):
+                self.stats.rows += len(batch)
+                await self._import_batch(repository, batch)
+        finally:
+            self.stats.elapsed = time.perf_counter() - started
+        return self.stats
+
+    def _fail(self, line: int, email: Any, reason: str) -> None:
+        self.stats.failed += 1
+        self.on_error(RowError(line, email, reason))
+
+    def _validate(
+        self, batch: List[Tuple[int, Any]]
+    ) -> Dict[str, Tuple[int, UserCreate]]:
+        users: Dict[str, Tuple[int, UserCreate]] = {}
+        for line, record in batch:
+            if isinstance(record, Exception):
+                self._fail(line, None, f"Invalid JSON: {record}")
+                continue
+            email = record.get("email") if isinstance(record, dict) else None
+            try:
+                user = msgspec.convert(record, UserCreate)
+            except msgspec.ValidationError as e:
+                self._fail(line, email, str(e))
+                continue
+            except HTTPException as e:
+                self._fail(line, email, e.detail)
+                continue
+            if user.email in users:
+                self._fail(line, user.email, "Email repeated in the file")
+                continue
+            users[user.email] = (line, user)
+        return users
+
+    async def _hash(self, users: List[UserCreate]) -> List[str]:
+        passwords = [user.password for user in users]
+        plain = [
+            i for i, password in enumerate(passwords) if not BCRYPT_HASH.match(password)
+        ]
+        self.stats.hashed += len(plain)
+        self.stats.prehashed += len(passwords) - len(plain)
+        if not plain:
+            return passwords
+
+        started = time.perf_counter()
+        try:
+            hashed = await self.hasher.hash_many([passwords[i] for i in plain])
+        finally:
+            self.stats.hash_seconds += time.perf_counter() - started
+        for i, password in zip(plain, hashed):
+            passwords[i] = password
+        return passwords
+
+    async def _import_batch(
+        self, repository: UserRepository, batch: List[Tuple[int, Any]]
+    ) -> None:
+        users = self._validate(batch)
+        if not users:
+            return
+
+        for email in await repository.existing_emails(list(users)):
+            self._fail(users.pop(email)[0], email, "Email already registered")
+        if not users:
+            return
+
+        passwords = await self._hash([user for _, user in users.values()])
+        pending = {
+            email: (line, user.name, password)
+            for (email, (line, user)), password in zip(users.items(), passwords)
+        }
+
+        started = time.perf_counter()
+        try:
+            for _ in range(FINGERPRINT_ATTEMPTS):
+                inserted = await repository.bulk_create(
+                    [
+                        (
+                            name,
+                            email,
+                            password,
+                            secrets.randbelow(self.fingerprint_range),
+                        )
+                        for email, (_, name, password) in pending.items()
+                    ]
+                )
+                self.stats.imported += len(inserted)
+                for email in inserted:
+                    del pending[email]
+                if not pending:
+                    return
+
+                # Registered since the bulk check; whatever is left collided
+                # on its fingerprint and goes again
+                for email in await repository.existing_emails(list(pending)):
+                    self._fail(pending.pop(email)[0], email, "Email already registered")
+                if not pending:
+                    return
+
+            for email, (line, _, _) in pending.items():
+                self._fail(line, email, "No free fingerprint found")
+        finally:
+            self.stats.load_seconds += time.perf_counter() - started
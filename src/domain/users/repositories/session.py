@@ -1,7 +1,149 @@
-from typing import Optional
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
+from datetime import datetime
 from uuid import UUID
 from asyncpg import Connection
+from src.db.queries import queries
+
+CREATE_SESSION = queries.register(
+    "sessions.create",
+    """
+    INSERT INTO sessions (access_token, refresh_token, user_agent, ip, user_uuid)
+    VALUES ($1, $2, $3, $4, $5)
+    RETURNING access_token, refresh_token, created_at
+    """,
+)
+ROTATE_SESSION = queries.register(
+    "sessions.rotate",
+    """
+    WITH revoked AS (
+        UPDATE sessions SET revoked = true
+        WHERE user_uuid = $5 AND revoked = false
+    )
+    INSERT INTO sessions (access_token, refresh_token, user_agent, ip, user_uuid)
+    VALUES ($1, $2, $3, $4, $5)
+    RETURNING access_token, refresh_token, created_at
+    """,
+)
+# Tokens carry the creation time of their session, the partition key, so
+# that looking them up probes a single partition; (token, created_at) is the
+# unique key. The *_any_day variants are for tokens issued without it.
+GET_BY_REFRESH_TOKEN = queries.register(
+    "sessions.get_by_refresh_token",
+    """
+    SELECT s.uuid, s.user_uuid, s.revoked, s.access_token, s.refresh_token,
+           s.created_at, u.status as user_status, u.name, u.email, u.role
+    FROM sessions s
+    JOIN users u ON s.user_uuid = u.uuid
+    WHERE s.refresh_token = $1 AND s.created_at = $2
+      AND s.revoked = false AND u.status = true
+    """,
+)
+GET_BY_REFRESH_TOKEN_ANY_DAY = queries.register(
+    "sessions.get_by_refresh_token_any_day",
+    """
+    SELECT s.uuid, s.user_uuid, s.revoked, s.access_token, s.refresh_token,
+           s.created_at, u.status as user_status, u.name, u.email, u.role
+    FROM sessions s
+    JOIN users u ON s.user_uuid = u.uuid
+    WHERE s.refresh_token = $1 AND s.revoked = false AND u.status = true
+    """,
+)
+GET_BY_USER_AND_ACCESS_TOKEN = queries.register(
+    "sessions.get_by_user_and_access_token",
+    """
+    SELECT uuid, user_uuid, access_token, refresh_token, revoked, created_at
+    FROM sessions
+    WHERE user_uuid = $1 AND access_token = $2 AND created_at = $3
+      AND revoked = false
+    """,
+)
+GET_BY_USER_AND_ACCESS_TOKEN_ANY_DAY = queries.register(
+    "sessions.get_by_user_and_access_token_any_day",
+    """
+    SELECT uuid, user_uuid, access_token, refresh_token, revoked, created_at
+    FROM sessions
+    WHERE user_uuid = $1 AND access_token = $2 AND revoked = false
+    """,
+)
+REVOKE_SESSION = queries.register(
+    "sessions.revoke_session",
+    "UPDATE sessions SET revoked = true WHERE uuid = $1 AND created_at = $2",
+)
+REVOKE_USER_SESSIONS = queries.register(
+    "sessions.revoke_user_sessions",
+    """
+    UPDATE sessions SET revoked = true
+    WHERE user_uuid = $1 AND revoked = false
+    """,
+)
+REVOKE_USERS_SESSIONS = queries.register(
+    "sessions.revoke_users_sessions",
+    """
+    WITH revoked AS (
+        UPDATE sessions SET revoked = true
+        WHERE user_uuid = ANY($1::uuid[]) AND revoked = false
+        RETURNING user_uuid
+    )
+    SELECT count(DISTINCT user_uuid) AS users, count(*) AS sessions FROM revoked
+    """,
+)
+UPDATE_ACCESS_TOKEN = queries.register(
+    "sessions.update_access_token",
+    """
+    UPDATE sessions
+    SET access_token = $1, user_agent = $2, ip = $3, updated_at = NOW()
+    WHERE uuid = $4 AND created_at = $5 AND revoked = false
+    """,
+)
+ROTATE_SESSIONS_BATCH = queries.register(
+    "sessions.rotate_batch",
+    """
+    WITH input AS (
+        SELECT * FROM unnest(
+            $1::text[], $2::text[], $3::text[], $4::text[], $5::uuid[], $6::bool[]
+        ) AS t(access_token, refresh_token, user_agent, ip, user_uuid, revoked)
+    ),
+    revoked AS (
+        UPDATE sessions SET revoked = true
+        WHERE user_uuid IN (SELECT user_uuid FROM input) AND revoked = false
+    )
+    INSERT INTO sessions (access_token, refresh_token, user_agent, ip, user_uuid, revoked)
+    SELECT access_token, refresh_token, user_agent, ip, user_uuid, revoked FROM input
+    RETURNING access_token, refresh_token, created_at
+    """,
+)
+UPDATE_ACCESS_TOKENS_BATCH = queries.register(
+    "sessions.update_access_tokens_batch",
+    """
+    UPDATE sessions s
+    SET access_token = i.access_token, user_agent = i.user_agent, ip = i.ip,
+        updated_at = NOW()
+    FROM unnest($1::uuid[], $2::timestamptz[], $3::text[], $4::text[], $5::text[])
+        AS i(uuid, created_at, access_token, user_agent, ip)
+    WHERE s.uuid = i.uuid AND s.created_at = i.created_at AND s.revoked = false
+    """,
+)
+CREATE_PARTITIONS = queries.register(
+    "sessions.create_partitions",
+    """
+    SELECT sessions_create_partition((now() AT TIME ZONE 'UTC')::date + day)
+    FROM generate_series(0, $1::int) AS day
+    """,
+)
+DROP_PARTITIONS = queries.register(
+    "sessions.drop_partitions",
+    "SELECT partition_name, row_count, total_bytes FROM sessions_drop_partitions($1)",
+)
+PURGE_DEFAULT_PARTITION = queries.register(
+    "sessions.purge_default_partition",
+    """
+    WITH purged AS (
+        DELETE FROM sessions_default WHERE created_at < $1 RETURNING 1
+    )
+    SELECT count(*) FROM purged
+    """,
+)
 
 
 @dataclass
@@ -16,61 +158,141 @@ class SessionRepository:
         ip: Optional[str],
         user_uuid: UUID,
     ) -> dict:
-        query = """
-            INSERT INTO sessions (access_token, refresh_token, user_agent, ip, user_uuid) 
-            VALUES ($1, $2, $3, $4, $5) 
-            RETURNING access_token, refresh_token
-        """
-        return await self.connection.fetchrow(
-            query, access_token, refresh_token, user_agent, ip, str(user_uuid)
+        return await queries.fetchrow(
+            self.connection,
+            CREATE_SESSION,
+            access_token,
+            refresh_token,
+            user_agent,
+            ip,
+            str(user_uuid),
         )
 
-    async def get_by_refresh_token(self, refresh_token: str) -> Optional[dict]:
-        query = """
-            SELECT s.uuid, s.user_uuid, s.revoked, s.access_token, s.refresh_token, u.status as user_status
-            FROM sessions s
-            JOIN users u ON s.user_uuid = u.uuid
-            WHERE s.refresh_token = $1 AND s.revoked = false AND u.status = true
-        """
-        return await self.connection.fetchrow(query, refresh_token)
+    async def rotate(
+        self,
+        access_token: str,
+        refresh_token: str,
+        user_agent: Optional[str],
+        ip: Optional[str],
+        user_uuid: UUID,
+    ) -> dict:
+        """Revoga as sessões ativas do usuário e cria a nova em um único comando"""
+        return await queries.fetchrow(
+            self.connection,
+            ROTATE_SESSION,
+            access_token,
+            refresh_token,
+            user_agent,
+            ip,
+            str(user_uuid),
+        )
+
+    async def get_by_refresh_token(
+        self, refresh_token: str, created_at: Optional[datetime]
+    ) -> Optional[dict]:
+        """created_at é o da sessão, levado no token; sem ele a busca passa
+        por todas as partições"""
+        if created_at is None:
+            return await queries.fetchrow(
+                self.connection, GET_BY_REFRESH_TOKEN_ANY_DAY, refresh_token
+            )
+        return await queries.fetchrow(
+            self.connection, GET_BY_REFRESH_TOKEN, refresh_token, created_at
+        )
 
     async def get_by_user_and_access_token(
-        self, user_uuid: str, access_token: str
+        self, user_uuid: str, access_token: str, created_at: Optional[datetime]
     ) -> Optional[dict]:
-        query = """
-            SELECT uuid, user_uuid, access_token, refresh_token, revoked
-            FROM sessions
-            WHERE user_uuid = $1 AND access_token = $2 AND revoked = false
-        """
-        return await self.connection.fetchrow(query, user_uuid, access_token)
+        if created_at is None:
+            return await queries.fetchrow(
+                self.connection,
+                GET_BY_USER_AND_ACCESS_TOKEN_ANY_DAY,
+                user_uuid,
+                access_token,
+            )
+        return await queries.fetchrow(
+            self.connection,
+            GET_BY_USER_AND_ACCESS_TOKEN,
+            user_uuid,
+            access_token,
+            created_at,
+        )
 
-    async def revoke_session(self, session_uuid: UUID) -> bool:
-        query = """
-            UPDATE sessions SET revoked = true WHERE uuid = $1
-        """
-        await self.connection.execute(query, str(session_uuid))
+    async def revoke_session(self, session_uuid: UUID, created_at: datetime) -> bool:
+        await queries.execute(
+            self.connection, REVOKE_SESSION, str(session_uuid), created_at
+        )
         return True
 
     async def revoke_user_sessions(self, user_uuid: UUID) -> bool:
         """Revoga todas as sessões ativas de um usuário"""
-        query = """
-            UPDATE sessions SET revoked = true 
-            WHERE user_uuid = $1 AND revoked = false
-        """
-        await self.connection.execute(query, str(user_uuid))
+        await queries.execute(self.connection, REVOKE_USER_SESSIONS, str(user_uuid))
         return True
 
+    async def revoke_users_sessions(self, user_uuids: List[UUID]) -> Tuple[int, int]:
+        """Revoga as sessões ativas de vários usuários em um único comando.
+
+        Retorna quantos usuários tinham sessões ativas e quantas foram revogadas.
+        """
+        row = await queries.fetchrow(self.connection, REVOKE_USERS_SESSIONS, user_uuids)
+        return row["users"], row["sessions"]
+
     async def update_access_token(
         self,
         session_uuid: str,
+        created_at: datetime,
         access_token: str,
         user_agent: Optional[str],
         ip: Optional[str],
     ) -> None:
         """Atualiza o access_token, user_agent e ip de uma sessão existente"""
-        query = """
-            UPDATE sessions
-            SET access_token = $1, user_agent = $2, ip = $3, updated_at = NOW()
-            WHERE uuid = $4 AND revoked = false
+        await queries.execute(
+            self.connection,
+            UPDATE_ACCESS_TOKEN,
+            access_token,
+            user_agent,
+            ip,
+            session_uuid,
+            created_at,
+        )
+
+    async def rotate_many(
+        self, sessions: List[Tuple[str, str, Optional[str], Optional[str], str]]
+    ) -> list:
+        """Rotaciona várias sessões em um único comando.
+
+        Cada item é (access_token, refresh_token, user_agent, ip, user_uuid);
+        se um usuário aparece mais de uma vez, só a última sessão fica ativa,
+        como aconteceria com as rotações feitas uma a uma.
         """
-        await self.connection.execute(query, access_token, user_agent, ip, session_uuid)
+        last = {user_uuid: index for index, (*_, user_uuid) in enumerate(sessions)}
+        columns = list(zip(*sessions))
+        revoked = [
+            last[user_uuid] != index for index, user_uuid in enumerate(columns[4])
+        ]
+        return await queries.fetch(
+            self.connection, ROTATE_SESSIONS_BATCH, *columns, revoked
+        )
+
+    async def update_access_tokens(
+        self, sessions: List[Tuple[str, datetime, str, Optional[str], Optional[str]]]
+    ) -> None:
+        """Atualiza várias sessões em um único comando.
+
+        Cada item é (session_uuid, created_at, access_token, user_agent, ip);
+        para a mesma sessão vale a última atualização.
+        """
+        latest = {session[0]: session for session in sessions}
+        columns = list(zip(*sorted(latest.values())))
+        await queries.execute(self.connection, UPDATE_ACCESS_TOKENS_BATCH, *columns)
+
+    async def create_partitions(self, days_ahead: int) -> None:
+        """Garante as partições diárias de hoje até days_ahead dias à frente"""
+        await queries.execute(self.connection, CREATE_PARTITIONS, days_ahead)
+
+    async def drop_partitions(self, cutoff: datetime) -> list:
+        """Remove as partições cujas sessões foram todas criadas antes de cutoff"""
+        return await queries.fetch(self.connection, DROP_PARTITIONS, cutoff)
+
+    async def purge_default_partition(self, cutoff: datetime) -> int:
+        return await queries.fetchval(self.connection, PURGE_DEFAULT_PARTITION, cutoff)
@@ -1,49 +1,319 @@
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Set, Tuple, Union
 from dataclasses import dataclass
+from datetime import datetime
 from uuid import UUID
+from anyio import CancelScope
 from asyncpg import Connection
+from src.db.queries import queries
+from src.db.replica import ReplicaReader
 from src.domain.users.schemas import User
 
+CREATE_USER = queries.register(
+    "users.create",
+    """
+    INSERT INTO users (name, email, password, fingerprint)
+    VALUES ($1, $2, $3, $4)
+    RETURNING uuid, name, email, status
+    """,
+)
+GET_BY_EMAIL = queries.register(
+    "users.get_by_email", "SELECT * FROM users WHERE email = $1"
+)
+GET_BY_UUID = queries.register(
+    "users.get_by_uuid", "SELECT * FROM users WHERE uuid = $1"
+)
+EMAIL_EXISTS = queries.register(
+    "users.email_exists", "SELECT 1 FROM users WHERE email = $1"
+)
+GET_USERS = queries.register(
+    "users.get_users",
+    """
+    SELECT uuid, name, email, status, created_at FROM users
+    ORDER BY created_at DESC, uuid DESC
+    LIMIT $1 OFFSET $2
+    """,
+)
+GET_ALL_USERS = queries.register(
+    "users.get_all_users",
+    """
+    SELECT uuid, name, email, status, created_at FROM users
+    ORDER BY created_at DESC, uuid DESC
+    OFFSET $1
+    """,
+)
+# The range on created_at alone lets users_index_created_at drive the scan, so
+# every page costs the same regardless of its depth
+GET_USERS_AFTER = queries.register(
+    "users.get_users_after",
+    """
+    SELECT uuid, name, email, status, created_at FROM users
+    WHERE created_at <= $1 AND (created_at < $1 OR uuid < $2)
+    ORDER BY created_at DESC, uuid DESC
+    LIMIT $3
+    """,
+)
+# One page of users as a JSON array built by Postgres (same keys and order as
+# UserRead), plus what the next cursor is made of. ``{users}`` fetches one row
+# past the page so that has_more needs no second query.
+PAGE_JSON = """
+    SELECT
+        '[' || COALESCE(string_agg(p.user_json, ',' ORDER BY p.n)
+                        FILTER (WHERE p.n <= $1), '') || ']' AS data,
+        COUNT(*) > $1 AS has_more,
+        (array_agg(p.created_at) FILTER (WHERE p.n = $1))[1] AS last_created_at,
+        (array_agg(p.uuid) FILTER (WHERE p.n = $1))[1] AS last_uuid
+    FROM (
+        SELECT
+            row_number() OVER (ORDER BY u.created_at DESC, u.uuid DESC) AS n,
+            u.created_at,
+            u.uuid,
+            row_to_json(
+                (SELECT r FROM (SELECT u.uuid, u.status, u.name, u.email) r)
+            )::text AS user_json
+        FROM ({users}) u
+    ) p
+    """
+GET_USERS_JSON = queries.register(
+    "users.get_users_json",
+    PAGE_JSON.format(users="""
+        SELECT uuid, name, email, status, created_at FROM users
+        ORDER BY created_at DESC, uuid DESC
+        LIMIT $1 + 1 OFFSET $2
+        """),
+)
+GET_USERS_AFTER_JSON = queries.register(
+    "users.get_users_after_json",
+    PAGE_JSON.format(users="""
+        SELECT uuid, name, email, status, created_at FROM users
+        WHERE created_at <= $2 AND (created_at < $2 OR uuid < $3)
+        ORDER BY created_at DESC, uuid DESC
+        LIMIT $1 + 1
+        """),
+)
+EXPORT_USERS = queries.register(
+    "users.export",
+    """
+    SELECT uuid, name, email, role, status, created_at FROM users
+    ORDER BY created_at DESC, uuid DESC
+    """,
+)
+EXISTING_EMAILS = queries.register(
+    "users.existing_emails",
+    "SELECT email FROM users WHERE email = ANY($1::varchar[])",
+)
+# Bulk imports COPY each batch into this session's staging table, then move
+# it into users skipping rows that hit a unique constraint (a taken email, or
+# a fingerprint collision the importer retries with another fingerprint)
+CREATE_IMPORT_TABLE = queries.register(
+    "users.create_import_table",
+    """
+    CREATE TEMP TABLE IF NOT EXISTS users_import (
+        name varchar NOT NULL,
+        email varchar NOT NULL,
+        password varchar NOT NULL,
+        fingerprint integer NOT NULL
+    ) ON COMMIT DELETE ROWS
+    """,
+)
+INSERT_IMPORTED = queries.register(
+    "users.insert_imported",
+    """
+    INSERT INTO users (name, email, password, fingerprint)
+    SELECT name, email, password, fingerprint FROM users_import
+    ON CONFLICT DO NOTHING
+    RETURNING email
+    """,
+)
+# Admin bulk actions walk the users matching a filter in uuid order, one chunk
+# of uuids at a time; a NULL criterion matches everyone
+FIND_UUIDS = queries.register(
+    "users.find_uuids",
+    """
+    SELECT uuid FROM users
+    WHERE ($1::text IS NULL OR lower(split_part(email, '@', 2)) = lower($1))
+      AND ($2::role_type IS NULL OR role = $2::role_type)
+      AND ($3::uuid IS NULL OR uuid > $3)
+    ORDER BY uuid
+    LIMIT $4
+    """,
+)
+# Deactivated users also lose their sessions, in the same statement
+DEACTIVATE_USERS = queries.register(
+    "users.deactivate_users",
+    """
+    WITH deactivated AS (
+        UPDATE users SET status = false, updated_at = now()
+        WHERE uuid = ANY($1::uuid[]) AND status = true
+        RETURNING uuid
+    ),
+    revoked AS (
+        UPDATE sessions SET revoked = true
+        WHERE user_uuid IN (SELECT uuid FROM deactivated) AND revoked = false
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM deactivated) AS users,
+           (SELECT count(*) FROM revoked) AS sessions
+    """,
+)
+COUNT_USERS = queries.register(
+    "users.count_users", "SELECT COUNT(*) as total FROM users"
+)
+# NULL when the rows changed since the last analyze exceed $1 of the rows it
+# counted: the density of the table may no longer be the one it measured
+ESTIMATE_USERS = queries.register(
+    "users.estimate_users",
+    """
+    SELECT CASE
+        WHEN COALESCE(s.n_mod_since_analyze, 0) <= $1 * c.reltuples
+        THEN (c.reltuples / c.relpages
+              * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+             )::bigint
+    END AS estimate
+    FROM pg_class c
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.oid = 'users'::regclass
+      AND c.relpages > 0
+      AND c.reltuples >= 0
+    """,
+)
+# Kept in several rows so that inserts do not all queue on one row lock
+COUNT_USERS_FROM_COUNTER = queries.register(
+    "users.count_users_from_counter",
+    "SELECT sum(total)::bigint AS total FROM users_count",
+)
+
 
 @dataclass
 class UserRepository:
     connection: Connection
+    # Listing and counting tolerate replica lag and read through ``reader``;
+    # lookups that follow a write of the same request or client (login right
+    # after registering, the email check before an insert) stay on the primary
+    reader: Optional[ReplicaReader] = None
+
+    @property
+    def reads(self) -> Union[Connection, ReplicaReader]:
+        return self.reader or self.connection
 
     async def create(self, data: User) -> dict:
-        query = """
-            INSERT INTO users (name, email, password, fingerprint) 
-            VALUES ($1, $2, $3, $4) 
-            RETURNING uuid, name, email, status
-        """
-        return await self.connection.fetchrow(
-            query, data.name, data.email, data.password, data.fingerprint
+        return await queries.fetchrow(
+            self.connection,
+            CREATE_USER,
+            data.name,
+            data.email,
+            data.password,
+            data.fingerprint,
         )
 
     async def get_by_email(self, email: str) -> Optional[dict]:
-        query = "SELECT * FROM users WHERE email = $1"
-        return await self.connection.fetchrow(query, email)
+        return await queries.fetchrow(self.connection, GET_BY_EMAIL, email)
 
     async def get_by_uuid(self, uuid: UUID) -> Optional[dict]:
-        query = "SELECT * FROM users WHERE uuid = $1"
-        return await self.connection.fetchrow(query, str(uuid))
+        return await queries.fetchrow(self.connection, GET_BY_UUID, str(uuid))
 
     async def email_exists(self, email: str) -> bool:
-        query = "SELECT 1 FROM users WHERE email = $1"
-        return bool(await self.connection.fetchrow(query, email))
+        return bool(await queries.fetchrow(self.connection, EMAIL_EXISTS, email))
+
+    async def existing_emails(self, emails: List[str]) -> Set[str]:
+        rows = await queries.fetch(self.connection, EXISTING_EMAILS, emails)
+        return {row["email"] for row in rows}
+
+    async def bulk_create(self, users: List[Tuple[str, str, str, int]]) -> Set[str]:
+        """Inserts (name, email, password hash, fingerprint) rows with COPY and
+        returns the emails inserted; rows conflicting with an existing user
+        are skipped"""
+        async with self.connection.transaction():
+            await queries.execute(self.connection, CREATE_IMPORT_TABLE)
+            await self.connection.copy_records_to_table(
+                "users_import",
+                records=users,
+                columns=["name", "email", "password", "fingerprint"],
+            )
+            rows = await queries.fetch(self.connection, INSERT_IMPORTED)
+        return {row["email"] for row in rows}
+
+    async def find_uuids(
+        self,
+        email_domain: Optional[str],
+        role: Optional[str],
+        after: Optional[UUID],
+        limit: int,
+    ) -> List[UUID]:
+        rows = await queries.fetch(
+            self.connection, FIND_UUIDS, email_domain, role, after, limit
+        )
+        return [row["uuid"] for row in rows]
+
+    async def deactivate_users(self, user_uuids: List[UUID]) -> Tuple[int, int]:
+        """Returns how many users were deactivated and how many of their
+        sessions revoked"""
+        row = await queries.fetchrow(self.connection, DEACTIVATE_USERS, user_uuids)
+        return row["users"], row["sessions"]
 
     async def get_users(
         self, limit: Optional[int] = None, offset: int = 0
     ) -> Optional[list]:
-        query = "SELECT uuid, name, email, status FROM users ORDER BY created_at DESC"
-
         if limit is not None:
-            query += " LIMIT $1 OFFSET $2"
-            return await self.connection.fetch(query, limit, offset)
+            return await queries.fetch(self.reads, GET_USERS, limit, offset)
         else:
-            query += " OFFSET $1"
-            return await self.connection.fetch(query, offset)
+            return await queries.fetch(self.reads, GET_ALL_USERS, offset)
+
+    async def get_users_after(
+        self, limit: int, after: Optional[Tuple[datetime, UUID]] = None
+    ) -> list:
+        if after is None:
+            return await self.get_users(limit=limit)
+
+        created_at, uuid = after
+        return await queries.fetch(self.reads, GET_USERS_AFTER, created_at, uuid, limit)
+
+    async def get_users_json(
+        self, limit: int, offset: int = 0, after: Optional[Tuple[datetime, UUID]] = None
+    ) -> dict:
+        """One page as JSON text (``data``), ``has_more`` and the last row's
+        ``last_created_at`` and ``last_uuid``"""
+        if after is None:
+            return await queries.fetchrow(self.reads, GET_USERS_JSON, limit, offset)
+
+        created_at, uuid = after
+        return await queries.fetchrow(
+            self.reads, GET_USERS_AFTER_JSON, limit, created_at, uuid
+        )
+
+    async def export_users(self, chunk_size: int) -> AsyncIterator[list]:
+        """Every user, ``chunk_size`` at a time from a server-side cursor, out
+        of one consistent snapshot. Holds the connection until exhausted."""
+        transaction = self.connection.transaction(
+            isolation="repeatable_read", readonly=True
+        )
+        await transaction.start()
+        try:
+            async for rows in queries.fetch_chunks(
+                self.connection, EXPORT_USERS, chunk_size=chunk_size
+            ):
+                yield rows
+        finally:
+            # Read-only, so rolling back is as good as committing; shielded
+            # because a client going away cancels the streaming response
+            with CancelScope(shield=True):
+                await transaction.rollback()
 
     async def count_users(self) -> int:
-        query = "SELECT COUNT(*) as total FROM users"
-        result = await self.connection.fetchrow(query)
+        result = await queries.fetchrow(self.reads, COUNT_USERS)
         return result["total"] if result else 0
+
+    async def estimate_users(self, max_drift: float) -> Optional[int]:
+        """Planner estimate of the row count, or None when the table has never
+        been analyzed or vacuumed, or has had more than ``max_drift`` of its
+        rows changed since.
+
+        The rows per page of the last statistics are scaled to the current
+        size of the table, so old statistics of a table whose size did not
+        change since are still accurate. Runs on the primary: a replica keeps
+        no count of the changes made since the last analyze."""
+        result = await queries.fetchrow(self.connection, ESTIMATE_USERS, max_drift)
+        return result["estimate"] if result else None
+
+    async def count_users_from_counter(self) -> Optional[int]:
+        result = await queries.fetchrow(self.reads, COUNT_USERS_FROM_COUNTER)
+        return result["total"] if result else None
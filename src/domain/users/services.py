@@ -1,38 +1,73 @@
 import hashlib
 import hmac
 import secrets
-import bcrypt
 import jwt
 
 from datetime import datetime, timezone, timedelta
 
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Union
+from uuid import UUID
 from asyncpg import Connection
 
 from src.config.base import get_settings, Settings
+from src.db.replica import ReplicaReader
 from src.domain.users.repositories.user import UserRepository
 from src.domain.users.repositories.session import SessionRepository
-from src.domain.users.schemas import Token, UserCreate, UserLogin, User
+from src.domain.users.schemas import (
+    BulkUsersRequest,
+    Token,
+    UserCreate,
+    UserLogin,
+    User,
+)
+from src.domain.users.writer import SessionWriter, session_writer
+from src.lib.hashing import password_hasher
+from src.lib.pagination import decode_cursor, encode_cursor
+from src.lib.tokens import (
+    decode_token,
+    encode_token,
+    session_created_at,
+    session_created_claim,
+)
+from src.server.auth import auth_cache
+from src.server.revocation import revocation_filter
 
 
 @dataclass
 class UsersService:
     connection: Connection
+    reader: Optional[ReplicaReader] = None
     user_repository: UserRepository = field(init=False)
     session_repository: SessionRepository = field(init=False)
     settings: Settings = field(init=False)
 
     def __post_init__(self) -> None:
-        self.user_repository = UserRepository(self.connection)
+        self.user_repository = UserRepository(self.connection, self.reader)
         self.session_repository = SessionRepository(self.connection)
         self.settings = get_settings()
 
+    @property
+    def session_writes(self) -> Union[SessionRepository, SessionWriter]:
+        """Session writes go through the group-commit writer when it is running"""
+        return session_writer if session_writer.running else self.session_repository
+
     @staticmethod
     def _hash_token(token: str, salt: str) -> str:
         """Hash token using HMAC-SHA256 - fast and secure for random tokens."""
         return hmac.new(salt.encode(), token.encode(), hashlib.sha256).hexdigest()
 
+    @staticmethod
+    def _user_claims(user: dict) -> dict:
+        """What stateless verification needs to authenticate a request without
+        looking the user up: the profile and when the token was issued"""
+        return {
+            "name": user["name"],
+            "email": user["email"],
+            "role": user["role"],
+            "iat": datetime.now(timezone.utc),
+        }
+
     async def email_exists(self, email: str) -> bool:
         return await self.user_repository.email_exists(email)
 
@@ -42,21 +77,66 @@ class UsersService:
         users = await self.user_repository.get_users(limit=limit, offset=offset)
         return users
 
-    async def count_users(self) -> int:
-        return await self.user_repository.count_users()
+    async def get_users_page(
+        self, limit: int, offset: int = 0, cursor: Optional[str] = None
+    ) -> Tuple[list[dict], Optional[str]]:
+        """Returns one page of users plus the cursor of the next page, if any"""
+        if cursor is not None:
+            users = await self.user_repository.get_users_after(
+                limit=limit + 1, after=decode_cursor(cursor)
+            )
+        else:
+            users = await self.user_repository.get_users(limit=limit + 1, offset=offset)
+
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            last = users[-1]
+            next_cursor = encode_cursor(last["created_at"], last["uuid"])
+
+        return users, next_cursor
+
+    async def get_users_page_json(
+        self, limit: int, offset: int = 0, cursor: Optional[str] = None
+    ) -> Tuple[str, Optional[str]]:
+        """Same page as ``get_users_page``, encoded by Postgres as a JSON array"""
+        after = decode_cursor(cursor) if cursor is not None else None
+        page = await self.user_repository.get_users_json(
+            limit=limit, offset=offset, after=after
+        )
+
+        next_cursor = None
+        if page["has_more"]:
+            next_cursor = encode_cursor(page["last_created_at"], page["last_uuid"])
+
+        return page["data"], next_cursor
+
+    async def count_users(self) -> Tuple[int, bool]:
+        """Returns the total number of users and whether that total is exact"""
+        strategy = self.settings.app.USERS_COUNT_STRATEGY
+
+        if strategy == "counter":
+            total = await self.user_repository.count_users_from_counter()
+            if total is not None:
+                return total, True
+        elif strategy == "estimated":
+            total = await self.user_repository.estimate_users(
+                self.settings.app.USERS_COUNT_MAX_DRIFT
+            )
+            if total is not None:
+                return total, False
+
+        return await self.user_repository.count_users(), True
 
     async def create(self, data: UserCreate) -> dict:
-        hashed_password = bcrypt.hashpw(
-            data.password.encode("utf-8"),
-            bcrypt.gensalt(self.settings.app.BCRYPT_GENSALT),
-        )
+        hashed_password = await password_hasher.hash(data.password)
 
         fingerprint = secrets.randbelow(self.settings.app.MAX_FINGERPRINT_VALUE)
 
         user_data = User(
             name=data.name,
             email=data.email,
-            password=hashed_password.decode("utf-8"),
+            password=hashed_password,
             fingerprint=fingerprint,
         )
 
@@ -69,8 +149,7 @@ class UsersService:
         if not user_record or not user_record.get("status", False):
             raise ValueError("No user found")
 
-        stored_password = user_record["password"].encode("utf-8")
-        if not bcrypt.checkpw(data.password.encode("utf-8"), stored_password):
+        if not await password_hasher.verify(data.password, user_record["password"]):
             raise ValueError("The password is incorrect")
 
         salt = self.settings.app.SESSION_SALT
@@ -81,20 +160,26 @@ class UsersService:
         access_token_hash = self._hash_token(random_access_token, salt)
         refresh_token_hash = self._hash_token(random_refresh_token, salt)
 
-        # Revoke all active sessions for this user before creating a new one
-        await self.session_repository.revoke_user_sessions(user_uuid)
-
-        session = await self.session_repository.create(
+        # Revoke all active sessions for this user and create the new one
+        # atomically, in a single round trip
+        session = await self.session_writes.rotate(
             access_token=access_token_hash,
             refresh_token=refresh_token_hash,
             user_agent=user_agent,
             ip=ip,
             user_uuid=user_uuid,
         )
+        auth_cache.invalidate_group(str(user_uuid))
 
         if not session:
             raise ValueError("Something went wrong creating the session")
 
+        # Every session created before this one was just revoked; other
+        # workers see it on their next poll
+        revocation_filter.revoke_users(
+            [str(user_uuid)], before=session["created_at"].timestamp()
+        )
+
         # Calculate expiration times
         access_token_exp = datetime.now(timezone.utc) + timedelta(
             minutes=self.settings.app.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -103,24 +188,25 @@ class UsersService:
             days=self.settings.app.REFRESH_TOKEN_EXPIRE_DAYS
         )
 
-        access_token_jwt = jwt.encode(
+        session_created = session_created_claim(session["created_at"])
+
+        access_token_jwt = encode_token(
             {
                 "uuid": str(user_uuid),
                 "access_token": random_access_token,
+                "session_created": session_created,
                 "exp": access_token_exp,
-            },
-            key=self.settings.app.SECRET_KEY,
-            algorithm=self.settings.app.JWT_ALGORITHM,
+                **self._user_claims(user_record),
+            }
         )
 
-        refresh_token_jwt = jwt.encode(
+        refresh_token_jwt = encode_token(
             {
                 "uuid": str(user_uuid),
                 "refresh_token": random_refresh_token,
+                "session_created": session_created,
                 "exp": refresh_token_exp,
-            },
-            key=self.settings.app.SECRET_KEY,
-            algorithm=self.settings.app.JWT_ALGORITHM,
+            }
         )
 
         return Token(access_token=access_token_jwt, refresh_token=refresh_token_jwt)
@@ -130,11 +216,7 @@ class UsersService:
     ) -> Token:
         """Refreshes the access_token using a valid refresh_token"""
         try:
-            decoded = jwt.decode(
-                jwt=refresh_token,
-                key=self.settings.app.SECRET_KEY,
-                algorithms=[self.settings.app.JWT_ALGORITHM],
-            )
+            decoded = decode_token(refresh_token)
 
             random_refresh_token = decoded.get("refresh_token")
             user_uuid = decoded.get("uuid")
@@ -148,7 +230,7 @@ class UsersService:
 
             # Fetch the session by refresh token
             session = await self.session_repository.get_by_refresh_token(
-                refresh_token_hash
+                refresh_token_hash, session_created_at(decoded)
             )
 
             if not session or str(session["user_uuid"]) != user_uuid:
@@ -160,12 +242,15 @@ class UsersService:
             access_token_hash = self._hash_token(random_access_token, salt)
 
             # Update only the access token in the existing session
-            await self.session_repository.update_access_token(
+            await self.session_writes.update_access_token(
                 session_uuid=session["uuid"],
+                created_at=session["created_at"],
                 access_token=access_token_hash,
                 user_agent=user_agent,
                 ip=ip,
             )
+            auth_cache.delete((user_uuid, session["access_token"]))
+            revocation_filter.revoke(session["access_token"])
 
             # Calculate expiration time for new access token
             access_token_exp = datetime.now(timezone.utc) + timedelta(
@@ -173,14 +258,14 @@ class UsersService:
             )
 
             # Generate new access token JWT
-            access_token_jwt = jwt.encode(
+            access_token_jwt = encode_token(
                 {
                     "uuid": user_uuid,
                     "access_token": random_access_token,
+                    "session_created": session_created_claim(session["created_at"]),
                     "exp": access_token_exp,
-                },
-                key=self.settings.app.SECRET_KEY,
-                algorithm=self.settings.app.JWT_ALGORITHM,
+                    **self._user_claims(session),
+                }
             )
 
             # Return the new access token and keep the same refresh token
@@ -191,19 +276,77 @@ class UsersService:
         except jwt.PyJWTError:
             raise ValueError("Invalid refresh token format")
 
-    async def revoke_current_session(self, user_uuid: str, access_token: str) -> bool:
-        """Revokes the current session by user_uuid and access_token"""
+    async def revoke_current_session(
+        self, user_uuid: str, access_token: str, created_at: Optional[datetime]
+    ) -> bool:
+        """Revokes the current session by user_uuid and access_token, given the
+        session creation time the token carries"""
         # Hash the access token to match the stored hash
         salt = self.settings.app.SESSION_SALT
         access_token_hash = self._hash_token(access_token, salt)
 
         # Get the session by user_uuid and access_token
         session = await self.session_repository.get_by_user_and_access_token(
-            user_uuid=user_uuid, access_token=access_token_hash
+            user_uuid=user_uuid, access_token=access_token_hash, created_at=created_at
         )
 
         if not session:
             raise ValueError("Session not found")
 
         # Revoke the session
-        return await self.session_repository.revoke_session(session["uuid"])
+        revoked = await self.session_repository.revoke_session(
+            session["uuid"], session["created_at"]
+        )
+        auth_cache.delete((user_uuid, access_token_hash))
+        revocation_filter.revoke(access_token_hash)
+        return revoked
+
+    async def _bulk_targets(
+        self, target: BulkUsersRequest
+    ) -> AsyncIterator[List[UUID]]:
+        """The users of a bulk action in chunks of USERS_BULK_CHUNK_SIZE, in
+        uuid order so that concurrent bulk actions lock rows in the same order"""
+        chunk_size = self.settings.app.USERS_BULK_CHUNK_SIZE
+        if target.uuids is not None:
+            uuids = sorted(set(target.uuids))
+            for start in range(0, len(uuids), chunk_size):
+                yield uuids[start : start + chunk_size]
+            return
+
+        role = target.filter.role.value if target.filter.role else None
+        after = None
+        while uuids := await self.user_repository.find_uuids(
+            target.filter.email_domain, role, after, chunk_size
+        ):
+            yield uuids
+            after = uuids[-1]
+
+    async def _bulk(
+        self,
+        target: BulkUsersRequest,
+        apply: Callable[[List[UUID]], Awaitable[Tuple[int, int]]],
+    ) -> Tuple[int, int]:
+        """Runs ``apply`` once per chunk, each chunk committing on its own so
+        that no statement holds its locks for long, and drops what this
+        worker has cached about those users as soon as the chunk commits.
+        Other workers pick it up from session_revocations and their TTLs."""
+        users = sessions = 0
+        async for uuids in self._bulk_targets(target):
+            chunk_users, chunk_sessions = await apply(uuids)
+            users += chunk_users
+            sessions += chunk_sessions
+
+            user_uuids = [str(user_uuid) for user_uuid in uuids]
+            for user_uuid in user_uuids:
+                auth_cache.invalidate_group(user_uuid)
+            revocation_filter.revoke_users(user_uuids)
+        return users, sessions
+
+    async def revoke_users_sessions(self, target: BulkUsersRequest) -> Tuple[int, int]:
+        """Logs users out everywhere; returns the users that had sessions and
+        the sessions revoked"""
+        return await self._bulk(target, self.session_repository.revoke_users_sessions)
+
+    async def deactivate_users(self, target: BulkUsersRequest) -> Tuple[int, int]:
+        """Returns the users deactivated and the sessions revoked with them"""
+        return await self._bulk(target, self.user_repository.deactivate_users)
@@ -0,0 +1,73 @@
+import logging
+import time
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from asyncpg import Pool
+
+from src.config.base import get_settings
+from src.domain.users.repositories.session import SessionRepository
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+@dataclass
+class SessionRetentionStats:
+    runs: int = 0
+    partitions_dropped: int = 0
+    rows_reclaimed: int = 0
+    bytes_reclaimed: int = 0
+    # Epoch seconds, 0 until the first run
+    last_run_at: float = 0.0
+
+
+retention_stats = SessionRetentionStats()
+
+
+async def maintain_session_partitions(pool: Pool) -> None:
+    """Creates upcoming daily partitions and drops those past refresh-token
+    expiry. Only one worker does the work on each run.
+
+    Refreshing keeps the session row, so a session may still hold a valid
+    access token for a whole access-token lifetime after its refresh token
+    expired; partitions are kept until that has passed too.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        days=settings.app.REFRESH_TOKEN_EXPIRE_DAYS,
+        minutes=settings.app.ACCESS_TOKEN_EXPIRE_MINUTES,
+    )
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if not await conn.fetchval(
+                "SELECT pg_try_advisory_xact_lock(hashtext('sessions_retention'))"
+            ):
+                return
+
+            # Fail fast instead of queueing behind long transactions on sessions
+            await conn.execute("SET LOCAL lock_timeout = '5s'")
+
+            sessions = SessionRepository(conn)
+            await sessions.create_partitions(
+                settings.app.SESSIONS_PARTITIONS_AHEAD_DAYS
+            )
+            dropped = await sessions.drop_partitions(cutoff)
+            purged = await sessions.purge_default_partition(cutoff)
+
+    rows = purged + sum(partition["row_count"] for partition in dropped)
+    size = sum(partition["total_bytes"] for partition in dropped)
+
+    retention_stats.runs += 1
+    retention_stats.partitions_dropped += len(dropped)
+    retention_stats.rows_reclaimed += rows
+    retention_stats.bytes_reclaimed += size
+    retention_stats.last_run_at = time.time()
+
+    if dropped or purged:
+        logger.info(
+            f"Session retention dropped {len(dropped)} partitions, "
+            f"reclaiming {rows} rows and {size} bytes"
+        )
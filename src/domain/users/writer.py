@@ -0,0 +1,224 @@
+import asyncio
+import logging
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Literal, Optional, Tuple
+from uuid import UUID
+
+from asyncpg import Pool
+
+from src.config.base import get_settings
+from src.domain.users.repositories.session import SessionRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingWrite:
+    kind: Literal["rotate", "update"]
+    args: Tuple[Any, ...]
+    future: asyncio.Future
+
+
+@dataclass
+class SessionWriterStats:
+    batches: int = 0
+    rotations: int = 0
+    updates: int = 0
+    max_batch_size: int = 0
+    # Batches that failed and were written again one write at a time
+    failed_batches: int = 0
+
+
+@dataclass
+class SessionWriter:
+    """Group commit for session writes.
+
+    Rotations and access-token updates that arrive within ``window`` seconds
+    of each other are written together in one transaction with one multi-row
+    statement each. Callers only get their result once that transaction has
+    committed. When a batch fails, its writes are retried one at a time, so
+    only the callers whose own write fails get the error.
+    """
+
+    window: float
+    max_batch: int
+    stats: SessionWriterStats = field(default_factory=SessionWriterStats)
+    _pool: Optional[Pool] = field(default=None, init=False, repr=False)
+    _queue: Optional[asyncio.Queue] = field(default=None, init=False, repr=False)
+    _task: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, pool: Pool) -> None:
+        self._pool = pool
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="session-writer")
+        self._task.add_done_callback(self._on_stopped)
+
+    async def stop(self) -> None:
+        """Flushes what is already queued and stops the writer"""
+        if not self.running:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def rotate(
+        self,
+        access_token: str,
+        refresh_token: str,
+        user_agent: Optional[str],
+        ip: Optional[str],
+        user_uuid: UUID,
+    ) -> Optional[dict]:
+        return await self._submit(
+            "rotate", (access_token, refresh_token, user_agent, ip, str(user_uuid))
+        )
+
+    async def update_access_token(
+        self,
+        session_uuid: str,
+        created_at: datetime,
+        access_token: str,
+        user_agent: Optional[str],
+        ip: Optional[str],
+    ) -> None:
+        await self._submit(
+            "update", (str(session_uuid), created_at, access_token, user_agent, ip)
+        )
+
+    async def _submit(self, kind: Literal["rotate", "update"], args: Tuple) -> Any:
+        if not self.running:
+            raise RuntimeError("The session writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingWrite(kind, args, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        batch: List[_PendingWrite] = []
+
+        try:
+            while not stopping:
+                first = await self._queue.get()
+                if first is None:
+                    return
+
+                batch = [first]
+                deadline = loop.time() + self.window
+                while len(batch) < self.max_batch:
+                    if self._queue.empty():
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(self._queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            break
+                    else:
+                        item = self._queue.get_nowait()
+
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                try:
+                    await self._flush(batch)
+                except Exception as e:
+                    # The loop must outlive any batch: callers of later writes
+                    # would wait on their futures forever
+                    logger.exception(f"Error flushing session writes: {e}")
+                    self._fail(batch, e)
+        finally:
+            # Cancelled while collecting or writing a batch
+            self._fail(batch, RuntimeError("The session writer stopped"))
+
+    def _on_stopped(self, task: asyncio.Task) -> None:
+        """Fails whatever is still queued once the writer is gone, whether
+        it was stopped or crashed"""
+        error = RuntimeError("The session writer stopped")
+        if not task.cancelled() and task.exception() is not None:
+            error = RuntimeError(f"The session writer failed: {task.exception()}")
+        pending = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                pending.append(item)
+        self._fail(pending, error)
+
+    @staticmethod
+    def _fail(batch: List[_PendingWrite], error: BaseException) -> None:
+        for write in batch:
+            if not write.future.done():
+                write.future.set_exception(error)
+
+    async def _flush(self, batch: List[_PendingWrite]) -> None:
+        # Callers that gave up (e.g. a cancelled request) are not written
+        batch = [write for write in batch if not write.future.done()]
+        if not batch:
+            return
+
+        try:
+            await self._write(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                logger.exception(f"Error writing a session: {e}")
+                self._fail(batch, e)
+                return
+            # One bad write (e.g. the user was deleted meanwhile) must not fail
+            # the others: each is written again in its own transaction
+            logger.warning(
+                f"Error writing a batch of {len(batch)} sessions, "
+                f"writing them one at a time: {e}"
+            )
+            self.stats.failed_batches += 1
+            for write in batch:
+                await self._flush([write])
+            return
+
+        self.stats.max_batch_size = max(self.stats.max_batch_size, len(batch))
+
+    async def _write(self, batch: List[_PendingWrite]) -> None:
+        """Writes the batch in one transaction and resolves its callers once
+        it commits; raises, leaving them pending, when it fails"""
+        rotations = [write for write in batch if write.kind == "rotate"]
+        updates = [write for write in batch if write.kind == "update"]
+
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                sessions = SessionRepository(conn)
+                rows = []
+                if rotations:
+                    rows = await sessions.rotate_many(
+                        [write.args for write in rotations]
+                    )
+                if updates:
+                    await sessions.update_access_tokens(
+                        [write.args for write in updates]
+                    )
+
+        self.stats.batches += 1
+        self.stats.rotations += len(rotations)
+        self.stats.updates += len(updates)
+
+        created = {row["access_token"]: row for row in rows}
+        for write in rotations:
+            if not write.future.done():
+                write.future.set_result(created.get(write.args[0]))
+        for write in updates:
+            if not write.future.done():
+                write.future.set_result(None)
+
+
+settings = get_settings()
+
+session_writer = SessionWriter(
+    window=settings.app.SESSION_WRITER_WINDOW_MS / 1000,
+    max_batch=settings.app.SESSION_WRITER_MAX_BATCH,
+)
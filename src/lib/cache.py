@@ -0,0 +1,122 @@
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass
+class TTLCache:
+    """Bounded in-process LRU cache whose entries also expire after a TTL.
+
+    Entries can be tagged with a group so that every key belonging to it
+    (e.g. all sessions of a user) can be invalidated at once.
+    """
+
+    max_size: int
+    ttl: float
+    stats: CacheStats = field(default_factory=CacheStats)
+    _entries: "OrderedDict[Hashable, Tuple[float, Any, Optional[Hashable]]]" = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    _groups: Dict[Hashable, Set[Hashable]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        group: Optional[Hashable] = None,
+    ) -> None:
+        if not self.enabled:
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + ttl, value, group)
+        if group is not None:
+            self._groups.setdefault(group, set()).add(key)
+
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        self.stats.invalidations += 1
+        return True
+
+    def invalidate_group(self, group: Hashable) -> int:
+        keys = self._groups.get(group)
+        if not keys:
+            return 0
+        count = 0
+        for key in list(keys):
+            if self.delete(key):
+                count += 1
+        return count
+
+    def clear(self) -> None:
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
+        self._groups.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, group = self._entries.pop(key)
+        if group is not None:
+            keys = self._groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[group]
@@ -0,0 +1,302 @@
+import gzip
+import hashlib
+import zlib
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Optional, Sequence
+
+from litestar.config.compression import CompressionConfig
+from litestar.datastructures import Headers, MutableScopeHeaders
+from litestar.middleware.compression import CompressionMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+from litestar.utils.empty import value_or_default
+from litestar.utils.scope.state import ScopeState
+
+from src.config.base import get_settings
+from src.lib.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+Profile = Literal["off", "fast", "default", "best"]
+
+
+class StreamCompressor(ABC):
+    @abstractmethod
+    def write(self, data: bytes) -> bytes:
+        """Compresses a chunk and returns what can be sent of it right away"""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """Ends the stream and returns its remaining bytes"""
+
+
+class _GzipStream(StreamCompressor):
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def write(self, data: bytes) -> bytes:
+        # Sync flush so that every chunk reaches the client as it is produced
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream(StreamCompressor):
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level, mode=brotli.MODE_TEXT)
+
+    def write(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdStream(StreamCompressor):
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def write(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+@dataclass(frozen=True)
+class Codec:
+    encoding: str
+    fast: int
+    best: int
+
+    def compress(self, data: bytes, level: int) -> bytes:
+        if self.encoding == "gzip":
+            return gzip.compress(data, compresslevel=level, mtime=0)
+        if self.encoding == "br":
+            return brotli.compress(data, quality=level, mode=brotli.MODE_TEXT)
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    def stream(self, level: int) -> StreamCompressor:
+        if self.encoding == "gzip":
+            return _GzipStream(level)
+        if self.encoding == "br":
+            return _BrotliStream(level)
+        return _ZstdStream(level)
+
+
+GZIP = Codec("gzip", fast=1, best=9)
+BROTLI = Codec("br", fast=1, best=11)
+ZSTD = Codec("zstd", fast=1, best=19)
+
+# Server preference when the client weighs several encodings the same
+AVAILABLE_CODECS: List[Codec] = [
+    codec
+    for codec, module in ((ZSTD, zstandard), (BROTLI, brotli), (GZIP, gzip))
+    if module is not None
+]
+
+
+def negotiate(accept_encoding: str, codecs: Sequence[Codec]) -> Optional[Codec]:
+    """Picks the codec with the highest q-value in Accept-Encoding"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for codec in codecs:
+        q = weights.get(codec.encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = codec, q
+    return best
+
+
+@dataclass
+class CompressionStats:
+    compressed: int = 0
+    skipped: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+
+@dataclass
+class CompressionPolicy:
+    """Decides whether and how hard a response is compressed.
+
+    Bodies under ``minimum_size`` are sent as is. Handlers pick a profile with
+    ``opt={"compression": "off" | "fast" | "default" | "best"}``; responses
+    under ``cache_paths`` default to "best" and their compressed bytes are kept
+    in ``cache``, so static-ish bodies like the OpenAPI schema are only
+    compressed once per encoding.
+    """
+
+    minimum_size: int
+    levels: Dict[str, int]
+    cache: TTLCache
+    cache_paths: List[str] = field(default_factory=list)
+    codecs: List[Codec] = field(default_factory=lambda: list(AVAILABLE_CODECS))
+    stats: CompressionStats = field(default_factory=CompressionStats)
+
+    def is_cacheable(self, scope: Scope) -> bool:
+        return scope["route_handler"].opt.get("compression_cache") or any(
+            scope["path"].startswith(path) for path in self.cache_paths
+        )
+
+    def profile(self, scope: Scope) -> Profile:
+        profile = scope["route_handler"].opt.get("compression")
+        if profile:
+            return profile
+        return "best" if self.is_cacheable(scope) else "default"
+
+    def level(self, codec: Codec, profile: Profile) -> int:
+        if profile == "fast":
+            return codec.fast
+        if profile == "best":
+            return codec.best
+        return self.levels[codec.encoding]
+
+    def compress(self, codec: Codec, level: int, body: bytes, cacheable: bool) -> bytes:
+        if not cacheable:
+            return codec.compress(body, level)
+
+        key = (codec.encoding, level, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = codec.compress(body, level)
+            self.cache.set(key, compressed)
+        return compressed
+
+
+class CompressionPolicyMiddleware(CompressionMiddleware):
+    """Litestar compression middleware driven by a :class:`CompressionPolicy`"""
+
+    def __init__(self, app: ASGIApp, config: CompressionConfig) -> None:
+        super().__init__(app, config)
+        self.policy: CompressionPolicy = config.backend_config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile = self.policy.profile(scope)
+        codec = negotiate(
+            Headers.from_scope(scope).get("accept-encoding", ""), self.policy.codecs
+        )
+        if codec is None or profile == "off":
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, self._send_wrapper(scope, send, codec, profile))
+
+    def _send_wrapper(
+        self, scope: Scope, send: Send, codec: Codec, profile: Profile
+    ) -> Send:
+        policy = self.policy
+        level = policy.level(codec, profile)
+        connection_state = ScopeState.from_scope(scope)
+        initial_message: Optional[Message] = None
+        stream: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal initial_message, stream, passthrough
+
+            if message["type"] == "http.response.start":
+                initial_message = message
+                return
+
+            if initial_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if passthrough:
+                await send(message)
+                return
+
+            body = message["body"]
+            more_body = message.get("more_body", False)
+
+            if stream is not None:
+                policy.stats.bytes_in += len(body)
+                message["body"] = (
+                    stream.write(body)
+                    if more_body
+                    else stream.write(body) + stream.finish()
+                )
+                policy.stats.bytes_out += len(message["body"])
+                await send(message)
+                return
+
+            headers = MutableScopeHeaders(initial_message)
+            if (
+                value_or_default(connection_state.is_cached, False)
+                or "content-encoding" in headers
+                or (not more_body and len(body) < policy.minimum_size)
+            ):
+                # Already encoded (e.g. replayed from the response cache) or
+                # too small to be worth the CPU
+                passthrough = True
+                policy.stats.skipped += 1
+                await send(initial_message)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = codec.encoding
+            headers.extend_header_value("vary", "Accept-Encoding")
+            connection_state.response_compressed = True
+            policy.stats.compressed += 1
+            policy.stats.bytes_in += len(body)
+
+            if more_body:
+                stream = codec.stream(level)
+                del headers["Content-Length"]
+                message["body"] = stream.write(body)
+            else:
+                message["body"] = policy.compress(
+                    codec, level, body, policy.is_cacheable(scope)
+                )
+                headers["Content-Length"] = str(len(message["body"]))
+
+            policy.stats.bytes_out += len(message["body"])
+            await send(initial_message)
+            await send(message)
+
+        return send_wrapper
+
+
+settings = get_settings()
+
+compression_policy = CompressionPolicy(
+    minimum_size=settings.app.COMPRESSION_MINIMUM_SIZE,
+    levels={
+        "gzip": settings.app.COMPRESSION_GZIP_LEVEL,
+        "br": settings.app.COMPRESSION_BROTLI_QUALITY,
+        "zstd": settings.app.COMPRESSION_ZSTD_LEVEL,
+    },
+    cache=TTLCache(
+        max_size=settings.app.COMPRESSION_CACHE_MAX_SIZE,
+        ttl=settings.app.COMPRESSION_CACHE_TTL_SECONDS,
+    ),
+    cache_paths=["/schema"],
+)
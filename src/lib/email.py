@@ -0,0 +1,165 @@
+import asyncio
+import ipaddress
+import logging
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from src.config.base import get_settings
+from src.lib.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncResolver(Protocol):
+    """What the checker needs from ``dns.asyncresolver.Resolver``; tests can
+    pass a stub returning canned answers or raising dnspython exceptions"""
+
+    async def resolve(self, qname: str, rdtype: str, **kwargs: Any) -> Any: ...
+
+
+@dataclass
+class DeliverabilityStats:
+    lookups: int = 0
+    undeliverable: int = 0
+    timeouts: int = 0
+    errors: int = 0
+
+
+@dataclass
+class DeliverabilityChecker:
+    """Async replacement for email_validator's ``check_deliverability``.
+
+    A domain accepts email when it has a non-null MX record, or no MX but a
+    globally reachable A/AAAA record (RFC 5321 implicit MX). Results are
+    cached per domain for the record TTL (at most ``ttl``), bad domains for
+    ``negative_ttl``. Lookups that exceed ``timeout`` or fail on the resolver
+    side are not cached and the address is accepted. Without an explicit
+    ``resolver``, one is built on first use from ``nameservers`` (or the
+    system configuration).
+    """
+
+    timeout: float
+    cache: TTLCache
+    ttl: float
+    negative_ttl: float
+    resolver: Optional[AsyncResolver] = None
+    nameservers: List[str] = field(default_factory=list)
+    enabled: bool = True
+    stats: DeliverabilityStats = field(default_factory=DeliverabilityStats)
+    _inflight: Dict[str, asyncio.Task] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    async def is_deliverable(self, email: str) -> bool:
+        if not self.enabled:
+            return True
+
+        # Imported on first use: email_validator and dnspython take longer to
+        # import than the rest of the app's own modules together
+        from email_validator import EmailNotValidError, validate_email
+
+        try:
+            domain = validate_email(email, check_deliverability=False).ascii_domain
+        except EmailNotValidError:
+            return False
+
+        deliverable = self.cache.get(domain)
+        if deliverable is None:
+            task = self._inflight.get(domain)
+            if task is None:
+                task = asyncio.ensure_future(self._lookup(domain))
+                self._inflight[domain] = task
+                task.add_done_callback(lambda _: self._inflight.pop(domain, None))
+            deliverable = await asyncio.shield(task)
+
+        if not deliverable:
+            self.stats.undeliverable += 1
+        return deliverable
+
+    async def _lookup(self, domain: str) -> bool:
+        import dns.exception
+
+        self.stats.lookups += 1
+        try:
+            async with asyncio.timeout(self.timeout):
+                deliverable, ttl = await self._resolve(domain)
+        except (TimeoutError, dns.exception.Timeout):
+            self.stats.timeouts += 1
+            logger.warning(f"Deliverability check for {domain} timed out")
+            return True
+        except dns.exception.DNSException as e:
+            self.stats.errors += 1
+            logger.warning(f"Deliverability check for {domain} failed: {e}")
+            return True
+
+        self.cache.set(domain, deliverable, ttl=min(ttl, self.ttl))
+        return deliverable
+
+    async def _resolve(self, domain: str) -> Tuple[bool, float]:
+        import dns.resolver
+
+        if self.resolver is None:
+            self.resolver = _build_resolver(self.nameservers)
+
+        try:
+            answer = await self.resolver.resolve(domain, "MX", lifetime=self.timeout)
+        except dns.resolver.NXDOMAIN:
+            return False, self.negative_ttl
+        except dns.resolver.NoAnswer:
+            return await self._resolve_fallback(domain)
+
+        # RFC 7505: a null MX (0 ".") means the domain does not accept email
+        exchanges = [str(record.exchange).rstrip(".") for record in answer]
+        if not any(exchanges):
+            return False, self.negative_ttl
+        return True, answer.rrset.ttl
+
+    async def _resolve_fallback(self, domain: str) -> Tuple[bool, float]:
+        import dns.resolver
+
+        for rdtype in ("A", "AAAA"):
+            try:
+                answer = await self.resolver.resolve(
+                    domain, rdtype, lifetime=self.timeout
+                )
+            except dns.resolver.NoAnswer:
+                continue
+            if any(_is_global(record.address) for record in answer):
+                return True, answer.rrset.ttl
+        return False, self.negative_ttl
+
+
+def _is_global(address: str) -> bool:
+    try:
+        return ipaddress.ip_address(address).is_global
+    except ValueError:
+        return False
+
+
+def _build_resolver(nameservers: List[str]) -> AsyncResolver:
+    import dns.asyncresolver
+
+    if not nameservers:
+        return dns.asyncresolver.Resolver()
+    resolver = dns.asyncresolver.Resolver(configure=False)
+    resolver.nameservers = nameservers
+    return resolver
+
+
+settings = get_settings()
+
+deliverability_checker = DeliverabilityChecker(
+    timeout=settings.app.EMAIL_DNS_TIMEOUT_SECONDS,
+    cache=TTLCache(
+        max_size=settings.app.EMAIL_DNS_CACHE_MAX_SIZE,
+        ttl=max(
+            settings.app.EMAIL_DNS_CACHE_TTL_SECONDS,
+            settings.app.EMAIL_DNS_NEGATIVE_TTL_SECONDS,
+        ),
+    ),
+    ttl=settings.app.EMAIL_DNS_CACHE_TTL_SECONDS,
+    negative_ttl=settings.app.EMAIL_DNS_NEGATIVE_TTL_SECONDS,
+    nameservers=settings.app.EMAIL_DNS_NAMESERVERS,
+    enabled=settings.app.EMAIL_CHECK_DELIVERABILITY,
+)
@@ -16,6 +16,7 @@ def app_exception_handler(request: Request, exc: HTTPException) -> Response:
             "status_code": exc.status_code,
         },
         status_code=exc.status_code,
+        headers=exc.headers,
     )
 
 
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import time
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Literal, Optional, Tuple
+
+import bcrypt
+
+from litestar.exceptions import ServiceUnavailableException
+
+from src.config.base import get_settings
+from src.lib.metrics import password_hash_seconds, password_queue_seconds
+
+
+def _hash_password(password: bytes, rounds: int) -> Tuple[bytes, float]:
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+    return hashed, time.perf_counter() - started
+
+
+def _hash_passwords(passwords: List[bytes], rounds: int) -> Tuple[List[bytes], float]:
+    started = time.perf_counter()
+    hashed = [bcrypt.hashpw(password, bcrypt.gensalt(rounds)) for password in passwords]
+    return hashed, time.perf_counter() - started
+
+
+def _check_password(password: bytes, hashed: bytes) -> Tuple[bool, float]:
+    started = time.perf_counter()
+    valid = bcrypt.checkpw(password, hashed)
+    return valid, time.perf_counter() - started
+
+
+@dataclass
+class HasherStats:
+    completed: int = 0
+    rejected: int = 0
+    queue_wait_seconds_total: float = 0.0
+    queue_wait_seconds_max: float = 0.0
+    hash_seconds_total: float = 0.0
+    hash_seconds_max: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.hash_seconds_total / self.completed if self.completed else 0.0
+
+    def observe(self, queue_wait: float, hash_time: float, count: int = 1) -> None:
+        """``count`` operations that waited ``queue_wait`` together and took
+        ``hash_time`` between them"""
+        self.completed += count
+        self.queue_wait_seconds_total += queue_wait * count
+        self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+        self.hash_seconds_total += hash_time
+        self.hash_seconds_max = max(self.hash_seconds_max, hash_time / count)
+
+
+@dataclass
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded worker pool.
+
+    At most ``workers + max_queue`` operations are admitted at once; anything
+    beyond that is rejected with a 503 instead of piling up behind the pool.
+    """
+
+    rounds: int
+    workers: int
+    max_queue: int
+    executor_type: Literal["thread", "process"] = "thread"
+    stats: HasherStats = field(default_factory=HasherStats)
+    _executor: Optional[Executor] = field(default=None, init=False, repr=False)
+    _pending: int = field(default=0, init=False, repr=False)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._submit(
+            "hash", _hash_password, password.encode(), self.rounds
+        )
+        return hashed.decode("utf-8")
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hashes in one chunk per worker, so that a process pool pays for one
+        round trip per chunk rather than per password"""
+        if not passwords:
+            return []
+        size = -(-len(passwords) // self.workers)
+        chunks = await asyncio.gather(
+            *(
+                self._submit(
+                    "hash_many",
+                    _hash_passwords,
+                    [password.encode() for password in passwords[i : i + size]],
+                    self.rounds,
+                    count=len(passwords[i : i + size]),
+                )
+                for i in range(0, len(passwords), size)
+            )
+        )
+        return [hashed.decode("utf-8") for chunk in chunks for hashed in chunk]
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(
+            "verify", _check_password, password.encode(), hashed.encode()
+        )
+
+    async def _submit(
+        self,
+        operation: str,
+        fn: Callable[..., Tuple[Any, float]],
+        *args: Any,
+        count: int = 1,
+    ) -> Any:
+        """Runs ``fn``, which handles ``count`` passwords, on the pool; the
+        stats and metrics get one observation per password"""
+        if self._pending >= self.workers + self.max_queue:
+            self.stats.rejected += 1
+            raise ServiceUnavailableException(
+                detail="Server is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_time = await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+        queue_wait = max(time.perf_counter() - started - hash_time, 0.0)
+        self.stats.observe(queue_wait, hash_time, count)
+        for _ in range(count):
+            password_hash_seconds.observe(hash_time / count, operation)
+            password_queue_seconds.observe(queue_wait, operation)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+settings = get_settings()
+
+password_hasher = PasswordHasher(
+    rounds=settings.app.BCRYPT_GENSALT,
+    workers=settings.app.PASSWORD_HASHER_WORKERS or os.cpu_count() or 1,
+    max_queue=settings.app.PASSWORD_HASHER_MAX_QUEUE,
+    executor_type=settings.app.PASSWORD_HASHER_EXECUTOR,
+)
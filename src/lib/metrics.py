@@ -0,0 +1,182 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.config.base import get_settings
+
+# Seconds, from sub-millisecond cache-warm queries up to a slow bcrypt queue
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+@dataclass
+class _Series:
+    # One counter per bucket plus +Inf; made cumulative only when rendered
+    counts: List[int]
+    sum: float = 0.0
+    count: int = 0
+
+
+@dataclass
+class Histogram:
+    """Prometheus histogram with at most one label.
+
+    ``observe`` does nothing while the registry is disabled, so call sites
+    only pay for reading the clock.
+    """
+
+    name: str
+    description: str
+    label: str = ""
+    buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    enabled: bool = True
+    _series: Dict[str, _Series] = field(default_factory=dict, init=False, repr=False)
+
+    def observe(self, value: float, label: str = "") -> None:
+        if not self.enabled:
+            return
+
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = _Series([0] * (len(self.buckets) + 1))
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for label, series in sorted(self._series.items()):
+            pairs = [f'{self.label}="{_escape(label)}"'] if self.label else []
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                le = f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(pairs + [le])} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(pairs + [le])} {series.count}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {series.sum!r}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {series.count}")
+        return lines
+
+
+@dataclass
+class Gauge:
+    """Read when scraped, from whatever owns the value (e.g. the pool)"""
+
+    name: str
+    description: str
+    value: Callable[[], float]
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format(float(self.value()))}",
+        ]
+
+
+@dataclass
+class MetricsRegistry:
+    enabled: bool = True
+    histograms: Dict[str, Histogram] = field(default_factory=dict)
+    gauges: Dict[str, Gauge] = field(default_factory=dict)
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        label: str = "",
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(
+                name, description, label, buckets, enabled=self.enabled
+            )
+        return self.histograms[name]
+
+    def gauge(self, name: str, description: str, value: Callable[[], float]) -> None:
+        """Registers (or replaces, e.g. for a new pool) a gauge"""
+        self.gauges[name] = Gauge(name, description, value)
+
+    def stats_gauges(
+        self, prefix: str, description: str, stats: Callable[[], Any]
+    ) -> None:
+        """One gauge per field of a stats dataclass (``<prefix>_<field>``), plus
+        ``<prefix>_hit_ratio`` when it has one"""
+        names = [f.name for f in fields(stats())]
+        if hasattr(stats(), "hit_ratio"):
+            names.append("hit_ratio")
+        for name in names:
+            self.gauge(
+                f"{prefix}_{name}",
+                f"{description}: {name.replace('_', ' ')}",
+                lambda name=name: getattr(stats(), name),
+            )
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4"""
+        lines: List[str] = []
+        for histogram in self.histograms.values():
+            lines.extend(histogram.render())
+        for gauge in self.gauges.values():
+            lines.extend(gauge.render())
+        return "\n".join(lines) + "\n"
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(value)
+
+
+def _labels(pairs: List[str]) -> str:
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+settings = get_settings()
+
+metrics = MetricsRegistry(enabled=settings.app.METRICS_ENABLED)
+
+pool_acquire_seconds = metrics.histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a pooled database connection",
+    label="site",
+)
+query_seconds = metrics.histogram(
+    "db_query_seconds", "Duration of registered queries", label="query"
+)
+password_hash_seconds = metrics.histogram(
+    "password_hash_seconds",
+    "bcrypt time per operation, excluding the wait for a worker",
+    label="operation",
+)
+password_queue_seconds = metrics.histogram(
+    "password_hash_queue_seconds",
+    "Time bcrypt operations waited for a free worker",
+    label="operation",
+)
+token_seconds = metrics.histogram(
+    "jwt_seconds", "JWT encode and decode time", label="operation"
+)
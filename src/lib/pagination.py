@@ -0,0 +1,25 @@
+import base64
+import binascii
+
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+from uuid import UUID
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(created_at: datetime, uuid: UUID) -> str:
+    """Encode a (created_at, uuid) keyset position as an opaque cursor."""
+    micros = (created_at - EPOCH) // timedelta(microseconds=1)
+    raw = f"{micros}:{uuid}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        micros, uuid = raw.split(":", 1)
+        return EPOCH + timedelta(microseconds=int(micros)), UUID(uuid)
+    except (binascii.Error, UnicodeDecodeError, ValueError, OverflowError):
+        raise ValueError("Invalid cursor")
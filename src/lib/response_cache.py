@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import secrets
+import time
+
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Protocol,
+    Union,
+    runtime_checkable,
+)
+
+from litestar.stores.base import Store
+
+logger = logging.getLogger(__name__)
+
+# In stores that support compare-and-set the shared generation sits next to
+# the pages, which are kept in their own namespace so that invalidating them
+# does not delete the generation as well
+GENERATION_KEY = "generation"
+PAGES_NAMESPACE = "pages"
+
+
+@runtime_checkable
+class ConditionalStore(Protocol):
+    """A store able to write a key only while another key holds a value"""
+
+    async def set_if(
+        self,
+        key: str,
+        value: bytes,
+        expires_in: Union[int, timedelta, None],
+        guard_key: str,
+        guard_value: bytes,
+    ) -> bool: ...
+
+
+@dataclass
+class ResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    invalidations: int = 0
+    # Rebuilds not stored because the cache was invalidated meanwhile
+    stale: int = 0
+    errors: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
+
+
+@dataclass
+class ResponseCache:
+    """Encoded responses kept in a (possibly shared) Litestar store.
+
+    Concurrent misses for the same key in a worker wait for a single rebuild
+    instead of all querying the database. A rebuild that started before an
+    invalidation is returned to its callers but not stored.
+
+    With a :class:`ConditionalStore` that holds for invalidations made by any
+    worker: the store keeps a generation, replaced on every invalidation, and
+    a rebuild is only written while the generation it started with is still
+    there. Such a store must also be a ``NamespacedStore``, to delete the
+    pages without the generation. Other stores only see this worker's
+    invalidations.
+    """
+
+    store: Store
+    ttl: int
+    stats: ResponseCacheStats = field(default_factory=ResponseCacheStats)
+    _inflight: Dict[str, asyncio.Future] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _generation: int = field(default=0, init=False, repr=False)
+    _seen_generation: Optional[bytes] = field(default=None, init=False, repr=False)
+    _invalidated_at: float = field(default=float("-inf"), init=False, repr=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def get_or_build(
+        self, key: str, build: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        if not self.enabled:
+            return await build()
+
+        while (inflight := self._inflight.get(key)) is not None:
+            try:
+                value = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The request rebuilding the page went away; take over
+                continue
+            self.stats.coalesced += 1
+            return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._get(self._page_key(key))
+            if value is not None:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+                value = await self._rebuild(self._page_key(key), build)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; keep the exception from being logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    @property
+    def since_invalidation(self) -> float:
+        """Seconds since this worker last invalidated the cache or, with a
+        conditional store, first rebuilt a page after any worker did"""
+        return time.monotonic() - self._invalidated_at
+
+    @property
+    def _conditional(self) -> bool:
+        return isinstance(self.store, ConditionalStore)
+
+    def _page_key(self, key: str) -> str:
+        return f"{PAGES_NAMESPACE}:{key}" if self._conditional else key
+
+    async def _rebuild(self, key: str, build: Callable[[], Awaitable[bytes]]) -> bytes:
+        if not self._conditional:
+            generation = self._generation
+            value = await build()
+            if generation == self._generation:
+                await self._set(key, value)
+            else:
+                self.stats.stale += 1
+            return value
+
+        shared_generation = await self._shared_generation()
+        if shared_generation != self._seen_generation:
+            # Invalidated elsewhere (or never seen by this worker yet)
+            self._seen_generation = shared_generation
+            self._invalidated_at = time.monotonic()
+        value = await build()
+        if shared_generation is not None:
+            await self._set_if(key, value, shared_generation)
+        return value
+
+    async def _shared_generation(self) -> Optional[bytes]:
+        """The generation in the store, starting one if there is none (the
+        invalidation that deletes it also deletes what was written with it)"""
+        try:
+            generation = await self.store.get(GENERATION_KEY)
+            if generation is None:
+                generation = secrets.token_bytes(8)
+                await self.store.set(GENERATION_KEY, generation)
+            return generation
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Response cache unavailable: {e}")
+            return None
+
+    async def invalidate(self) -> None:
+        self._generation += 1
+        self._invalidated_at = time.monotonic()
+        self.stats.invalidations += 1
+        try:
+            if not self._conditional:
+                await self.store.delete_all()
+                return
+            # Replaced before the pages are deleted: a rebuild still holding
+            # the old generation can no longer store its page, and a page
+            # stored before this is gone with the delete
+            await self.store.set(GENERATION_KEY, secrets.token_bytes(8))
+            await self.store.with_namespace(PAGES_NAMESPACE).delete_all()
+        except Exception as e:
+            self.stats.errors += 1
+            logger.exception(f"Error invalidating the response cache: {e}")
+
+    async def _get(self, key: str):
+        try:
+            return await self.store.get(key)
+        except Exception as e:
+            # An unavailable store only costs a rebuild
+            self.stats.errors += 1
+            logger.warning(f"Response cache unavailable: {e}")
+            return None
+
+    async def _set_if(self, key: str, value: bytes, generation: bytes) -> None:
+        try:
+            stored = await self.store.set_if(
+                key, value, self.ttl, GENERATION_KEY, generation
+            )
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Response cache unavailable: {e}")
+            return
+        if not stored:
+            self.stats.stale += 1
+
+    async def _set(self, key: str, value: bytes) -> None:
+        try:
+            await self.store.set(key, value, expires_in=self.ttl)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Response cache unavailable: {e}")
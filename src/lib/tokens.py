@@ -0,0 +1,142 @@
+import time
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import jwt
+
+from src.config.base import get_settings
+from src.lib.metrics import token_seconds
+
+settings = get_settings()
+
+
+@dataclass
+class KeyRing:
+    """Asymmetric signing keys indexed by ``kid``.
+
+    Tokens are signed with ``signing_kid`` and carry it in their header;
+    verification picks the key named by the header, so tokens signed with a
+    key being rotated out stay valid for as long as that key is in the ring.
+    Keys without a private half only verify.
+    """
+
+    algorithm: str
+    signing_kid: str
+    private_keys: Dict[str, Any] = field(default_factory=dict, repr=False)
+    public_keys: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def load(
+        cls, directory: str, algorithm: str, signing_kid: Optional[str] = None
+    ) -> "KeyRing":
+        """Reads every ``<kid>.pem`` in ``directory``, private or public"""
+        if algorithm not in jwt.algorithms.requires_cryptography:
+            raise ValueError(f"{algorithm} is not an asymmetric JWT algorithm")
+
+        handler = jwt.get_algorithm_by_name(algorithm)
+        private_keys, public_keys = {}, {}
+        for path in sorted(Path(directory).glob("*.pem")):
+            try:
+                key = handler.prepare_key(path.read_bytes())
+            except jwt.InvalidKeyError as e:
+                raise ValueError(f"{path} is not a valid {algorithm} key: {e}")
+            if hasattr(key, "private_bytes"):
+                private_keys[path.stem] = key
+                key = key.public_key()
+            public_keys[path.stem] = key
+
+        if not private_keys:
+            raise ValueError(f"No {algorithm} private key in {directory}")
+        signing_kid = signing_kid or list(private_keys)[-1]
+        if signing_kid not in private_keys:
+            raise ValueError(f"No private key for JWT_SIGNING_KID {signing_kid}")
+
+        return cls(algorithm, signing_kid, private_keys, public_keys)
+
+    @property
+    def signing_key(self) -> Any:
+        return self.private_keys[self.signing_kid]
+
+    def verification_key(self, token: str) -> Any:
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid not in self.public_keys:
+            raise jwt.InvalidKeyError(f"Unknown signing key {kid!r}")
+        return self.public_keys[kid]
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        handler = jwt.get_algorithm_by_name(self.algorithm)
+        keys = []
+        for kid, key in self.public_keys.items():
+            jwk = handler.to_jwk(key, as_dict=True)
+            keys.append({**jwk, "kid": kid, "alg": self.algorithm, "use": "sig"})
+        return {"keys": keys}
+
+
+# None signs with SECRET_KEY (HS256), which only this service can verify
+key_ring = (
+    KeyRing.load(
+        settings.app.JWT_KEYS_DIR,
+        settings.app.JWT_ALGORITHM,
+        settings.app.JWT_SIGNING_KID,
+    )
+    if settings.app.JWT_KEYS_DIR
+    else None
+)
+
+
+def encode_token(payload: Dict[str, Any]) -> str:
+    started = time.perf_counter()
+    try:
+        if key_ring is not None:
+            return jwt.encode(
+                payload,
+                key=key_ring.signing_key,
+                algorithm=key_ring.algorithm,
+                headers={"kid": key_ring.signing_kid},
+            )
+        return jwt.encode(
+            payload,
+            key=settings.app.SECRET_KEY,
+            algorithm=settings.app.JWT_ALGORITHM,
+        )
+    finally:
+        token_seconds.observe(time.perf_counter() - started, "encode")
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Raises PyJWT's exceptions (``ExpiredSignatureError``, ``PyJWTError``)"""
+    started = time.perf_counter()
+    try:
+        if key_ring is not None:
+            return jwt.decode(
+                jwt=token,
+                key=key_ring.verification_key(token),
+                algorithms=[key_ring.algorithm],
+            )
+        return jwt.decode(
+            jwt=token,
+            key=settings.app.SECRET_KEY,
+            algorithms=[settings.app.JWT_ALGORITHM],
+        )
+    finally:
+        token_seconds.observe(time.perf_counter() - started, "decode")
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def session_created_claim(created_at: datetime) -> int:
+    """The ``session_created`` claim: when the session was created, in
+    microseconds, exactly as stored (sessions are partitioned by it)"""
+    return (created_at - EPOCH) // timedelta(microseconds=1)
+
+
+def session_created_at(payload: Dict[str, Any]) -> Optional[datetime]:
+    """The session creation time of a decoded token, if it carries one"""
+    value = payload.get("session_created")
+    if not isinstance(value, int):
+        return None
+    return EPOCH + timedelta(microseconds=value)
@@ -1,17 +1,65 @@
 import hmac
 import hashlib
+import time
 
-from jwt import PyJWTError, ExpiredSignatureError, decode
+from uuid import UUID
+
+from jwt import PyJWTError, ExpiredSignatureError
 
 from litestar.connection import ASGIConnection
-from litestar.exceptions import NotAuthorizedException
+from litestar.exceptions import NotAuthorizedException, PermissionDeniedException
+from litestar.handlers.base import BaseRouteHandler
 from litestar.middleware import AbstractAuthenticationMiddleware, AuthenticationResult
 
 from src.config.base import get_settings
 from src.config import app as config
+from src.db.pool import acquire
+from src.db.queries import queries
+from src.domain.users.schemas import UserRole
+from src.lib.cache import TTLCache
+from src.lib.tokens import decode_token, session_created_at
+from src.server.revocation import revocation_filter
 
 settings = get_settings()
 
+# Authenticated users keyed by (user uuid, hashed access token), grouped by
+# user uuid so that revoking every session of a user drops all of its entries.
+# Invalidation is per worker, so the TTL bounds how long another worker may
+# still accept a revoked session.
+auth_cache = TTLCache(
+    max_size=settings.app.AUTH_CACHE_MAX_SIZE,
+    ttl=settings.app.AUTH_CACHE_TTL_SECONDS,
+)
+
+# The session creation time carried by the token picks its partition; tokens
+# issued without it are looked up in every partition
+GET_SESSION_USER = queries.register(
+    "auth.get_session_user",
+    """
+    select u.uuid, u.name, u.email, u.role, u.status from users u
+    join sessions s on u.uuid = s.user_uuid
+    where u.uuid = $1 and s.access_token = $2 and s.created_at = $3
+      and s.revoked = false and u.status = true
+    """,
+)
+GET_SESSION_USER_ANY_DAY = queries.register(
+    "auth.get_session_user_any_day",
+    """
+    select u.uuid, u.name, u.email, u.role, u.status from users u
+    join sessions s on u.uuid = s.user_uuid
+    where u.uuid = $1 and s.access_token = $2 and s.revoked = false and u.status = true
+    order by s.created_at desc
+    limit 1
+    """,
+)
+
+
+# Stateless verification trusts any valid token whose session is not in the
+# revocation filter, as long as the filter is fresh; tokens issued before the
+# profile and session creation claims existed, or a stale filter, fall back to
+# the session lookup
+STATELESS = settings.app.AUTH_VERIFICATION == "stateless"
+
 
 class AuthenticationMiddleware(AbstractAuthenticationMiddleware):
     @staticmethod
@@ -19,6 +67,17 @@ class AuthenticationMiddleware(AbstractAuthenticationMiddleware):
         """Hash token using HMAC-SHA256 - fast and secure for random tokens."""
         return hmac.new(salt.encode(), token.encode(), hashlib.sha256).hexdigest()
 
+    @staticmethod
+    def _claims_user(auth: dict) -> dict:
+        """The user as the session lookup would return it, from the token"""
+        return {
+            "uuid": UUID(auth["uuid"]),
+            "name": auth["name"],
+            "email": auth["email"],
+            "role": auth["role"],
+            "status": True,
+        }
+
     async def authenticate_request(
         self, connection: ASGIConnection
     ) -> AuthenticationResult:
@@ -27,28 +86,48 @@ class AuthenticationMiddleware(AbstractAuthenticationMiddleware):
             if not token:
                 raise NotAuthorizedException()
 
-            auth = decode(
-                jwt=token,
-                key=settings.app.SECRET_KEY,
-                algorithms=[settings.app.JWT_ALGORITHM],
-            )
+            auth = decode_token(token)
             salt = settings.app.SESSION_SALT
             access_token = self._hash_token(auth["access_token"], salt)
             user_uuid = auth.get("uuid")
 
-            pool = config.asyncpg.provide_pool(connection.scope["app"].state)
-            async with pool.acquire() as conn:
-                query = """
-                    select u.uuid, u.name, u.email, u.role, u.status from users u
-                    join sessions s on u.uuid = s.user_uuid
-                    where u.uuid = $1 and s.access_token = $2 and s.revoked = false and u.status = true
-                    order by s.created_at desc
-                    limit 1
-                """
-                user = await conn.fetchrow(query, user_uuid, access_token)
-
-            if not user:
-                raise NotAuthorizedException()
+            created_at = session_created_at(auth)
+
+            if (
+                STATELESS
+                and revocation_filter.fresh
+                and "email" in auth
+                and created_at is not None
+            ):
+                if revocation_filter.is_revoked(
+                    access_token, user_uuid, created_at.timestamp()
+                ):
+                    raise NotAuthorizedException()
+                return AuthenticationResult(user=self._claims_user(auth), auth=auth)
+
+            cache_key = (user_uuid, access_token)
+            user = auth_cache.get(cache_key)
+            if user is None:
+                query, args = GET_SESSION_USER, (user_uuid, access_token, created_at)
+                if created_at is None:
+                    query, args = GET_SESSION_USER_ANY_DAY, args[:2]
+
+                # Always on the primary, never the replica: a session revoked
+                # or rotated there must stop working at once, not after the
+                # replica lag (and then stay cached for the TTL on top)
+                pool = config.asyncpg.provide_pool(connection.scope["app"].state)
+                async with acquire(pool, "auth") as conn:
+                    user = await queries.fetchrow(conn, query, *args)
+
+                if not user:
+                    raise NotAuthorizedException()
+
+                auth_cache.set(
+                    cache_key,
+                    user,
+                    ttl=auth.get("exp", float("inf")) - time.time(),
+                    group=user_uuid,
+                )
 
         except ExpiredSignatureError:
             raise NotAuthorizedException(detail="Token expired")
@@ -57,3 +136,9 @@ class AuthenticationMiddleware(AbstractAuthenticationMiddleware):
 
         else:
             return AuthenticationResult(user=user, auth=auth)
+
+
+def admin_guard(connection: ASGIConnection, _: BaseRouteHandler) -> None:
+    """Route guard, after ``AuthenticationMiddleware``: admins only"""
+    if connection.user.get("role") != UserRole.ADMIN.value:
+        raise PermissionDeniedException()
@@ -0,0 +1,240 @@
+import asyncio
+import itertools
+import logging
+
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncGenerator, Deque, Iterable, List, Optional, Set, Tuple
+
+import asyncpg
+
+from asyncpg import Connection, Pool
+from litestar.channels import ChannelsBackend
+from litestar.channels.backends.memory import MemoryChannelsBackend
+
+from src.config.base import get_settings
+from src.db.queries import queries
+
+logger = logging.getLogger(__name__)
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more; the rest is left
+# for the sequence prefix
+MAX_MESSAGE_SIZE = 7999 - 24
+
+NOTIFY = queries.register(
+    "channels.notify",
+    """
+    SELECT pg_notify(channel, payload)
+    FROM unnest($1::text[], $2::text[]) AS t(channel, payload)
+    """,
+)
+
+
+@dataclass
+class ChannelsStats:
+    published: int = 0
+    batches: int = 0
+    received: int = 0
+    dropped: int = 0
+    failed: int = 0
+    reconnects: int = 0
+
+
+class PostgresChannelsBackend(ChannelsBackend):
+    """Channels over LISTEN/NOTIFY, so events reach subscribers on every
+    worker and host connected to the same database.
+
+    Publishes are buffered and sent in batches of up to ``max_batch``
+    notifications per round trip on the app pool (bound at startup), after
+    waiting ``batch_interval`` seconds for a burst to accumulate. Publishers
+    wait while ``max_pending`` notifications are buffered; received events
+    beyond ``max_pending`` push out the oldest ones. Subscriptions live on a
+    dedicated connection outside the pool, which is reopened (and every
+    channel listened to again) when it drops or stops answering keepalives.
+    Like NOTIFY itself, delivery is at most once: events sent while the
+    listener is reconnecting are lost, and there is no history.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        batch_interval: float,
+        max_batch: int,
+        max_pending: int,
+        reconnect_interval: float,
+        keepalive: float,
+    ) -> None:
+        self.dsn = dsn
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.reconnect_interval = reconnect_interval
+        self.keepalive = keepalive
+        self.stats = ChannelsStats()
+        self._pool: Optional[Pool] = None
+        self._bound = asyncio.Event()
+        self._channels: Set[str] = set()
+        self._listener: Optional[Connection] = None
+        self._pending: Deque[Tuple[str, str]] = deque()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._events: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Postgres folds identical notifications sent in one transaction, so
+        # every payload gets a unique prefix, stripped again on receipt
+        self._sequence = itertools.count()
+
+    def bind(self, pool: Pool) -> None:
+        self._pool = pool
+        self._bound.set()
+
+    async def on_startup(self) -> None:
+        self._events = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._listen(), name="channels-listener"),
+            asyncio.create_task(self._flush(), name="channels-publisher"),
+        ]
+
+    async def on_shutdown(self) -> None:
+        if self._pool is not None and self._pending:
+            await self._send_pending()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._events = None
+        self._pool = None
+        self._bound = asyncio.Event()
+
+    async def publish(self, data: bytes, channels: Iterable[str]) -> None:
+        payload = data.decode("utf-8")
+        if len(data) > MAX_MESSAGE_SIZE:
+            # Raising would stop the plugin's publishing worker for good
+            self.stats.failed += 1
+            logger.error(f"Channels message of {len(data)} bytes is too large")
+            return
+
+        for channel in channels:
+            while len(self._pending) >= self.max_pending:
+                self._drained.clear()
+                await self._drained.wait()
+            self._pending.append((channel, f"{next(self._sequence)}:{payload}"))
+            self._wakeup.set()
+
+    async def subscribe(self, channels: Iterable[str]) -> None:
+        for channel in set(channels) - self._channels:
+            self._channels.add(channel)
+            if self._listener is not None:
+                await self._listener.add_listener(channel, self._on_notification)
+
+    async def unsubscribe(self, channels: Iterable[str]) -> None:
+        for channel in set(channels) & self._channels:
+            self._channels.discard(channel)
+            if self._listener is not None:
+                await self._listener.remove_listener(channel, self._on_notification)
+
+    async def stream_events(self) -> AsyncGenerator[Tuple[str, bytes], None]:
+        if self._events is None:
+            raise RuntimeError("Backend not started, on_startup was not called")
+
+        while True:
+            channel, payload = await self._events.get()
+            # An UNLISTEN may have been in flight when the event arrived
+            if channel in self._channels:
+                yield channel, payload
+
+    async def get_history(self, channel: str, limit: Optional[int] = None) -> list:
+        # LISTEN/NOTIFY keeps none; subscribers asking for a backlog get nothing
+        return []
+
+    def _on_notification(
+        self, connection: Connection, pid: int, channel: str, payload: str
+    ) -> None:
+        if self._events is None:
+            return
+        if self._events.qsize() >= self.max_pending:
+            self._events.get_nowait()
+            self.stats.dropped += 1
+        self.stats.received += 1
+        _, _, data = payload.partition(":")
+        self._events.put_nowait((channel, data.encode("utf-8")))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                await self._listen_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Channels listener disconnected: {e}")
+            self.stats.reconnects += 1
+            await asyncio.sleep(self.reconnect_interval)
+
+    async def _listen_once(self) -> None:
+        connection = await asyncpg.connect(self.dsn)
+        closed = asyncio.Event()
+        connection.add_termination_listener(lambda _: closed.set())
+        try:
+            # Published first so that channels subscribed meanwhile are not
+            # missed; adding the same listener twice is a no-op
+            self._listener = connection
+            for channel in list(self._channels):
+                await connection.add_listener(channel, self._on_notification)
+
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    await connection.execute("SELECT 1", timeout=self.keepalive)
+        finally:
+            self._listener = None
+            if not connection.is_closed():
+                connection.terminate()
+
+    async def _flush(self) -> None:
+        await self._bound.wait()
+        while True:
+            await self._wakeup.wait()
+            if len(self._pending) < self.max_batch:
+                await asyncio.sleep(self.batch_interval)
+            self._wakeup.clear()
+            await self._send_pending()
+
+    async def _send_pending(self) -> None:
+        while self._pending:
+            count = min(self.max_batch, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(count)]
+            self._drained.set()
+            try:
+                await queries.execute(
+                    self._pool,
+                    NOTIFY,
+                    [channel for channel, _ in batch],
+                    [payload for _, payload in batch],
+                )
+            except Exception as e:
+                self.stats.failed += len(batch)
+                logger.exception(f"Could not publish {len(batch)} channel events: {e}")
+            else:
+                self.stats.batches += 1
+                self.stats.published += len(batch)
+
+
+settings = get_settings()
+
+# Postgres reaches subscribers on every worker and is bound to the pool at
+# startup; memory only reaches the ones of the worker that published
+channels_backend = (
+    PostgresChannelsBackend(
+        dsn=settings.db.DSN,
+        batch_interval=settings.app.CHANNELS_BATCH_INTERVAL_SECONDS,
+        max_batch=settings.app.CHANNELS_MAX_BATCH,
+        max_pending=settings.app.CHANNELS_MAX_PENDING,
+        reconnect_interval=settings.app.CHANNELS_RECONNECT_INTERVAL_SECONDS,
+        keepalive=settings.app.CHANNELS_KEEPALIVE_SECONDS,
+    )
+    if settings.app.CHANNELS_BACKEND == "postgres"
+    else MemoryChannelsBackend()
+)
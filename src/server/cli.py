@@ -0,0 +1,166 @@
+import asyncio
+import os
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+import asyncpg
+
+from litestar.plugins import CLIPluginProtocol
+
+from src.config.base import get_settings
+from src.db.migrate import MigrationError, load_migrations, migrate, status
+from src.db.store import PostgresStore
+from src.domain.users.cache import users_page_cache
+from src.domain.users.importer import (
+    ImportFormat,
+    ImportStats,
+    RowError,
+    UserImporter,
+    read_rows,
+)
+from src.lib.hashing import PasswordHasher
+
+if TYPE_CHECKING:
+    from click import Group
+
+
+async def _run(check_only: bool):
+    conn = await asyncpg.connect(get_settings().db.DSN)
+    try:
+        migrations = load_migrations()
+        if check_only:
+            return await status(conn, migrations)
+        return await migrate(conn, migrations)
+    finally:
+        await conn.close()
+
+
+async def _import_users(
+    path: Path,
+    format: ImportFormat,
+    batch_size: int,
+    workers: int,
+    on_error: Callable[[RowError], None],
+) -> ImportStats:
+    settings = get_settings()
+    # Every core hashes, one chunk of each batch apiece
+    hasher = PasswordHasher(
+        rounds=settings.app.BCRYPT_GENSALT,
+        workers=workers or os.cpu_count() or 1,
+        max_queue=batch_size,
+        executor_type="process",
+    )
+    conn = await asyncpg.connect(settings.db.DSN)
+    importer = UserImporter(conn, hasher, settings.app.MAX_FINGERPRINT_VALUE, on_error)
+    try:
+        return await importer.run(read_rows(path, format), batch_size)
+    finally:
+        hasher.shutdown()
+        await conn.close()
+        # Every batch commits on its own, so a failed import may have added
+        # users as well
+        if importer.stats.imported:
+            await _invalidate_user_pages(settings.db.DSN)
+
+
+async def _invalidate_user_pages(dsn: str) -> None:
+    """Only the shared store can be reached from here; pages in the memory
+    store of each worker are left to expire"""
+    if not users_page_cache.enabled or not isinstance(
+        users_page_cache.store, PostgresStore
+    ):
+        return
+    async with asyncpg.create_pool(dsn, min_size=1, max_size=1) as pool:
+        users_page_cache.store.bind(pool)
+        await users_page_cache.invalidate()
+
+
+class DatabaseCLIPlugin(CLIPluginProtocol):
+    """``litestar db migrate`` / ``litestar db status``"""
+
+    def on_cli_init(self, cli: "Group") -> None:
+        # Only the CLI calls this, so serving the app never imports click
+        import click
+
+        @cli.group(name="db")
+        def db_group() -> None:
+            """Database commands"""
+
+        @db_group.command(name="migrate")
+        def migrate_command() -> None:
+            """Apply pending migrations (safe to run from several hosts at once)"""
+            try:
+                result = asyncio.run(_run(check_only=False))
+            except MigrationError as e:
+                raise click.ClickException(str(e))
+
+            for filename in result.applied:
+                click.echo(f"applied  {filename}")
+            for filename in result.drifted:
+                click.echo(f"changed  {filename}", err=True)
+            if not result.applied:
+                click.echo("Already at head")
+
+        @db_group.command(name="status")
+        def status_command() -> None:
+            """List pending and changed migrations; exits 1 if there are any"""
+            result = asyncio.run(_run(check_only=True))
+            for filename in result.pending:
+                click.echo(f"pending  {filename}")
+            for filename in result.drifted:
+                click.echo(f"changed  {filename}")
+            if result.pending or result.drifted:
+                raise SystemExit(1)
+            click.echo("At head")
+
+
+class UsersCLIPlugin(CLIPluginProtocol):
+    """``litestar users import``"""
+
+    def on_cli_init(self, cli: "Group") -> None:
+        import click
+
+        @cli.group(name="users")
+        def users_group() -> None:
+            """User commands"""
+
+        @users_group.command(name="import")
+        @click.argument(
+            "path", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+        )
+        @click.option(
+            "--format",
+            "format_",
+            type=click.Choice(["csv", "ndjson"]),
+            help="Defaults to the file extension",
+        )
+        @click.option("--batch-size", default=1000, show_default=True)
+        @click.option("--workers", default=0, help="Hashing processes (0: one per CPU)")
+        def import_command(
+            path: Path, format_: ImportFormat, batch_size: int, workers: int
+        ) -> None:
+            """Create users from a CSV (name,email,password header) or NDJSON file.
+
+            Passwords that are already bcrypt hashes are stored as they are.
+            Rows that fail are listed with their line; exits 1 if there are any.
+            """
+            format_ = format_ or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+
+            def on_error(error: RowError) -> None:
+                click.echo(
+                    f"line {error.line}: {error.email}: {error.reason}", err=True
+                )
+
+            stats = asyncio.run(
+                _import_users(path, format_, batch_size, workers, on_error)
+            )
+            click.echo(
+                f"imported {stats.imported} of {stats.rows} rows in "
+                f"{stats.elapsed:.1f}s ({stats.rows_per_second:.0f} rows/s); "
+                f"{stats.hashed} hashed in {stats.hash_seconds:.1f}s, "
+                f"{stats.prehashed} pre-hashed, loaded in {stats.load_seconds:.1f}s"
+            )
+            if stats.failed:
+                click.echo(f"{stats.failed} rows failed", err=True)
+                raise SystemExit(1)
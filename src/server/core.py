@@ -9,10 +9,13 @@ from src.config.app import (
     compression as compression_config,
     cors as cors_config,
     csrf as csrf_config,
-    rate_limit_config,
+    settings,
 )
 from src.server.lifespan import on_shutdown, on_startup
+from src.server.jwks import jwks_handler
+from src.server.metrics import metrics_handler
 from src.server.plugins import get_plugins
+from src.server.rate_limit import rate_limit_middleware
 
 
 class ApplicationCore(InitPluginProtocol):
@@ -20,6 +23,10 @@ class ApplicationCore(InitPluginProtocol):
         from src.domain.users.controllers import UserController
 
         app_config.route_handlers.extend([UserController])
+        if settings.app.METRICS_ENABLED:
+            app_config.route_handlers.append(metrics_handler)
+        if settings.app.JWT_KEYS_DIR:
+            app_config.route_handlers.append(jwks_handler)
 
         app_config.plugins.extend(get_plugins())
 
@@ -27,7 +34,8 @@ class ApplicationCore(InitPluginProtocol):
         app_config.csrf_config = csrf_config
         app_config.compression_config = compression_config
 
-        app_config.middleware.extend([rate_limit_config.middleware])
+        if settings.app.RATE_LIMIT_ENABLED:
+            app_config.middleware.extend([rate_limit_middleware])
 
         app_config.dependencies.update(
             {
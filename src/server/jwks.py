@@ -0,0 +1,23 @@
+from litestar import Response, get
+from litestar.datastructures import CacheControlHeader
+from litestar.serialization import encode_json
+
+from src.config.base import get_settings
+from src.lib.tokens import key_ring
+
+settings = get_settings()
+
+# The ring only changes on restart, so the document is built once
+JWKS = encode_json(key_ring.jwks()) if key_ring is not None else b""
+
+
+@get(
+    path="/.well-known/jwks.json",
+    include_in_schema=False,
+    sync_to_thread=False,
+    cache_control=CacheControlHeader(
+        max_age=settings.app.JWKS_MAX_AGE_SECONDS, public=True
+    ),
+)
+def jwks_handler() -> Response[bytes]:
+    return Response(content=JWKS, media_type="application/jwk-set+json")
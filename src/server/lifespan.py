@@ -2,44 +2,192 @@ import logging
 
 from litestar import Litestar
 from src.config import app as config
-from src.config.constants import MIGRATIONS_DIR
+from src.db.migrate import MigrationError, load_migrations, migrate
+from src.db.pool import register_pool_gauges
+from src.db.queries import queries
+from src.db.replica import replica_router
+from src.db.store import PostgresStore
+from src.domain.users.cache import users_page_cache
+from src.domain.users.tasks import maintain_session_partitions, retention_stats
+from src.domain.users.writer import session_writer
+from src.lib.hashing import password_hasher
+from src.lib.metrics import metrics
+from src.server.auth import auth_cache
+from src.server.channels import PostgresChannelsBackend, channels_backend
+from src.server.lockout import login_lockout
+from src.server.rate_limit import rate_limiter
+from src.server.revocation import revocation_filter
+from src.server.tasks import start_background_task, stop_background_tasks
 
 logger = logging.getLogger(__name__)
 
 
 async def on_startup(app: Litestar) -> None:
     pool = config.asyncpg.provide_pool(app.state)
-    migration_files = sorted(MIGRATIONS_DIR.glob("*.sql"))
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS _migrations (
-                id SERIAL PRIMARY KEY,
-                filename TEXT UNIQUE NOT NULL,
-                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            )
-        """
-        )
-        rows = await conn.fetch("SELECT filename FROM _migrations")
-        applied = set(row["filename"] for row in rows)
-        for sql_path in migration_files:
+    if config.settings.app.MIGRATIONS_ON_STARTUP:
+        async with pool.acquire() as conn:
             try:
-                if sql_path.name in applied:
-                    continue
-                with sql_path.open("r", encoding="utf-8") as file:
-                    sql = file.read()
-                    async with conn.transaction():
-                        await conn.execute(sql)
-                        await conn.execute(
-                            "INSERT INTO _migrations (filename) VALUES ($1)",
-                            sql_path.name,
-                        )
+                await migrate(conn, load_migrations())
+            except MigrationError as e:
+                logger.exception(str(e))
+
+    # Prepare the registered statements on the initial connections, all at
+    # once, now that the migrations above created their tables
+    await queries.warm_up(pool, config.settings.db.MIN_SIZE)
+
+    if metrics.enabled:
+        register_pool_gauges(pool)
+        metrics.stats_gauges(
+            "auth_cache", "Cache of authenticated sessions", lambda: auth_cache.stats
+        )
+        metrics.gauge(
+            "auth_cache_entries", "Sessions in the auth cache", lambda: len(auth_cache)
+        )
+        metrics.gauge(
+            "password_hash_pending",
+            "bcrypt operations running or queued",
+            lambda: password_hasher.pending,
+        )
+
+    if replica_router.enabled:
+        await replica_router.check()
+        start_background_task(
+            app,
+            "replica-health",
+            config.settings.db.REPLICA_HEALTH_CHECK_INTERVAL_SECONDS,
+            replica_router.check,
+        )
+        if metrics.enabled:
+            metrics.gauge(
+                "db_replica_healthy",
+                "Whether read-only queries go to the replica",
+                lambda: replica_router.healthy,
+            )
+            metrics.gauge(
+                "db_replica_lag_seconds",
+                "Replica lag at the last health check",
+                lambda: replica_router.stats.lag_seconds,
+            )
+
+    if isinstance(users_page_cache.store, PostgresStore):
+        users_page_cache.store.bind(pool)
+    if users_page_cache.enabled and metrics.enabled:
+        metrics.stats_gauges(
+            "response_cache", "Cache of user list pages", lambda: users_page_cache.stats
+        )
+
+    if isinstance(channels_backend, PostgresChannelsBackend):
+        channels_backend.bind(pool)
+
+    if config.settings.app.SESSION_WRITER_ENABLED:
+        session_writer.start(pool)
+
+    start_background_task(
+        app,
+        "sessions-retention",
+        config.settings.app.SESSIONS_RETENTION_INTERVAL_SECONDS,
+        lambda: maintain_session_partitions(pool),
+    )
+    if metrics.enabled:
+        metrics.stats_gauges(
+            "sessions_retention",
+            "Session partition retention on this worker",
+            lambda: retention_stats,
+        )
+
+    if config.settings.app.AUTH_VERIFICATION == "stateless":
+        try:
+            await revocation_filter.refresh(pool)
+        except Exception as e:
+            # Requests are verified against the database until a refresh works
+            logger.exception(f"Could not load session revocations: {e}")
+        start_background_task(
+            app,
+            "session-revocations",
+            config.settings.app.AUTH_REVOCATION_POLL_SECONDS,
+            lambda: revocation_filter.refresh(pool),
+        )
+        if metrics.enabled:
+            metrics.gauge(
+                "auth_revocation_staleness_seconds",
+                "Time since the revocation filter was last refreshed",
+                lambda: revocation_filter.staleness,
+            )
+
+    # The triggers log revocations in either mode, so that switching to
+    # stateless finds them; the log is kept short in both
+    start_background_task(
+        app,
+        "session-revocations-purge",
+        config.settings.app.SESSIONS_RETENTION_INTERVAL_SECONDS,
+        lambda: revocation_filter.purge(pool),
+    )
+
+    if config.settings.app.RATE_LIMIT_ENABLED:
+        start_background_task(
+            app,
+            "rate-limits-purge",
+            config.settings.app.RATE_LIMIT_PURGE_INTERVAL_SECONDS,
+            lambda: rate_limiter.purge(pool),
+        )
+
+    if config.settings.app.LOGIN_LOCKOUT_ENABLED:
+        if config.settings.app.LOGIN_LOCKOUT_PERSIST:
+            sync_seconds = config.settings.app.LOGIN_LOCKOUT_SYNC_SECONDS
+            try:
+                await login_lockout.sync(pool, overlap=sync_seconds)
             except Exception as e:
-                logger.exception(f"Error applying migration {sql_path.name}: {e}")
-                break
+                # Counters start empty and are merged in by the next sync
+                logger.exception(f"Could not load login failures: {e}")
+            start_background_task(
+                app,
+                "login-failures-sync",
+                sync_seconds,
+                lambda: login_lockout.sync(pool, overlap=sync_seconds),
+            )
+            start_background_task(
+                app,
+                "login-failures-purge",
+                config.settings.app.RATE_LIMIT_PURGE_INTERVAL_SECONDS,
+                lambda: login_lockout.purge(pool),
+            )
+        if metrics.enabled:
+            metrics.gauge(
+                "login_lockout_locks",
+                "Accounts and IPs locked after failed logins",
+                lambda: login_lockout.stats.locks,
+            )
+            metrics.gauge(
+                "login_lockout_rejected",
+                "Logins rejected by a lock, before bcrypt",
+                lambda: login_lockout.stats.rejected,
+            )
+            metrics.gauge(
+                "login_lockout_saved_seconds",
+                "bcrypt time not spent on rejected logins (estimated)",
+                lambda: login_lockout.stats.saved_seconds,
+            )
+            metrics.gauge(
+                "login_lockout_entries",
+                "Failed login counters held in memory",
+                lambda: len(login_lockout),
+            )
+
+    if users_page_cache.enabled:
+        start_background_task(
+            app,
+            "response-cache-purge",
+            config.settings.app.RESPONSE_CACHE_PURGE_INTERVAL_SECONDS,
+            users_page_cache.store.delete_expired,
+        )
 
 
 async def on_shutdown(app: Litestar) -> None:
+    await stop_background_tasks(app)
+    await session_writer.stop()
+    await replica_router.close()
+    password_hasher.shutdown()
+
     try:
         pool = config.asyncpg.provide_pool(app.state)
         if pool and not pool.is_closing():
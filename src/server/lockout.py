@@ -0,0 +1,275 @@
+import hashlib
+import logging
+import math
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional, Set, Tuple, Union
+
+from asyncpg import Connection, Pool, Record
+
+from src.config.base import get_settings
+from src.db.queries import queries
+from src.lib.hashing import password_hasher
+
+logger = logging.getLogger(__name__)
+
+LOAD_FAILURES = queries.register(
+    "login_failures.load",
+    """
+    SELECT key, failures, locked_until, updated_at FROM login_failures
+    WHERE updated_at > now() - make_interval(secs => $1)
+    """,
+)
+LOAD_FAILURES_SINCE = queries.register(
+    "login_failures.load_since",
+    """
+    SELECT key, failures, locked_until, updated_at FROM login_failures
+    WHERE updated_at > $1
+    """,
+)
+# Workers count failures of the same key independently; the larger count wins,
+# unless the stored one was idle long enough to be reset
+SAVE_FAILURES = queries.register(
+    "login_failures.save",
+    """
+    INSERT INTO login_failures (key, failures, locked_until)
+    SELECT * FROM unnest($1::bytea[], $2::int[], $3::float8[])
+    ON CONFLICT (key) DO UPDATE SET
+        failures = CASE
+            WHEN login_failures.updated_at < now() - make_interval(secs => $4)
+            THEN EXCLUDED.failures
+            ELSE GREATEST(login_failures.failures, EXCLUDED.failures)
+        END,
+        locked_until = GREATEST(login_failures.locked_until, EXCLUDED.locked_until),
+        updated_at = clock_timestamp()
+    """,
+)
+# Cleared counters are kept at zero until purged rather than deleted, so that
+# the other workers load the clear and drop their own copy
+CLEAR_FAILURES = queries.register(
+    "login_failures.clear",
+    """
+    INSERT INTO login_failures (key, failures, locked_until)
+    SELECT key, 0, 0 FROM unnest($1::bytea[]) AS t(key)
+    ON CONFLICT (key) DO UPDATE SET
+        failures = 0, locked_until = 0, updated_at = clock_timestamp()
+    """,
+)
+PURGE_FAILURES = queries.register(
+    "login_failures.purge",
+    """
+    DELETE FROM login_failures
+    WHERE updated_at < now() - make_interval(secs => $1)
+      AND locked_until < extract(epoch FROM now())
+    """,
+)
+
+
+@dataclass
+class LockoutStats:
+    failures: int = 0
+    locks: int = 0
+    rejected: int = 0
+    # bcrypt time not spent on rejected attempts, at the mean cost so far
+    saved_seconds: float = 0.0
+    evictions: int = 0
+    syncs: int = 0
+    sync_failures: int = 0
+
+
+@dataclass
+class LoginLockout:
+    """Failed-login counters per account and per client IP, checked before
+    the password is hashed.
+
+    A key reaching its threshold of failures is locked for ``base_seconds``,
+    doubled by every further failure up to ``max_seconds``. Attempts on a
+    locked key are rejected without running bcrypt and do not extend the
+    lock; a successful login clears the account's counter, not the IP's.
+    Counters idle for ``reset_seconds`` are forgotten.
+
+    Keys are 8-byte digests of the email or IP keyed with ``salt`` (the
+    SESSION_SALT setting, read when first needed, by default), in an LRU
+    bounded to ``max_entries``. With persistence, ``sync`` writes the
+    counters changed since the last sync to ``login_failures`` and reads back
+    the ones other workers changed, clears included, so that locks are shared
+    and survive restarts.
+    """
+
+    account_threshold: int
+    ip_threshold: int
+    base_seconds: float
+    max_seconds: float
+    reset_seconds: float
+    max_entries: int
+    salt: Optional[bytes] = field(default=None, repr=False)
+    enabled: bool = True
+    stats: LockoutStats = field(default_factory=LockoutStats)
+    # Digest -> (failures, locked until, last failure), epoch seconds
+    _entries: "OrderedDict[bytes, Tuple[int, float, float]]" = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    _dirty: Set[bytes] = field(default_factory=set, init=False, repr=False)
+    _cleared: Set[bytes] = field(default_factory=set, init=False, repr=False)
+    _cursor: Optional[datetime] = field(default=None, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, kind: str, value: str) -> bytes:
+        if self.salt is None:
+            self.salt = get_settings().app.SESSION_SALT.encode()
+        return hashlib.blake2b(
+            f"{kind}:{value}".encode(), digest_size=8, key=self.salt[:64]
+        ).digest()
+
+    def _keys(self, email: str, ip: str) -> Tuple[Tuple[bytes, int], ...]:
+        return (
+            (self._key("account", email.strip().lower()), self.account_threshold),
+            (self._key("ip", ip), self.ip_threshold),
+        )
+
+    def check(self, email: str, ip: str) -> Optional[int]:
+        """Returns the seconds to wait when the account or the IP is locked"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        locked_until = max(
+            self._entries.get(key, (0, 0.0, 0.0))[1] for key, _ in self._keys(email, ip)
+        )
+        if locked_until <= now:
+            return None
+
+        self.stats.rejected += 1
+        self.stats.saved_seconds += password_hasher.stats.mean_seconds
+        return max(math.ceil(locked_until - now), 1)
+
+    def failure(self, email: str, ip: str) -> None:
+        if not self.enabled:
+            return
+
+        now = time.time()
+        self.stats.failures += 1
+        for key, threshold in self._keys(email, ip):
+            failures, _, last = self._entries.get(key, (0, 0.0, 0.0))
+            if now - last > self.reset_seconds:
+                failures = 0
+            failures += 1
+
+            locked_until = 0.0
+            if failures >= threshold:
+                backoff = self.base_seconds * 2 ** min(failures - threshold, 32)
+                locked_until = now + min(backoff, self.max_seconds)
+                self.stats.locks += 1
+            self._store(key, (failures, locked_until, now))
+
+    def success(self, email: str) -> None:
+        if not self.enabled:
+            return
+
+        key = self._key("account", email.strip().lower())
+        if self._entries.pop(key, None) is not None:
+            self._dirty.discard(key)
+            self._cleared.add(key)
+
+    def _store(self, key: bytes, entry: Tuple[int, float, float]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._dirty.add(key)
+        self._cleared.discard(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _prune(self) -> None:
+        now = time.time()
+        for key, (_, locked_until, last) in list(self._entries.items()):
+            if locked_until <= now and now - last > self.reset_seconds:
+                del self._entries[key]
+
+    async def sync(self, db: Union[Pool, Connection], overlap: float) -> None:
+        """Saves the local changes and merges in the counters changed elsewhere
+        since the last sync (re-reading ``overlap`` seconds before it)"""
+        dirty = [key for key in self._dirty if key in self._entries]
+        cleared = list(self._cleared)
+        self._dirty, self._cleared = set(), set()
+        try:
+            if dirty:
+                await queries.execute(
+                    db,
+                    SAVE_FAILURES,
+                    dirty,
+                    [self._entries[key][0] for key in dirty],
+                    [self._entries[key][1] for key in dirty],
+                    self.reset_seconds,
+                )
+            if cleared:
+                await queries.execute(db, CLEAR_FAILURES, cleared)
+            if self._cursor is None:
+                rows = await queries.fetch(db, LOAD_FAILURES, self.reset_seconds)
+            else:
+                since = self._cursor - timedelta(seconds=overlap)
+                rows = await queries.fetch(db, LOAD_FAILURES_SINCE, since)
+        except Exception:
+            # Retried on the next sync
+            self._dirty.update(dirty)
+            # Unless the key failed again since: saving it must win then
+            self._cleared.update(key for key in cleared if key not in self._entries)
+            self.stats.sync_failures += 1
+            raise
+
+        now = time.time()
+        for row in rows:
+            self._merge(bytes(row["key"]), row, now)
+            if self._cursor is None or row["updated_at"] > self._cursor:
+                self._cursor = row["updated_at"]
+        self._evict()
+
+        self._prune()
+        self.stats.syncs += 1
+
+    def _merge(self, key: bytes, row: Record, now: float) -> None:
+        """Merges a counter saved by any worker into the local one"""
+        entry = self._entries.get(key)
+        updated_at = row["updated_at"].timestamp()
+        if row["failures"] == 0:
+            # Cleared by a successful login, unless this worker saw a failure
+            # since
+            if entry is not None and entry[2] <= updated_at:
+                del self._entries[key]
+                self._dirty.discard(key)
+            return
+
+        failures, locked_until, last = entry or (0, 0.0, 0.0)
+        # A count idle for reset_seconds starts over, on either side
+        if now - last > self.reset_seconds:
+            failures = 0
+        remote = row["failures"] if now - updated_at <= self.reset_seconds else 0
+        self._entries[key] = (
+            max(failures, remote),
+            max(locked_until, row["locked_until"]),
+            max(last, updated_at),
+        )
+
+    async def purge(self, db: Union[Pool, Connection]) -> None:
+        await queries.execute(db, PURGE_FAILURES, self.reset_seconds)
+
+
+settings = get_settings()
+
+login_lockout = LoginLockout(
+    account_threshold=settings.app.LOGIN_LOCKOUT_ACCOUNT_THRESHOLD,
+    ip_threshold=settings.app.LOGIN_LOCKOUT_IP_THRESHOLD,
+    base_seconds=settings.app.LOGIN_LOCKOUT_BASE_SECONDS,
+    max_seconds=settings.app.LOGIN_LOCKOUT_MAX_SECONDS,
+    reset_seconds=settings.app.LOGIN_LOCKOUT_RESET_SECONDS,
+    max_entries=settings.app.LOGIN_LOCKOUT_MAX_ENTRIES,
+    enabled=settings.app.LOGIN_LOCKOUT_ENABLED,
+)
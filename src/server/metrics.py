@@ -0,0 +1,13 @@
+from litestar import Response, get
+
+from src.config.base import get_settings
+from src.lib.metrics import metrics
+
+settings = get_settings()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@get(path=settings.app.METRICS_PATH, include_in_schema=False, sync_to_thread=False)
+def metrics_handler() -> Response[str]:
+    return Response(content=metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,17 +1,20 @@
 from litestar.channels import ChannelsPlugin
-from litestar.channels.backends.memory import MemoryChannelsBackend
 from litestar_asyncpg import AsyncpgPlugin
 
 from src.config import app as config
+from src.server.channels import channels_backend
+from src.server.cli import DatabaseCLIPlugin, UsersCLIPlugin
 
 
 asyncpg = AsyncpgPlugin(config=config.asyncpg)
 channels = ChannelsPlugin(
-    backend=MemoryChannelsBackend(),
+    backend=channels_backend,
     channels=["notifications"],
     create_ws_route_handlers=True,
+    subscriber_max_backlog=config.settings.app.CHANNELS_SUBSCRIBER_MAX_BACKLOG,
+    subscriber_backlog_strategy="dropleft",
 )
 
 
 def get_plugins() -> list:
-    return [asyncpg, channels]
+    return [asyncpg, channels, DatabaseCLIPlugin(), UsersCLIPlugin()]
@@ -0,0 +1,258 @@
+import ipaddress
+import logging
+import math
+import time
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Literal, Optional, Protocol, Tuple, Union
+
+from asyncpg import Connection, Pool
+from litestar.exceptions import TooManyRequestsException
+from litestar.middleware import ASGIMiddleware
+from litestar.enums import ScopeType
+from litestar.types import ASGIApp, Receive, Scope, Send
+
+from src.config import app as config
+from src.db.queries import queries
+
+logger = logging.getLogger(__name__)
+
+DurationUnit = Literal["second", "minute", "hour", "day"]
+DURATIONS: Dict[DurationUnit, int] = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+INCREMENT_RATE_LIMIT = queries.register(
+    "rate_limits.increment",
+    """
+    INSERT INTO rate_limits (key, window_start, expires_at) VALUES ($1, $2, $3)
+    ON CONFLICT (key, window_start) DO UPDATE SET hits = rate_limits.hits + 1
+    RETURNING hits
+    """,
+)
+PURGE_RATE_LIMITS = queries.register(
+    "rate_limits.purge", "DELETE FROM rate_limits WHERE expires_at < $1"
+)
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    unit: DurationUnit
+    limit: int
+
+    @property
+    def window(self) -> int:
+        return DURATIONS[self.unit]
+
+
+class RateLimitBackend(Protocol):
+    async def increment(
+        self, db: Union[Pool, Connection], key: str, window_start: int, expires_at: int
+    ) -> int: ...
+
+    async def purge(self, db: Union[Pool, Connection], now: int) -> None: ...
+
+
+@dataclass
+class MemoryRateLimitBackend:
+    """Per-process counters: every worker enforces the limits on its own"""
+
+    windows: Dict[str, Tuple[int, int, int]] = field(default_factory=dict)
+
+    async def increment(
+        self, db: Union[Pool, Connection], key: str, window_start: int, expires_at: int
+    ) -> int:
+        start, _, hits = self.windows.get(key, (window_start, expires_at, 0))
+        hits = hits + 1 if start == window_start else 1
+        self.windows[key] = (window_start, expires_at, hits)
+        return hits
+
+    async def purge(self, db: Union[Pool, Connection], now: int) -> None:
+        self.windows = {
+            key: window for key, window in self.windows.items() if window[1] >= now
+        }
+
+
+class PostgresRateLimitBackend:
+    """Counters in an UNLOGGED table, shared by every worker and host"""
+
+    async def increment(
+        self, db: Union[Pool, Connection], key: str, window_start: int, expires_at: int
+    ) -> int:
+        return await queries.fetchval(
+            db, INCREMENT_RATE_LIMIT, key, window_start, expires_at
+        )
+
+    async def purge(self, db: Union[Pool, Connection], now: int) -> None:
+        await queries.execute(db, PURGE_RATE_LIMITS, now)
+
+
+@dataclass
+class RateLimiterStats:
+    allowed: int = 0
+    rejected: int = 0
+    errors: int = 0
+
+
+@dataclass
+class RateLimiter:
+    """Fixed-window counters keyed by bucket and client identifier"""
+
+    backend: RateLimitBackend
+    enabled: bool = True
+    stats: RateLimiterStats = field(default_factory=RateLimiterStats)
+
+    async def hit(
+        self,
+        db: Union[Pool, Connection],
+        bucket: str,
+        identifier: str,
+        policy: RateLimitPolicy,
+    ) -> Optional[int]:
+        """Counts one hit and returns the seconds to wait when over the limit"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        window_start = int(now // policy.window) * policy.window
+        expires_at = window_start + policy.window
+
+        try:
+            hits = await self.backend.increment(
+                db, f"{bucket}:{identifier}", window_start, expires_at
+            )
+        except Exception as e:
+            # Fail open: an unavailable limiter must not take the API down
+            self.stats.errors += 1
+            logger.warning(f"Rate limiter unavailable: {e}")
+            return None
+
+        if hits > policy.limit:
+            self.stats.rejected += 1
+            return max(math.ceil(expires_at - now), 1)
+
+        self.stats.allowed += 1
+        return None
+
+    async def check(
+        self,
+        db: Union[Pool, Connection],
+        bucket: str,
+        identifier: str,
+        policy: RateLimitPolicy,
+    ) -> None:
+        retry_after = await self.hit(db, bucket, identifier, policy)
+        if retry_after is not None:
+            raise TooManyRequestsException(
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    async def purge(self, db: Union[Pool, Connection]) -> None:
+        await self.backend.purge(db, int(time.time()))
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(values: Iterable[str]) -> List[Network]:
+    return [ipaddress.ip_network(value, strict=False) for value in values if value]
+
+
+def _is_trusted(address: str, proxies: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in proxies)
+
+
+def get_client_ip(scope: Scope) -> str:
+    """The address the connection comes from.
+
+    Forwarding headers are only read when that address is one of
+    ``trusted_proxies``; the client is then the right-most X-Forwarded-For
+    hop that is not a trusted proxy, since everything to its left was sent
+    by the client and can be anything.
+    """
+    client = scope.get("client")
+    ip = client[0] if client else "unknown"
+    if not _is_trusted(ip, trusted_proxies):
+        return ip
+
+    hops = [
+        hop.strip()
+        for name, value in scope["headers"]
+        if name == b"x-forwarded-for"
+        for hop in value.decode("latin-1").split(",")
+        if hop.strip()
+    ]
+    if not hops:
+        real_ip = dict(scope["headers"]).get(b"x-real-ip")
+        return real_ip.decode("latin-1").strip() if real_ip else ip
+
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted_proxies):
+            return hop
+    # Every hop is a trusted proxy: the left-most one is the closest to the client
+    return hops[0]
+
+
+class RateLimitMiddleware(ASGIMiddleware):
+    """Limits requests per client IP, counted by ``limiter``.
+
+    Routes with an ``opt["rate_limit"]`` policy are counted in their own
+    bucket; every other route shares ``default_policy``. Both go through the
+    same backend, so with the Postgres one a limit holds across all workers.
+    """
+
+    scopes = (ScopeType.HTTP, ScopeType.WEBSOCKET)
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        default_policy: RateLimitPolicy,
+        exclude: Optional[Tuple[str, ...]] = None,
+    ) -> None:
+        self.limiter = limiter
+        self.default_policy = default_policy
+        self.exclude_path_pattern = exclude
+
+    async def handle(
+        self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp
+    ) -> None:
+        route_handler = scope["route_handler"]
+        policy = route_handler.opt.get("rate_limit")
+        if policy:
+            bucket, policy = route_handler.handler_name, RateLimitPolicy(*policy)
+        else:
+            bucket, policy = "default", self.default_policy
+
+        pool = config.asyncpg.provide_pool(scope["app"].state)
+        await self.limiter.check(pool, bucket, get_client_ip(scope), policy)
+        await next_app(scope, receive, send)
+
+
+settings = config.settings
+
+trusted_proxies = parse_networks(settings.app.TRUSTED_PROXIES)
+
+rate_limiter = RateLimiter(
+    backend=(
+        PostgresRateLimitBackend()
+        if settings.app.RATE_LIMIT_BACKEND == "postgres"
+        else MemoryRateLimitBackend()
+    ),
+    enabled=settings.app.RATE_LIMIT_ENABLED,
+)
+
+login_policy = RateLimitPolicy("minute", settings.app.LOGIN_RATE_LIMIT_PER_MINUTE)
+
+rate_limit_middleware = RateLimitMiddleware(
+    limiter=rate_limiter,
+    default_policy=RateLimitPolicy("second", settings.app.RATE_LIMIT_PER_SECOND),
+    exclude=("/schema",),
+)
@@ -0,0 +1,153 @@
+import logging
+import time
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Union
+
+from asyncpg import Connection, Pool
+
+from src.config.base import get_settings
+from src.db.queries import queries
+
+logger = logging.getLogger(__name__)
+
+LOAD_REVOCATIONS = queries.register(
+    "session_revocations.load",
+    """
+    SELECT access_token, user_uuid, revoked_at FROM session_revocations
+    WHERE revoked_at > now() - make_interval(secs => $1)
+    """,
+)
+LOAD_REVOCATIONS_SINCE = queries.register(
+    "session_revocations.load_since",
+    """
+    SELECT access_token, user_uuid, revoked_at FROM session_revocations
+    WHERE revoked_at > $1
+    """,
+)
+PURGE_REVOCATIONS = queries.register(
+    "session_revocations.purge",
+    """
+    DELETE FROM session_revocations
+    WHERE revoked_at < now() - make_interval(secs => $1)
+    """,
+)
+
+
+@dataclass
+class RevocationStats:
+    refreshes: int = 0
+    failures: int = 0
+    rejected: int = 0
+
+
+@dataclass
+class RevocationFilter:
+    """In-memory denylist of revoked access tokens, for stateless verification.
+
+    Holds the HMAC digests of revoked access tokens and the deactivated users,
+    loaded from ``session_revocations`` at startup and refreshed by polling
+    for rows newer than the last one seen (re-reading ``overlap`` seconds to
+    catch transactions that committed late). Entries are dropped once every
+    token they could match has expired (``retention``). ``fresh`` turns false
+    when no refresh succeeded for ``max_staleness`` seconds, which is the
+    bound on how late another worker's revocation can be seen; callers must
+    then verify against the database.
+    """
+
+    retention: float
+    max_staleness: float
+    overlap: float
+    stats: RevocationStats = field(default_factory=RevocationStats)
+    # Digest -> revocation time (epoch seconds)
+    _tokens: Dict[bytes, float] = field(default_factory=dict, init=False, repr=False)
+    _users: Dict[str, float] = field(default_factory=dict, init=False, repr=False)
+    _cursor: Optional[datetime] = field(default=None, init=False, repr=False)
+    _synced_at: Optional[float] = field(default=None, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._tokens) + len(self._users)
+
+    @property
+    def fresh(self) -> bool:
+        return (
+            self._synced_at is not None
+            and time.monotonic() - self._synced_at <= self.max_staleness
+        )
+
+    @property
+    def staleness(self) -> float:
+        if self._synced_at is None:
+            return float("inf")
+        return time.monotonic() - self._synced_at
+
+    def revoke(self, access_token: str) -> None:
+        """Applies a revocation made by this worker right away"""
+        self._tokens[bytes.fromhex(access_token)] = time.time()
+
+    def revoke_users(
+        self, user_uuids: Iterable[str], before: Optional[float] = None
+    ) -> None:
+        """Applies a revocation of the tokens of every session these users
+        created before ``before`` (now by default)"""
+        before = time.time() if before is None else before
+        for user_uuid in user_uuids:
+            self._users[user_uuid] = max(before, self._users.get(user_uuid, 0.0))
+
+    def is_revoked(
+        self, access_token: str, user_uuid: str, session_created: float
+    ) -> bool:
+        """``session_created`` is the creation time of the token's session,
+        to the microsecond like ``revoked_at``: the whole-second ``iat`` would
+        let a token issued just before a revocation through, or reject one
+        issued just after"""
+        revoked = bytes.fromhex(access_token) in self._tokens or (
+            user_uuid in self._users and session_created < self._users[user_uuid]
+        )
+        if revoked:
+            self.stats.rejected += 1
+        return revoked
+
+    async def refresh(self, db: Union[Pool, Connection]) -> None:
+        try:
+            if self._cursor is None:
+                rows = await queries.fetch(db, LOAD_REVOCATIONS, self.retention)
+            else:
+                since = self._cursor - timedelta(seconds=self.overlap)
+                rows = await queries.fetch(db, LOAD_REVOCATIONS_SINCE, since)
+        except Exception:
+            self.stats.failures += 1
+            raise
+
+        for row in rows:
+            revoked_at = row["revoked_at"]
+            if row["access_token"] is None:
+                self.revoke_users([str(row["user_uuid"])], revoked_at.timestamp())
+            else:
+                self._tokens[bytes.fromhex(row["access_token"])] = (
+                    revoked_at.timestamp()
+                )
+            if self._cursor is None or revoked_at > self._cursor:
+                self._cursor = revoked_at
+
+        self._prune()
+        self._synced_at = time.monotonic()
+        self.stats.refreshes += 1
+
+    async def purge(self, db: Union[Pool, Connection]) -> None:
+        await queries.execute(db, PURGE_REVOCATIONS, self.retention)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        self._tokens = {k: at for k, at in self._tokens.items() if at >= cutoff}
+        self._users = {k: at for k, at in self._users.items() if at >= cutoff}
+
+
+settings = get_settings()
+
+revocation_filter = RevocationFilter(
+    retention=settings.app.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    max_staleness=settings.app.AUTH_REVOCATION_MAX_STALENESS_SECONDS,
+    overlap=settings.app.AUTH_REVOCATION_MAX_STALENESS_SECONDS,
+)
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+
+from typing import Awaitable, Callable
+
+from litestar import Litestar
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(
+    name: str, interval: float, job: Callable[[], Awaitable[None]]
+) -> None:
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Cancelling a query closes its connection, which asyncpg may
+            # report as an InterfaceError instead of the cancellation
+            if asyncio.current_task().cancelling():
+                raise asyncio.CancelledError from e
+            logger.exception(f"Background task {name} failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_background_task(
+    app: Litestar, name: str, interval: float, job: Callable[[], Awaitable[None]]
+) -> None:
+    tasks = app.state.setdefault("background_tasks", [])
+    tasks.append(asyncio.create_task(run_periodically(name, interval, job), name=name))
+
+
+async def stop_background_tasks(app: Litestar) -> None:
+    tasks = app.state.pop("background_tasks", [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,115 @@
+import os
+import secrets
+
+import asyncpg
+import pytest
+
+# Settings are read when src modules are imported; the suite needs no database
+# except for the tests marked ``db``, which use DATABASE_DSN when it is set
+os.environ.setdefault("SECRET_KEY", "test-secret-key-that-is-long-enough-0000")
+os.environ.setdefault("SESSION_SALT", "test-salt")
+os.environ.setdefault("EMAIL_CHECK_DELIVERABILITY", "false")
+os.environ.setdefault("BCRYPT_GENSALT", "4")
+# Tests of the limiter build their own; the app would limit every test client
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+DSN = os.environ.get("DATABASE_DSN")
+
+
+def pytest_collection_modifyitems(config, items) -> None:
+    if DSN:
+        return
+    skip = pytest.mark.skip(reason="DATABASE_DSN is not set")
+    for item in items:
+        if "db" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+_migrated = False
+
+
+async def _migrate_once(conn) -> None:
+    global _migrated
+    from src.db.migrate import load_migrations, migrate
+
+    if not _migrated:
+        await migrate(conn, load_migrations())
+        _migrated = True
+
+
+@pytest.fixture
+async def connection():
+    """A connection inside a transaction that is rolled back after the test"""
+    conn = await asyncpg.connect(DSN)
+    try:
+        await _migrate_once(conn)
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            yield conn
+        finally:
+            await transaction.rollback()
+    finally:
+        await conn.close()
+
+
+@pytest.fixture
+async def pool():
+    """For code that commits: tests clean up what they create"""
+    pool = await asyncpg.create_pool(DSN, min_size=1, max_size=4)
+    try:
+        async with pool.acquire() as conn:
+            await _migrate_once(conn)
+        yield pool
+    finally:
+        await pool.close()
+
+
+@pytest.fixture
+async def client(pool):
+    """The whole app, started against DATABASE_DSN"""
+    from litestar.testing import AsyncTestClient
+
+    from app import create_app
+    from src.config import app as config
+
+    try:
+        async with AsyncTestClient(create_app()) as client:
+            yield client
+    finally:
+        # Closed on shutdown; the next app opens its own
+        config.asyncpg.pool_instance = None
+
+
+@pytest.fixture
+async def login(client, pool):
+    """Registers users and logs them in, returning their tokens; deletes them
+    after the test"""
+    emails = []
+
+    async def login(role: str = "USER", domain: str = "example.com") -> dict:
+        email = f"test-{secrets.token_hex(6)}@{domain}"
+        emails.append(email)
+        password = "password123"
+        response = await client.post(
+            "/users/register",
+            json={"name": "Test", "email": email, "password": password},
+        )
+        assert response.status_code == 201, response.text
+        if role != "USER":
+            await pool.execute(
+                "UPDATE users SET role = $2 WHERE email = $1", email, role
+            )
+        response = await client.post(
+            "/users/auth", json={"email": email, "password": password}
+        )
+        assert response.status_code == 201, response.text
+        return {"email": email, **response.json()}
+
+    yield login
+    await pool.execute("DELETE FROM users WHERE email = ANY($1::text[])", emails)
@@ -0,0 +1,68 @@
+import pytest
+
+from src.db.replica import replica_router
+
+pytestmark = [pytest.mark.anyio, pytest.mark.db]
+
+
+def headers(token: dict) -> dict:
+    return {"x-access-token": token["access_token"]}
+
+
+class StaleReplica:
+    """A replica that has not seen any revocation yet"""
+
+    def __init__(self, user) -> None:
+        self.user = user
+
+    async def fetchrow(self, *args):
+        return self.user
+
+    async def fetch(self, *args):
+        return [self.user]
+
+
+async def test_a_revoked_session_is_rejected_even_if_the_replica_lags(
+    client, login, monkeypatch
+):
+    token = await login()
+    response = await client.get("/users/data", headers=headers(token))
+    assert response.status_code == 200
+
+    monkeypatch.setattr(replica_router, "healthy", True)
+    monkeypatch.setattr(
+        replica_router, "reader", lambda pool: StaleReplica(response.json())
+    )
+
+    assert (
+        await client.post("/users/logout", headers=headers(token))
+    ).status_code == 201
+    assert (await client.get("/users/data", headers=headers(token))).status_code == 401
+
+
+async def test_a_refreshed_access_token_replaces_the_old_one(client, login):
+    token = await login()
+    response = await client.post(
+        "/users/refresh",
+        headers={**headers(token), "x-refresh-token": token["refresh_token"]},
+    )
+    assert response.status_code == 201
+
+    assert (await client.get("/users/data", headers=headers(token))).status_code == 401
+    refreshed = response.json()
+    assert (
+        await client.get("/users/data", headers=headers(refreshed))
+    ).status_code == 200
+
+
+async def test_logging_in_again_ends_the_previous_session(client, login):
+    token = await login()
+    other = await client.post(
+        "/users/auth", json={"email": token["email"], "password": "password123"}
+    )
+    assert other.status_code == 201
+
+    assert (await client.get("/users/data", headers=headers(token))).status_code == 401
+    assert (
+        await client.get("/users/data", headers=headers(other.json()))
+    ).status_code == 200
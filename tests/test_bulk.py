@@ -0,0 +1,106 @@
+import secrets
+
+import pytest
+
+from src.config.base import get_settings
+
+pytestmark = [pytest.mark.anyio, pytest.mark.db]
+
+
+def headers(token: dict) -> dict:
+    return {"x-access-token": token["access_token"]}
+
+
+async def user_uuid(client, token: dict) -> str:
+    response = await client.get("/users/data", headers=headers(token))
+    assert response.status_code == 200
+    return response.json()["uuid"]
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(get_settings().app, "USERS_BULK_CHUNK_SIZE", 2)
+
+
+async def test_admins_log_listed_users_out_everywhere(client, login, small_chunks):
+    admin = await login(role="ADMIN")
+    users = [await login() for _ in range(3)]
+    bystander = await login()
+    uuids = [await user_uuid(client, user) for user in users]
+
+    response = await client.post(
+        "/users/sessions/revoke",
+        json={"uuids": uuids + uuids[:1]},
+        headers=headers(admin),
+    )
+    assert response.status_code == 201
+    assert response.json() == {"users": 3, "sessions": 3}
+
+    for user in users:
+        response = await client.get("/users/data", headers=headers(user))
+        assert response.status_code == 401
+    assert (
+        await client.get("/users/data", headers=headers(bystander))
+    ).status_code == 200
+
+    # They can log in again
+    response = await client.post(
+        "/users/auth", json={"email": users[0]["email"], "password": "password123"}
+    )
+    assert response.status_code == 201
+
+
+async def test_admins_deactivate_the_users_matching_a_filter(
+    client, login, small_chunks
+):
+    admin = await login(role="ADMIN")
+    domain = f"bulk-{secrets.token_hex(4)}.example.com"
+    users = [await login(domain=domain) for _ in range(3)]
+    bystander = await login()
+
+    response = await client.post(
+        "/users/deactivate",
+        json={"filter": {"email_domain": domain}},
+        headers=headers(admin),
+    )
+    assert response.status_code == 201
+    assert response.json() == {"users": 3, "sessions": 3}
+
+    for user in users:
+        assert (
+            await client.get("/users/data", headers=headers(user))
+        ).status_code == 401
+        response = await client.post(
+            "/users/auth", json={"email": user["email"], "password": "password123"}
+        )
+        assert response.status_code == 400
+    assert (
+        await client.get("/users/data", headers=headers(bystander))
+    ).status_code == 200
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {},
+        {"uuids": [], "filter": {"role": "USER"}},
+        {"filter": {}},
+    ],
+)
+async def test_a_bulk_action_needs_exactly_one_target(client, login, body):
+    admin = await login(role="ADMIN")
+    response = await client.post(
+        "/users/sessions/revoke", json=body, headers=headers(admin)
+    )
+    assert response.status_code == 400
+
+
+async def test_only_admins_run_bulk_actions(client, login):
+    user = await login()
+    response = await client.post(
+        "/users/deactivate",
+        json={"filter": {"email_domain": "example.com"}},
+        headers=headers(user),
+    )
+    assert response.status_code == 403
+    assert (await client.get("/users/data", headers=headers(user))).status_code == 200
@@ -0,0 +1,85 @@
+import pytest
+
+from src.lib import cache as cache_module
+from src.lib.cache import TTLCache
+from src.lib.metrics import MetricsRegistry
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = TTLCache(max_size=10, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+
+    clock.now += 10
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats.expirations == 1
+
+
+def test_ttl_is_capped_by_the_cache_ttl(clock):
+    cache = TTLCache(max_size=10, ttl=30)
+    cache.set("a", 1, ttl=3600)
+
+    clock.now += 31
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(max_size=2, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats.evictions == 1
+
+
+def test_invalidate_group_drops_every_key_of_the_group(clock):
+    cache = TTLCache(max_size=10, ttl=30)
+    cache.set(("user", "s1"), 1, group="user")
+    cache.set(("user", "s2"), 2, group="user")
+    cache.set(("other", "s1"), 3, group="other")
+
+    assert cache.invalidate_group("user") == 2
+    assert cache.get(("user", "s1")) is None
+    assert cache.get(("other", "s1")) == 3
+    assert cache.invalidate_group("user") == 0
+
+
+def test_disabled_cache_stores_nothing(clock):
+    cache = TTLCache(max_size=0, ttl=30)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_stats_are_exported_as_gauges(clock):
+    cache = TTLCache(max_size=10, ttl=30)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    metrics = MetricsRegistry()
+    metrics.stats_gauges("auth_cache", "Auth cache", lambda: cache.stats)
+    rendered = metrics.render()
+
+    assert "auth_cache_hits 1.0" in rendered
+    assert "auth_cache_misses 1.0" in rendered
+    assert "auth_cache_hit_ratio 0.5" in rendered
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from src.server.channels import PostgresChannelsBackend
+from tests.conftest import DSN
+
+pytestmark = pytest.mark.anyio
+
+
+def make_backend() -> PostgresChannelsBackend:
+    return PostgresChannelsBackend(
+        dsn=DSN or "",
+        batch_interval=0.0,
+        max_batch=100,
+        max_pending=100,
+        reconnect_interval=0.1,
+        keepalive=5.0,
+    )
+
+
+async def test_there_is_no_history():
+    assert await make_backend().get_history("notifications", limit=10) == []
+
+
+@pytest.mark.db
+async def test_published_events_reach_subscribers(pool):
+    backend = make_backend()
+    backend.bind(pool)
+    await backend.on_startup()
+    try:
+        await backend.subscribe(["test_channel"])
+        # The listener connects in the background
+        for _ in range(50):
+            if backend._listener is not None:
+                break
+            await asyncio.sleep(0.05)
+
+        await backend.publish(b"hello", ["test_channel", "other_channel"])
+        events = backend.stream_events()
+        event = await asyncio.wait_for(events.__anext__(), timeout=5)
+        assert event == ("test_channel", b"hello")
+    finally:
+        await backend.on_shutdown()
@@ -0,0 +1,86 @@
+import zlib
+
+import pytest
+
+from litestar import Litestar, get
+from litestar.config.compression import CompressionConfig
+from litestar.response import Stream
+from litestar.testing import TestClient
+
+from src.lib.cache import TTLCache
+from src.lib.compression import (
+    AVAILABLE_CODECS,
+    CompressionPolicy,
+    CompressionPolicyMiddleware,
+    StreamCompressor,
+    negotiate,
+)
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    """Decodes as much as has been sent, ended or not"""
+    if encoding == "gzip":
+        return zlib.decompressobj(31).decompress(data)
+    if encoding == "br":
+        import brotli
+
+        return brotli.Decompressor().process(data)
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def test_stream_compressor_cannot_be_used_without_an_implementation():
+    with pytest.raises(TypeError):
+        StreamCompressor()
+
+
+@pytest.mark.parametrize("codec", AVAILABLE_CODECS, ids=lambda codec: codec.encoding)
+def test_every_chunk_can_be_decoded_as_soon_as_it_is_written(codec):
+    chunks = [b'{"uuid": "%d"}\n' % i * 50 for i in range(5)]
+    stream = codec.stream(codec.fast)
+
+    sent = b""
+    for index, chunk in enumerate(chunks):
+        sent += stream.write(chunk)
+        assert decompress(codec.encoding, sent) == b"".join(chunks[: index + 1])
+    sent += stream.finish()
+
+    assert decompress(codec.encoding, sent) == b"".join(chunks)
+
+
+def test_negotiate_picks_the_highest_weight():
+    gzip_codec = next(c for c in AVAILABLE_CODECS if c.encoding == "gzip")
+    assert negotiate("gzip;q=0.5, identity", AVAILABLE_CODECS) is gzip_codec
+    assert negotiate("gzip;q=0", AVAILABLE_CODECS) is None
+    assert negotiate("", AVAILABLE_CODECS) is None
+
+
+def test_every_streamed_chunk_is_counted():
+    chunks = [b'{"uuid": "%d"}\n' % i * 50 for i in range(5)]
+
+    @get("/stream")
+    async def stream() -> Stream:
+        return Stream(iter(chunks))
+
+    policy = CompressionPolicy(
+        minimum_size=500,
+        levels={"gzip": 6},
+        cache=TTLCache(max_size=1, ttl=60),
+        codecs=[codec for codec in AVAILABLE_CODECS if codec.encoding == "gzip"],
+    )
+    app = Litestar(
+        [stream],
+        compression_config=CompressionConfig(
+            backend="policy",
+            minimum_size=policy.minimum_size,
+            middleware_class=CompressionPolicyMiddleware,
+            backend_config=policy,
+        ),
+    )
+    with TestClient(app) as client:
+        response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b"".join(chunks)
+    assert policy.stats.bytes_in == len(b"".join(chunks))
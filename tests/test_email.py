@@ -0,0 +1,109 @@
+import asyncio
+
+from types import SimpleNamespace
+
+import dns.exception
+import dns.resolver
+import pytest
+
+from src.lib.cache import TTLCache
+from src.lib.email import DeliverabilityChecker
+
+pytestmark = pytest.mark.anyio
+
+
+class StubResolver:
+    """Canned answers per (domain, record type): a list of records, or an
+    exception to raise; missing entries have no answer"""
+
+    def __init__(self, answers: dict, delay: float = 0.0) -> None:
+        self.answers = answers
+        self.delay = delay
+        self.queries = []
+
+    async def resolve(self, qname: str, rdtype: str, **kwargs):
+        self.queries.append((qname, rdtype))
+        await asyncio.sleep(self.delay)
+        answer = self.answers.get((qname, rdtype))
+        if answer is None:
+            raise dns.resolver.NoAnswer()
+        if isinstance(answer, BaseException):
+            raise answer
+        return answer
+
+
+class Answer(list):
+    rrset = SimpleNamespace(ttl=300)
+
+
+def mx(*exchanges: str) -> Answer:
+    return Answer(SimpleNamespace(exchange=exchange) for exchange in exchanges)
+
+
+def address(*addresses: str) -> Answer:
+    return Answer(SimpleNamespace(address=a) for a in addresses)
+
+
+def make_checker(answers: dict, delay: float = 0.0, timeout: float = 1.0):
+    return DeliverabilityChecker(
+        timeout=timeout,
+        cache=TTLCache(max_size=100, ttl=3600),
+        ttl=3600,
+        negative_ttl=60,
+        resolver=StubResolver(answers, delay),
+    )
+
+
+@pytest.mark.parametrize(
+    "answers, deliverable",
+    [
+        ({("example.com", "MX"): mx("mail.example.com.")}, True),
+        ({("example.com", "MX"): mx(".")}, False),
+        ({("example.com", "MX"): dns.resolver.NXDOMAIN()}, False),
+        ({("example.com", "A"): address("93.184.216.34")}, True),
+        ({("example.com", "AAAA"): address("2606:2800:220:1::1")}, True),
+        ({("example.com", "A"): address("10.0.0.1", "127.0.0.1")}, False),
+        ({}, False),
+    ],
+)
+async def test_domains_are_checked_for_mx_or_a_global_address(answers, deliverable):
+    checker = make_checker(answers)
+    assert await checker.is_deliverable("user@example.com") is deliverable
+    assert checker.stats.undeliverable == (0 if deliverable else 1)
+
+
+async def test_results_are_cached_per_domain():
+    checker = make_checker({("example.com", "MX"): mx("mail.example.com")})
+    assert await checker.is_deliverable("a@example.com")
+    assert await checker.is_deliverable("b@EXAMPLE.com")
+    assert checker.resolver.queries == [("example.com", "MX")]
+
+
+async def test_concurrent_checks_of_a_domain_share_one_lookup():
+    checker = make_checker({("example.com", "MX"): mx("mail.example.com")}, delay=0.05)
+    results = await asyncio.gather(
+        *(checker.is_deliverable(f"user{i}@example.com") for i in range(10))
+    )
+    assert all(results)
+    assert checker.stats.lookups == 1
+
+
+@pytest.mark.parametrize(
+    "answers, delay",
+    [
+        ({("example.com", "MX"): dns.exception.Timeout()}, 0.0),
+        ({("example.com", "MX"): mx(".")}, 0.2),
+        ({("example.com", "MX"): dns.resolver.NoNameservers()}, 0.0),
+    ],
+)
+async def test_failed_lookups_accept_the_address_without_caching(answers, delay):
+    checker = make_checker(answers, delay=delay, timeout=0.05)
+    assert await checker.is_deliverable("user@example.com")
+    assert await checker.is_deliverable("user@example.com")
+    assert checker.stats.lookups == 2
+
+
+async def test_invalid_syntax_is_not_looked_up():
+    checker = make_checker({})
+    assert not await checker.is_deliverable("not an email")
+    assert checker.resolver.queries == []
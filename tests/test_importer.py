@@ -0,0 +1,121 @@
+import json
+import secrets
+
+import bcrypt
+import pytest
+
+from src.domain.users.cache import users_page_cache
+from src.domain.users.importer import UserImporter, read_rows
+from src.lib.hashing import PasswordHasher
+from src.server.cli import _import_users
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=4, workers=2, max_queue=10)
+    yield hasher
+    hasher.shutdown()
+
+
+async def test_hashing_nothing_submits_nothing(hasher):
+    assert await hasher.hash_many([]) == []
+    assert hasher.stats.completed == 0
+
+
+async def test_each_password_of_a_chunk_is_observed_once(hasher):
+    hashed = await hasher.hash_many(["password1", "password2", "password3"])
+
+    assert len(hashed) == 3
+    assert bcrypt.checkpw(b"password2", hashed[1].encode())
+    assert hasher.stats.completed == 3
+    assert hasher.stats.mean_seconds <= hasher.stats.hash_seconds_max * 3
+
+
+def test_rows_keep_their_line_numbers(tmp_path):
+    path = tmp_path / "users.ndjson"
+    path.write_text('{"name": "A"}\n\nnot json\n')
+
+    rows = list(read_rows(path, "ndjson"))
+
+    assert [line for line, _ in rows] == [1, 3]
+    assert rows[0][1] == {"name": "A"}
+    assert isinstance(rows[1][1], Exception)
+
+
+@pytest.mark.db
+async def test_invalid_rows_are_reported_without_stopping_the_import(
+    tmp_path, connection, hasher
+):
+    taken = f"taken-{secrets.token_hex(4)}@example.com"
+    await connection.execute(
+        "INSERT INTO users (name, email, password, fingerprint) VALUES ($1, $2, $3, $4)",
+        "Taken",
+        taken,
+        "x",
+        secrets.randbelow(10**9),
+    )
+    new = f"new-{secrets.token_hex(4)}@example.com"
+    prehashed = f"prehashed-{secrets.token_hex(4)}@example.com"
+    existing_hash = bcrypt.hashpw(b"password123", bcrypt.gensalt(4)).decode()
+    records = [
+        {"name": "New", "email": new, "password": "password123"},
+        {"name": "Again", "email": new, "password": "password123"},
+        {"name": "Taken", "email": taken, "password": "password123"},
+        {"name": "Long", "email": "long@example.com", "password": "é" * 37},
+        {"name": "Bad", "email": "not-an-email", "password": "password123"},
+        {"name": "Hashed", "email": prehashed, "password": existing_hash},
+    ]
+    path = tmp_path / "users.ndjson"
+    path.write_text("\n".join(json.dumps(record) for record in records) + "\n")
+
+    errors = []
+    importer = UserImporter(
+        connection=connection,
+        hasher=hasher,
+        fingerprint_range=10**9,
+        on_error=errors.append,
+    )
+    stats = await importer.run(read_rows(path, "ndjson"), batch_size=4)
+
+    assert stats.rows == 6
+    assert stats.imported == 2
+    assert stats.failed == 4
+    assert stats.hashed == 1
+    assert stats.prehashed == 1
+    assert sorted(error.line for error in errors) == [2, 3, 4, 5]
+    assert "72 bytes" in next(error.reason for error in errors if error.line == 4)
+
+    stored = await connection.fetchval(
+        "SELECT password FROM users WHERE email = $1", prehashed
+    )
+    assert stored == existing_hash
+    stored = await connection.fetchval(
+        "SELECT password FROM users WHERE email = $1", new
+    )
+    assert bcrypt.checkpw(b"password123", stored.encode())
+
+
+@pytest.mark.db
+async def test_an_import_invalidates_the_cached_user_pages(tmp_path, pool):
+    users_page_cache.store.bind(pool)
+    page = await users_page_cache.get_or_build("page", lambda: _page(b"before"))
+    assert page == b"before"
+
+    email = f"imported-{secrets.token_hex(4)}@example.com"
+    path = tmp_path / "users.csv"
+    path.write_text(f"name,email,password\nImported,{email},password123\n")
+    try:
+        stats = await _import_users(path, "csv", 10, 1, print)
+        assert stats.imported == 1
+
+        users_page_cache.store.bind(pool)
+        page = await users_page_cache.get_or_build("page", lambda: _page(b"after"))
+        assert page == b"after"
+    finally:
+        await pool.execute("DELETE FROM users WHERE email = $1", email)
+
+
+async def _page(body: bytes) -> bytes:
+    return body
@@ -0,0 +1,125 @@
+import secrets
+import time
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.config.base import get_settings
+from src.server.lockout import LoginLockout
+
+pytestmark = pytest.mark.anyio
+
+
+def make_lockout(salt: bytes = b"test") -> LoginLockout:
+    return LoginLockout(
+        account_threshold=3,
+        ip_threshold=10,
+        base_seconds=60,
+        max_seconds=600,
+        reset_seconds=900,
+        max_entries=100,
+        salt=salt,
+    )
+
+
+def test_an_account_is_locked_at_its_threshold_with_a_doubling_backoff():
+    lockout = make_lockout()
+    for _ in range(2):
+        lockout.failure("user@example.com", "10.0.0.1")
+    assert lockout.check("user@example.com", "10.0.0.2") is None
+
+    lockout.failure("user@example.com", "10.0.0.1")
+    assert 59 <= lockout.check("User@Example.com ", "10.0.0.2") <= 60
+
+    lockout.failure("user@example.com", "10.0.0.1")
+    assert 119 <= lockout.check("user@example.com", "10.0.0.2") <= 120
+    assert lockout.check("other@example.com", "10.0.0.2") is None
+    assert lockout.stats.locks == 2
+    assert lockout.stats.rejected == 2
+
+
+def test_an_ip_is_locked_across_accounts():
+    lockout = make_lockout()
+    for i in range(10):
+        lockout.failure(f"user{i}@example.com", "10.0.0.1")
+
+    assert lockout.check("new@example.com", "10.0.0.1") is not None
+    assert lockout.check("new@example.com", "10.0.0.2") is None
+
+
+def test_a_success_clears_the_account_but_not_the_ip():
+    lockout = make_lockout()
+    for i in range(10):
+        lockout.failure("user@example.com", "10.0.0.1")
+    lockout.success("user@example.com")
+
+    assert lockout.check("user@example.com", "10.0.0.2") is None
+    assert lockout.check("user@example.com", "10.0.0.1") is not None
+
+
+def test_the_salt_is_read_when_first_needed(monkeypatch):
+    lockout = LoginLockout(
+        account_threshold=1,
+        ip_threshold=1,
+        base_seconds=60,
+        max_seconds=60,
+        reset_seconds=60,
+        max_entries=10,
+    )
+    settings = get_settings()
+    monkeypatch.setattr(settings.app, "SESSION_SALT", "first")
+    key = lockout._key("account", "user@example.com")
+
+    assert key == make_lockout(b"first")._key("account", "user@example.com")
+
+
+def worker_lockouts():
+    salt = secrets.token_bytes(16)
+    return make_lockout(salt), make_lockout(salt)
+
+
+@pytest.mark.db
+async def test_workers_share_locks_and_clears(pool):
+    first, second = worker_lockouts()
+    email = f"lockout-{secrets.token_hex(4)}@example.com"
+    await first.sync(pool, overlap=5)
+    await second.sync(pool, overlap=5)
+
+    for _ in range(3):
+        first.failure(email, "10.0.0.1")
+    await first.sync(pool, overlap=5)
+    await second.sync(pool, overlap=5)
+    assert second.check(email, "10.0.0.2") is not None
+
+    first.success(email)
+    await first.sync(pool, overlap=5)
+    await second.sync(pool, overlap=5)
+    assert second.check(email, "10.0.0.2") is None
+    assert first._key("account", email) not in second._entries
+
+
+@pytest.mark.db
+async def test_a_count_idle_past_the_reset_starts_over(pool):
+    first, second = worker_lockouts()
+    email = f"lockout-{secrets.token_hex(4)}@example.com"
+    key = first._key("account", email)
+    long_ago = datetime.now(timezone.utc) - timedelta(seconds=1000)
+    await pool.execute(
+        "INSERT INTO login_failures (key, failures, locked_until, updated_at) "
+        "VALUES ($1, 2, 0, $2)",
+        key,
+        long_ago,
+    )
+
+    first.failure(email, "10.0.0.1")
+    await first.sync(pool, overlap=5)
+    assert (
+        await pool.fetchval("SELECT failures FROM login_failures WHERE key = $1", key)
+        == 1
+    )
+
+    # Nor does a count that went idle on another worker add to the new one
+    second._entries[key] = (2, 0.0, time.time() - 1000)
+    await second.sync(pool, overlap=5)
+    assert second._entries[key][0] == 1
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import msgspec
+import pytest
+
+from src.domain.users.services import UsersService
+from src.lib.pagination import decode_cursor, encode_cursor
+
+
+def test_a_cursor_keeps_the_position_to_the_microsecond():
+    created_at = datetime(2024, 2, 29, 23, 59, 59, 999999, tzinfo=timezone.utc)
+    uuid = uuid4()
+    cursor = encode_cursor(created_at, uuid)
+
+    assert decode_cursor(cursor) == (created_at, uuid)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        "MTIz",
+        encode_cursor(datetime.now(timezone.utc), uuid4())[:-2],
+        "OTk5OTk5OTk5OTk5OTk5OTk5OmFiYw",
+    ],
+)
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+async def read_all(service: UsersService, json: bool) -> list:
+    uuids, cursor = [], None
+    while True:
+        if json:
+            data, cursor = await service.get_users_page_json(limit=2, cursor=cursor)
+            page = msgspec.json.decode(data)
+        else:
+            page, cursor = await service.get_users_page(limit=2, cursor=cursor)
+        uuids += [str(user["uuid"]) for user in page]
+        if cursor is None:
+            return uuids
+
+
+@pytest.mark.anyio
+@pytest.mark.db
+async def test_paging_by_cursor_visits_every_user_once(connection):
+    # Created in one transaction, so they share created_at and only the uuid
+    # orders them
+    await connection.execute("""
+        INSERT INTO users (name, email, password, fingerprint)
+        SELECT 'test', 'page-test-' || g || '@example.com', '!', -g
+        FROM generate_series(1, 5) g
+        """)
+    service = UsersService(connection)
+    total = await connection.fetchval("SELECT count(*) FROM users")
+
+    uuids = await read_all(service, json=False)
+    assert len(uuids) == len(set(uuids)) == total
+    assert await read_all(service, json=True) == uuids
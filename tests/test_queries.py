@@ -0,0 +1,38 @@
+import asyncpg
+import pytest
+
+from src.db.queries import QueryRegistry
+from tests.conftest import DSN
+
+
+def test_a_name_cannot_be_registered_twice_with_different_sql():
+    registry = QueryRegistry()
+    registry.register("probe.select", "SELECT 1")
+    registry.register("probe.select", "SELECT 1")
+    with pytest.raises(ValueError):
+        registry.register("probe.select", "SELECT 2")
+
+
+@pytest.mark.anyio
+@pytest.mark.db
+async def test_prepare_parses_statements_without_running_them():
+    registry = QueryRegistry()
+    insert = registry.register("probe.insert", "INSERT INTO probe VALUES ($1)")
+    registry.register("probe.missing", "SELECT * FROM probe_missing")
+    registry.prepare_on_connect = True
+
+    conn = await asyncpg.connect(DSN)
+    try:
+        await conn.execute("CREATE TEMP TABLE probe (x int NOT NULL)")
+        # The missing table is logged and skipped
+        await registry.prepare(conn)
+
+        prepared = await conn.fetch("SELECT statement FROM pg_prepared_statements")
+        assert registry.queries[insert] in [row["statement"] for row in prepared]
+        assert await conn.fetchval("SELECT count(*) FROM probe") == 0
+
+        await registry.execute(conn, insert, 1)
+        assert registry.stats[insert].calls == 1
+        assert await conn.fetchval("SELECT count(*) FROM probe") == 1
+    finally:
+        await conn.close()
@@ -0,0 +1,121 @@
+import pytest
+
+from litestar import Litestar, get
+from litestar.testing import TestClient
+
+from src.server import rate_limit
+from src.server.rate_limit import (
+    MemoryRateLimitBackend,
+    RateLimiter,
+    RateLimitMiddleware,
+    RateLimitPolicy,
+    get_client_ip,
+    parse_networks,
+)
+
+
+def scope(client: str, *headers) -> dict:
+    return {
+        "client": (client, 50000),
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+    }
+
+
+@pytest.fixture
+def proxies(monkeypatch):
+    monkeypatch.setattr(
+        rate_limit, "trusted_proxies", parse_networks(["10.0.0.0/8", "192.0.2.1"])
+    )
+
+
+def test_forwarding_headers_are_ignored_without_trusted_proxies():
+    request = scope(
+        "203.0.113.7", ("x-forwarded-for", "1.2.3.4"), ("x-real-ip", "5.6.7.8")
+    )
+    assert get_client_ip(request) == "203.0.113.7"
+
+
+def test_forwarding_headers_from_an_untrusted_peer_are_ignored(proxies):
+    request = scope("203.0.113.7", ("x-forwarded-for", "1.2.3.4"))
+    assert get_client_ip(request) == "203.0.113.7"
+
+
+def test_the_right_most_untrusted_hop_is_the_client(proxies):
+    # The client sent "1.2.3.4" itself; the proxies appended the rest
+    request = scope(
+        "10.0.0.2",
+        ("x-forwarded-for", "1.2.3.4, 198.51.100.9"),
+        ("x-forwarded-for", "192.0.2.1, 10.0.0.1"),
+    )
+    assert get_client_ip(request) == "198.51.100.9"
+
+
+def test_when_every_hop_is_trusted_the_left_most_is_the_client(proxies):
+    request = scope("10.0.0.2", ("x-forwarded-for", "10.0.0.5, 10.0.0.1"))
+    assert get_client_ip(request) == "10.0.0.5"
+
+
+def test_x_real_ip_is_read_from_trusted_proxies_only(proxies):
+    assert get_client_ip(scope("10.0.0.2", ("x-real-ip", "1.2.3.4"))) == "1.2.3.4"
+    assert get_client_ip(scope("1.1.1.1", ("x-real-ip", "1.2.3.4"))) == "1.1.1.1"
+
+
+@pytest.mark.anyio
+async def test_a_window_allows_the_limit_then_rejects(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    limiter = RateLimiter(backend=MemoryRateLimitBackend())
+    policy = RateLimitPolicy("minute", 2)
+
+    assert await limiter.hit(None, "login", "a", policy) is None
+    assert await limiter.hit(None, "login", "a", policy) is None
+    assert await limiter.hit(None, "login", "a", policy) == 20
+    # Other identifiers have their own counter
+    assert await limiter.hit(None, "login", "b", policy) is None
+
+    now[0] = 1020.0
+    assert await limiter.hit(None, "login", "a", policy) is None
+    assert limiter.stats.rejected == 1
+
+
+def make_client(shared: MemoryRateLimitBackend) -> TestClient:
+    """One worker; workers given the same backend share their counters, as
+    they do through Postgres"""
+
+    @get("/limited", opt={"rate_limit": ("minute", 2)}, sync_to_thread=False)
+    def limited() -> str:
+        return "ok"
+
+    @get("/open", sync_to_thread=False)
+    def open_route() -> str:
+        return "ok"
+
+    middleware = RateLimitMiddleware(
+        limiter=RateLimiter(backend=shared),
+        default_policy=RateLimitPolicy("minute", 3),
+    )
+    return TestClient(Litestar([limited, open_route], middleware=[middleware]))
+
+
+def test_the_default_limit_is_shared_by_the_workers(monkeypatch):
+    monkeypatch.setattr(rate_limit.time, "time", lambda: 1000.0)
+    shared = MemoryRateLimitBackend()
+    with make_client(shared) as first, make_client(shared) as second:
+        statuses = [
+            client.get("/open").status_code for client in (first, second, first, second)
+        ]
+        # Routes with their own limit are counted apart from the default
+        assert second.get("/limited").status_code == 200
+    assert statuses == [200, 200, 200, 429]
+
+
+def test_rotating_forwarding_headers_does_not_reset_the_limit(monkeypatch):
+    monkeypatch.setattr(rate_limit.time, "time", lambda: 1000.0)
+    with make_client(MemoryRateLimitBackend()) as client:
+        statuses = [
+            client.get(
+                "/limited", headers={"x-forwarded-for": f"1.2.3.{i}"}
+            ).status_code
+            for i in range(3)
+        ]
+    assert statuses == [200, 200, 429]
@@ -0,0 +1,147 @@
+import asyncio
+import secrets
+
+import pytest
+
+from litestar.stores.memory import MemoryStore
+
+from src.db.store import PostgresStore
+from src.lib.response_cache import GENERATION_KEY, ResponseCache
+
+pytestmark = pytest.mark.anyio
+
+
+class Build:
+    """A page build that waits until released, counting its calls"""
+
+    def __init__(self, value: bytes = b"page") -> None:
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        await self.release.wait()
+        return self.value
+
+
+async def test_concurrent_misses_share_one_build():
+    cache = ResponseCache(store=MemoryStore(), ttl=30)
+    build = Build()
+
+    pending = [asyncio.create_task(cache.get_or_build("k", build)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    build.release.set()
+
+    assert await asyncio.gather(*pending) == [b"page"] * 3
+    assert build.calls == 1
+    assert (cache.stats.misses, cache.stats.coalesced) == (1, 2)
+    assert await cache.get_or_build("k", build) == b"page"
+    assert cache.stats.hits == 1
+
+
+async def test_a_build_overtaken_by_an_invalidation_is_not_stored():
+    cache = ResponseCache(store=MemoryStore(), ttl=30)
+    build = Build(b"old")
+
+    pending = asyncio.create_task(cache.get_or_build("k", build))
+    await asyncio.sleep(0.01)
+    await cache.invalidate()
+    build.release.set()
+
+    assert await pending == b"old"
+    assert cache.stats.stale == 1
+    assert await cache.store.get("k") is None
+
+
+@pytest.fixture
+async def shared_store(pool):
+    store = PostgresStore().with_namespace(f"test_{secrets.token_hex(4)}")
+    store.bind(pool)
+    yield store
+    await store.delete_all()
+
+
+@pytest.mark.db
+async def test_an_invalidation_in_another_worker_stops_a_stale_write(shared_store):
+    worker, other_worker = (
+        ResponseCache(store=shared_store, ttl=30),
+        ResponseCache(store=shared_store, ttl=30),
+    )
+    build = Build(b"old")
+
+    pending = asyncio.create_task(worker.get_or_build("k", build))
+    await asyncio.sleep(0.05)
+    await other_worker.invalidate()
+    build.release.set()
+
+    assert await pending == b"old"
+    assert worker.stats.stale == 1
+    assert await shared_store.get("k") is None
+
+    fresh = Build(b"new")
+    fresh.release.set()
+    assert await other_worker.get_or_build("k", fresh) == b"new"
+    assert await worker.get_or_build("k", Build()) == b"new"
+    assert worker.stats.hits == 1
+
+
+@pytest.mark.db
+async def test_an_invalidation_keeps_the_new_generation(shared_store):
+    cache = ResponseCache(store=shared_store, ttl=30)
+    build = Build()
+    build.release.set()
+    await cache.get_or_build("k", build)
+
+    await cache.invalidate()
+    generation = await shared_store.get(GENERATION_KEY)
+    assert generation is not None
+    assert await cache.get_or_build("k", build) == b"page"
+    assert build.calls == 2
+    # Stored under the generation the invalidation wrote, not a new one
+    assert await shared_store.get(GENERATION_KEY) == generation
+    assert cache.stats.hits == 0
+    assert await cache.get_or_build("k", build) == b"page"
+    assert cache.stats.hits == 1
+
+
+@pytest.mark.db
+async def test_an_invalidation_in_another_worker_is_noticed_on_rebuild(shared_store):
+    worker, other_worker = (
+        ResponseCache(store=shared_store, ttl=30),
+        ResponseCache(store=shared_store, ttl=1),
+    )
+    build = Build()
+    build.release.set()
+    await worker.get_or_build("k", build)
+    await other_worker.invalidate()
+    assert other_worker.since_invalidation < 1
+    await asyncio.sleep(0.2)
+
+    await worker.get_or_build("k", build)
+    assert worker.since_invalidation < 0.1
+
+
+class UnreachableReplica:
+    async def fetch(self, *args):
+        raise AssertionError("read from the replica")
+
+    fetchrow = fetchval = fetch
+
+
+@pytest.mark.db
+async def test_pages_are_built_on_the_primary_right_after_an_invalidation(
+    client, login, monkeypatch
+):
+    from src.db.replica import replica_router
+
+    await client.get("/users/?limit=1")
+    monkeypatch.setattr(replica_router, "dsn", "postgresql://replica")
+    monkeypatch.setattr(replica_router, "healthy", True)
+    monkeypatch.setattr(replica_router, "reader", lambda primary: UnreachableReplica())
+
+    # Registering invalidates the pages
+    user = await login()
+    response = await client.get("/users/?limit=100")
+    assert response.status_code == 200
+    assert user["email"] in response.text
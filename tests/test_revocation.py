@@ -0,0 +1,98 @@
+import secrets
+import time
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.server import auth
+from src.server.revocation import RevocationFilter, revocation_filter
+
+pytestmark = pytest.mark.anyio
+
+
+def make_filter() -> RevocationFilter:
+    return RevocationFilter(retention=900, max_staleness=30, overlap=30)
+
+
+def test_revoked_tokens_are_rejected():
+    revocations = make_filter()
+    token = secrets.token_hex(32)
+    revocations.revoke(token)
+
+    assert revocations.is_revoked(token, "user", time.time())
+    assert not revocations.is_revoked(secrets.token_hex(32), "user", time.time())
+    assert revocations.stats.rejected == 1
+
+
+def test_users_are_revoked_to_the_microsecond():
+    revocations = make_filter()
+    revoked_at = 1_700_000_000.5
+    revocations.revoke_users(["user"], before=revoked_at)
+
+    token = secrets.token_hex(32)
+    assert revocations.is_revoked(token, "user", revoked_at - 0.000001)
+    # Created in the same second, after the revocation
+    assert not revocations.is_revoked(token, "user", revoked_at + 0.000001)
+    assert not revocations.is_revoked(token, "other", revoked_at - 1)
+
+
+def test_an_earlier_revocation_does_not_undo_a_later_one():
+    revocations = make_filter()
+    revocations.revoke_users(["user"], before=200.0)
+    revocations.revoke_users(["user"], before=100.0)
+
+    assert revocations.is_revoked(secrets.token_hex(32), "user", 150.0)
+
+
+@pytest.mark.db
+async def test_purge_drops_revocations_older_than_the_retention(pool):
+    user_uuid = "00000000-0000-0000-0000-000000000019"
+    old = datetime.now(timezone.utc) - timedelta(seconds=1000)
+    await pool.execute(
+        "INSERT INTO session_revocations (access_token, user_uuid, revoked_at) "
+        "VALUES ($1, $2, $3), ($4, $2, now())",
+        secrets.token_hex(32),
+        user_uuid,
+        old,
+        secrets.token_hex(32),
+    )
+    try:
+        await make_filter().purge(pool)
+        kept = await pool.fetchval(
+            "SELECT count(*) FROM session_revocations WHERE user_uuid = $1",
+            user_uuid,
+        )
+        assert kept == 1
+    finally:
+        await pool.execute(
+            "DELETE FROM session_revocations WHERE user_uuid = $1", user_uuid
+        )
+
+
+@pytest.mark.db
+async def test_a_new_login_revokes_the_previous_tokens_on_this_worker(
+    client, login, pool, monkeypatch
+):
+    monkeypatch.setattr(auth, "STATELESS", True)
+    await revocation_filter.refresh(pool)
+
+    # Nothing is polled during the test: only local revocations count
+    async def refresh(self, db) -> None:
+        pass
+
+    monkeypatch.setattr(RevocationFilter, "refresh", refresh)
+
+    first = await login()
+    second = await client.post(
+        "/users/auth", json={"email": first["email"], "password": "password123"}
+    )
+    assert second.status_code == 201
+
+    def headers(token: dict) -> dict:
+        return {"x-access-token": token["access_token"]}
+
+    response = await client.get("/users/data", headers=headers(first))
+    assert response.status_code == 401
+    response = await client.get("/users/data", headers=headers(second.json()))
+    assert response.status_code == 200
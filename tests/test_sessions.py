@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.domain.users.schemas import UserCreate, UserLogin
+from src.domain.users.services import UsersService
+from src.lib.tokens import decode_token, session_created_at, session_created_claim
+
+
+def test_session_created_claim_round_trips_to_the_microsecond():
+    created_at = datetime(2026, 10, 17, 23, 59, 59, 999999, tzinfo=timezone.utc)
+    claim = session_created_claim(created_at)
+    assert isinstance(claim, int)
+    assert session_created_at({"session_created": claim}) == created_at
+    assert session_created_at({}) is None
+
+
+async def login(connection) -> tuple:
+    service = UsersService(connection)
+    await service.create(
+        UserCreate(name="Test", email="sessions@example.com", password="password123")
+    )
+    token = await service.authenticate(
+        UserLogin(email="sessions@example.com", password="password123"), "test", None
+    )
+    return service, token
+
+
+@pytest.mark.anyio
+@pytest.mark.db
+async def test_tokens_carry_the_session_partition_key(connection):
+    _, token = await login(connection)
+    access, refresh = decode_token(token.access_token), decode_token(
+        token.refresh_token
+    )
+
+    created_at = await connection.fetchval(
+        "SELECT created_at FROM sessions WHERE user_uuid = $1 AND revoked = false",
+        access["uuid"],
+    )
+    assert session_created_at(access) == created_at
+    assert session_created_at(refresh) == created_at
+
+
+@pytest.mark.anyio
+@pytest.mark.db
+async def test_refresh_and_logout_find_the_session_by_token_and_day(connection):
+    service, token = await login(connection)
+
+    refreshed = await service.refresh_access_token(token.refresh_token, "test", None)
+    access = decode_token(refreshed.access_token)
+    assert session_created_at(access) == session_created_at(
+        decode_token(token.access_token)
+    )
+
+    await service.revoke_current_session(
+        access["uuid"], access["access_token"], session_created_at(access)
+    )
+    assert not await connection.fetchval(
+        "SELECT count(*) FROM sessions WHERE user_uuid = $1 AND revoked = false",
+        access["uuid"],
+    )
+
+
+@pytest.mark.anyio
+@pytest.mark.db
+async def test_a_token_without_the_day_is_still_found(connection):
+    service, token = await login(connection)
+    refresh = decode_token(token.refresh_token)
+
+    session = await service.session_repository.get_by_refresh_token(
+        service._hash_token(
+            refresh["refresh_token"], service.settings.app.SESSION_SALT
+        ),
+        None,
+    )
+    assert session is not None
+
+
+@pytest.mark.anyio
+@pytest.mark.db
+async def test_token_lookups_scan_a_single_partition(connection):
+    created_at = await connection.fetchval("SELECT now()")
+    plan = await connection.fetchval(
+        """
+        EXPLAIN (FORMAT JSON)
+        SELECT uuid FROM sessions WHERE refresh_token = 'x' AND created_at = $1
+        """,
+        created_at,
+    )
+    assert plan.count('"Relation Name": "sessions_') == 1
@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+
+import jwt
+import pytest
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from src.lib import tokens
+from src.lib.tokens import (
+    KeyRing,
+    decode_token,
+    encode_token,
+    session_created_at,
+    session_created_claim,
+)
+
+
+def write_key(directory, kid: str, private: bool = True, algorithm: str = "EdDSA"):
+    if algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        key = ec.generate_private_key(ec.SECP256R1())
+    if private:
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    else:
+        pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    (directory / f"{kid}.pem").write_bytes(pem)
+
+
+def sign(ring: KeyRing, payload: dict) -> str:
+    return jwt.encode(
+        payload,
+        ring.signing_key,
+        algorithm=ring.algorithm,
+        headers={"kid": ring.signing_kid},
+    )
+
+
+def verify(ring: KeyRing, token: str) -> dict:
+    return jwt.decode(token, ring.verification_key(token), algorithms=[ring.algorithm])
+
+
+@pytest.mark.parametrize("algorithm", ["EdDSA", "ES256"])
+def test_tokens_of_a_rotated_out_key_verify_while_it_is_in_the_ring(
+    tmp_path, algorithm
+):
+    write_key(tmp_path, "2024-01", algorithm=algorithm)
+    old = KeyRing.load(str(tmp_path), algorithm)
+    token = sign(old, {"sub": "user"})
+
+    # The new key signs; the old one only verifies what it signed
+    write_key(tmp_path, "2024-02", algorithm=algorithm)
+    rotated = KeyRing.load(str(tmp_path), algorithm)
+    assert rotated.signing_kid == "2024-02"
+    assert verify(rotated, token) == {"sub": "user"}
+    assert jwt.get_unverified_header(sign(rotated, {}))["kid"] == "2024-02"
+
+    (tmp_path / "2024-01.pem").unlink()
+    retired = KeyRing.load(str(tmp_path), algorithm)
+    with pytest.raises(jwt.InvalidKeyError):
+        verify(retired, token)
+
+
+def test_a_public_key_only_verifies(tmp_path):
+    write_key(tmp_path, "a")
+    write_key(tmp_path, "b", private=False)
+
+    ring = KeyRing.load(str(tmp_path), "EdDSA")
+    assert ring.signing_kid == "a"
+    assert set(ring.public_keys) == {"a", "b"}
+    with pytest.raises(ValueError, match="No private key"):
+        KeyRing.load(str(tmp_path), "EdDSA", signing_kid="b")
+
+
+@pytest.mark.parametrize(
+    "algorithm, files, message",
+    [
+        ("HS256", {}, "not an asymmetric"),
+        ("EdDSA", {"bad.pem": b"not a key"}, "not a valid"),
+        ("EdDSA", {}, "No EdDSA private key"),
+    ],
+)
+def test_an_unusable_key_directory_is_rejected(tmp_path, algorithm, files, message):
+    for name, content in files.items():
+        (tmp_path / name).write_bytes(content)
+    with pytest.raises(ValueError, match=message):
+        KeyRing.load(str(tmp_path), algorithm)
+
+
+def test_the_jwks_verifies_tokens_without_the_ring(tmp_path):
+    write_key(tmp_path, "old")
+    write_key(tmp_path, "new")
+    ring = KeyRing.load(str(tmp_path), "EdDSA", signing_kid="old")
+    token = sign(ring, {"sub": "user"})
+
+    jwks = jwt.PyJWKSet.from_dict(ring.jwks())
+    assert sorted(key.key_id for key in jwks.keys) == ["new", "old"]
+    key = jwks[jwt.get_unverified_header(token)["kid"]]
+    assert jwt.decode(token, key, algorithms=["EdDSA"]) == {"sub": "user"}
+
+
+def test_encode_and_decode_use_the_key_ring(tmp_path, monkeypatch):
+    write_key(tmp_path, "current")
+    monkeypatch.setattr(tokens, "key_ring", KeyRing.load(str(tmp_path), "EdDSA"))
+
+    token = encode_token({"sub": "user"})
+    assert jwt.get_unverified_header(token) == {
+        "alg": "EdDSA",
+        "kid": "current",
+        "typ": "JWT",
+    }
+    assert decode_token(token) == {"sub": "user"}
+
+    monkeypatch.setattr(tokens, "key_ring", None)
+    with pytest.raises(jwt.PyJWTError):
+        decode_token(token)
+
+
+def test_the_session_creation_time_survives_the_claim():
+    created_at = datetime(2025, 6, 30, 23, 59, 59, 123456, tzinfo=timezone.utc)
+    claim = session_created_claim(created_at)
+
+    assert session_created_at({"session_created": claim}) == created_at
+    assert session_created_at({}) is None
+    assert session_created_at({"session_created": "1"}) is None
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from src.domain.users.repositories.user import UserRepository
+
+pytestmark = [pytest.mark.anyio, pytest.mark.db]
+
+UNBOUNDED = float("inf")
+
+
+async def seed_users(connection, count: int) -> None:
+    await connection.execute(
+        """
+        INSERT INTO users (name, email, password, fingerprint)
+        SELECT 'test', 'count-test-' || g || '@example.com', '!', -g
+        FROM generate_series(1, $1::int) g
+        """,
+        count,
+    )
+
+
+async def test_estimate_follows_the_table_size_without_a_new_analyze(pool, connection):
+    # Rolled back inserts of earlier runs leave free space that new rows
+    # would fill without growing the table
+    await pool.execute("VACUUM FULL users")
+    repository = UserRepository(connection)
+    await seed_users(connection, 2000)
+    await connection.execute("ANALYZE users")
+    exact = await repository.count_users()
+    assert (
+        abs(await repository.estimate_users(max_drift=UNBOUNDED) - exact) <= exact * 0.1
+    )
+
+    # Doubling the table is seen through its size, whatever the stats age
+    await connection.execute("""
+        INSERT INTO users (name, email, password, fingerprint)
+        SELECT name, 'more-' || email, password, fingerprint - 1000000 FROM users
+        WHERE email LIKE 'count-test-%'
+        """)
+    exact = await repository.count_users()
+    assert (
+        abs(await repository.estimate_users(max_drift=UNBOUNDED) - exact) <= exact * 0.1
+    )
+
+
+async def test_the_estimate_is_dropped_once_too_many_rows_changed(pool):
+    async with pool.acquire() as connection:
+        repository = UserRepository(connection)
+        # An autoanalyze in the middle would reset the count of changes
+        await connection.execute(
+            "ALTER TABLE users SET (autovacuum_enabled = false); ANALYZE users"
+        )
+        try:
+            await seed_users(connection, 100)
+            # Statistics are flushed when the backend goes idle
+            await connection.execute("SELECT pg_stat_force_next_flush()")
+            await asyncio.sleep(0.1)
+
+            changed = await connection.fetchval(
+                "SELECT n_mod_since_analyze FROM pg_stat_user_tables "
+                "WHERE relname = 'users'"
+            )
+            analyzed = await connection.fetchval(
+                "SELECT reltuples FROM pg_class WHERE relname = 'users'"
+            )
+            assert changed >= 100
+            drift = changed / analyzed
+            assert await repository.estimate_users(max_drift=drift * 0.9) is None
+            assert await repository.estimate_users(max_drift=drift * 1.1) > 0
+        finally:
+            await connection.execute(
+                "DELETE FROM users WHERE email LIKE 'count-test-%';"
+                "ALTER TABLE users RESET (autovacuum_enabled)"
+            )
+
+
+async def test_the_counter_sums_the_rows_of_every_connection(pool):
+    async with pool.acquire() as first, pool.acquire() as second:
+        try:
+            await seed_users(first, 30)
+            await second.execute("""
+                INSERT INTO users (name, email, password, fingerprint)
+                SELECT 'test', 'count-test-other-' || g || '@example.com', '!', -g - 1000
+                FROM generate_series(1, 20) g
+                """)
+            await first.execute(
+                "DELETE FROM users WHERE email LIKE 'count-test-other-1%'"
+            )
+            repository = UserRepository(second)
+            assert (
+                await repository.count_users_from_counter()
+                == await repository.count_users()
+            )
+        finally:
+            await first.execute("DELETE FROM users WHERE email LIKE 'count-test-%'")
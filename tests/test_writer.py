@@ -0,0 +1,109 @@
+import asyncio
+import secrets
+import uuid
+
+import pytest
+
+from asyncpg import ForeignKeyViolationError
+
+from src.domain.users.writer import SessionWriter
+
+pytestmark = [pytest.mark.anyio, pytest.mark.db]
+
+
+@pytest.fixture
+async def users(pool):
+    rows = await pool.fetch(
+        """
+        INSERT INTO users (name, email, password, fingerprint)
+        SELECT 'writer', 'writer-' || $1 || '-' || i || '@example.com', '!', -i - $2
+        FROM generate_series(1, 3) AS i
+        RETURNING uuid
+        """,
+        secrets.token_hex(4),
+        secrets.randbelow(2**30),
+    )
+    uuids = [row["uuid"] for row in rows]
+    yield uuids
+    await pool.execute("DELETE FROM users WHERE uuid = ANY($1::uuid[])", uuids)
+
+
+@pytest.fixture
+async def writer(pool):
+    writer = SessionWriter(window=0.05, max_batch=10)
+    writer.start(pool)
+    yield writer
+    await writer.stop()
+
+
+def rotate(writer: SessionWriter, user_uuid):
+    return writer.rotate(
+        secrets.token_hex(), secrets.token_hex(), "test", None, user_uuid
+    )
+
+
+async def test_concurrent_writes_share_one_transaction(writer, users):
+    sessions = await asyncio.gather(*(rotate(writer, user) for user in users))
+
+    assert [session["access_token"] is not None for session in sessions] == [True] * 3
+    assert writer.stats.batches == 1
+    assert writer.stats.max_batch_size == 3
+
+    session = sessions[0]
+    row = await writer._pool.fetchrow(
+        "SELECT uuid FROM sessions WHERE access_token = $1", session["access_token"]
+    )
+    access_token = secrets.token_hex()
+    await writer.update_access_token(
+        row["uuid"], session["created_at"], access_token, "test", None
+    )
+    assert await writer._pool.fetchval(
+        "SELECT count(*) FROM sessions WHERE access_token = $1", access_token
+    )
+
+
+async def test_a_failing_write_only_fails_its_caller(writer, users):
+    results = await asyncio.gather(
+        rotate(writer, users[0]),
+        rotate(writer, uuid.uuid4()),
+        rotate(writer, users[1]),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[1], ForeignKeyViolationError)
+    assert results[0]["access_token"] and results[2]["access_token"]
+    assert writer.stats.failed_batches == 1
+    assert writer.stats.rotations == 2
+
+
+async def test_a_cancelled_caller_does_not_stop_the_writer(writer, users, monkeypatch):
+    write = writer._write
+
+    async def failing_write(batch):
+        await asyncio.sleep(0.05)
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(writer, "_write", failing_write)
+    task = asyncio.ensure_future(rotate(writer, users[0]))
+    await asyncio.sleep(0.07)
+    # Cancelled while its write is in flight, before the write fails
+    task.cancel()
+    await asyncio.sleep(0.1)
+
+    assert writer.running
+    monkeypatch.setattr(writer, "_write", write)
+    assert (await rotate(writer, users[1]))["access_token"]
+
+
+async def test_writes_are_refused_once_the_writer_is_gone(pool, users):
+    writer = SessionWriter(window=0.05, max_batch=10)
+    writer.start(pool)
+    # Queued, but the writer stops before it is written
+    queued = asyncio.ensure_future(rotate(writer, users[0]))
+    await asyncio.sleep(0.01)
+    writer._task.cancel()
+
+    with pytest.raises(RuntimeError, match="stopped"):
+        await queued
+    with pytest.raises(RuntimeError, match="not running"):
+        await rotate(writer, users[1])